@@ -1,19 +1,34 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import os
 import shutil
 import uuid
+import json
+import time
+import asyncio
+import zipfile
+from collections import deque
 from backend.core.image_processor import ImageProcessor
-from backend.core.pdf_processor import PDFProcessor
+from backend.core.pdf_processor import PDFProcessor, PREVIEW_FORMATS, MIN_DPI, MAX_DPI
 from backend.core.av_processor import AVProcessor
 from backend.core.doc_processor import DocProcessor
 from backend.core.archive_processor import ArchiveProcessor
 from backend.core.dev_processor import DevProcessor
 from backend.core.smart_detector import SmartDetector
-from backend.core.data_processor import DataProcessor
+from backend.core.data_processor import DataProcessor, MANIFEST_NAME
 from backend.core.code_formatter import CodeFormatter
 from backend.core.office_processor import OfficeProcessor
 from backend.core.config_processor import ConfigProcessor
+from backend.core.buffers import save_buffer
+from backend.utils.executor import run_in_pool
+from backend.utils.ingest import IngestedUpload
+from backend.utils import jobs
+from backend.utils.cache import ResultCache, hash_file, result_cache
+from backend.utils.responses import BufferResponse, NdjsonStreamResponse, ZipStreamResponse
+from backend.utils.zipstream import iter_zip
+from backend.utils.routing import ProcessingRoute
+from backend import config
 
 import tempfile
 import struct
@@ -23,7 +38,10 @@ from pydantic import BaseModel
 import subprocess
 import platform
 
-router = APIRouter()
+# ProcessingRoute streams uploads into per-request scratch dirs, serves repeat
+# conversions from the result cache and lets any POST endpoint run as a
+# background job (`Prefer: respond-async` or `?mode=job`)
+router = APIRouter(route_class=ProcessingRoute)
 
 @router.post("/open-output-folder")
 async def open_output_folder():
@@ -39,13 +57,15 @@ async def open_output_folder():
 @router.post("/resize/image")
 async def resize_image(file: UploadFile = File(...), width: int = Form(None), height: int = Form(None), percentage: int = Form(None)):
     try:
+        if in_memory(file):
+            return await buffer_response(ImageProcessor.resize_image_buffer, file, width, height, percentage)
         input_path = save_upload(file)
         # Fix filename
         original_name = file.filename
         temp_renamed = os.path.join(os.path.dirname(input_path), original_name)
         os.replace(input_path, temp_renamed)
         
-        output_path = ImageProcessor.resize_image(temp_renamed, width, height, percentage)
+        output_path = await run_in_pool(ImageProcessor.resize_image, temp_renamed, width, height, percentage)
         
         # Move to output
         final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_path))
@@ -56,88 +76,325 @@ async def resize_image(file: UploadFile = File(...), width: int = Form(None), he
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/compress/pdf")
-async def compress_pdf(file: UploadFile = File(...), level: str = Form("medium")):
+async def compress_pdf(file: UploadFile = File(...), level: str = Form("medium"), grayscale: bool = Form(False), linearize: bool = Form(False)):
     try:
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
-        
-        output_path = PDFProcessor.compress_pdf(temp_renamed, level)
-        
-        final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_path))
-        os.replace(output_path, final_path)
-        
-        return FileResponse(final_path, filename=os.path.basename(final_path))
+
+        policy = PDFProcessor.compression_policy(level, grayscale)
+        plan = await run_in_pool(PDFProcessor.plan_image_recompression, temp_renamed, policy)
+        # Re-encode images in contiguous blocks, one document open per worker
+        workers = config.PROCESS_WORKERS if config.PROCESS_WORKERS > 0 else 1
+        blocks = PDFProcessor.page_blocks(plan, workers) if plan else []
+        results = await asyncio.gather(*(
+            run_in_pool(PDFProcessor.recompress_images, temp_renamed, block, policy)
+            for block in blocks
+        ))
+        images = [image for block_images in results for image in block_images]
+
+        base, ext = os.path.splitext(file.filename)
+        final_path = os.path.join(OUTPUT_DIR, f"{base}_compressed{ext}")
+        report = await run_in_pool(PDFProcessor.write_compressed_pdf, temp_renamed, images, final_path)
+        if linearize:
+            await run_in_pool(PDFProcessor.linearize, final_path)
+            report["bytes_after"] = os.path.getsize(final_path)
+        report = {"level": level, **policy, "linearized": linearize, **report}
+
+        return FileResponse(final_path, filename=os.path.basename(final_path), headers={"X-Compression-Stats": json.dumps(report)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 # Use system temp directory for uploads to avoid permission errors
-TEMP_DIR = os.path.join(tempfile.gettempdir(), "formatr_uploads")
-OUTPUT_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "FORMATR_Output")
+TEMP_DIR = config.TEMP_DIR
+OUTPUT_DIR = config.OUTPUT_DIR
 
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def save_upload(file: UploadFile) -> str:
+    # Multipart uploads are already on disk, under their own name, in a
+    # per-request scratch dir (see backend/utils/ingest.py). Small ones are
+    # held in memory and only written there when a route needs a path
+    if isinstance(file, IngestedUpload):
+        return file.spill()
     path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}_{file.filename}")
     with open(path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     return path
 
+def in_memory(file: UploadFile) -> bool:
+    return isinstance(file, IngestedUpload) and file.in_memory
+
+async def buffer_response(func, file: UploadFile, *args) -> BufferResponse:
+    """
+    Run a processor's `*_buffer` variant on an in-memory upload and answer
+    from memory, without writing to TEMP_DIR or OUTPUT_DIR.
+    """
+    buffer, filename = await run_in_pool(func, file.file.getvalue(), file.filename, *args)
+    return BufferResponse(buffer.getvalue(), filename=filename)
+
+async def export_all_sheets(file: UploadFile, target_format: str) -> ZipStreamResponse:
+    """
+    Export every worksheet in parallel (one process-pool task per sheet) and
+    stream the results back as a ZIP with one file per sheet, plus a manifest
+    of per-sheet row counts and timings (also sent as `X-Sheet-Stats`).
+    """
+    input_path = save_upload(file)
+    work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+    try:
+        start = time.perf_counter()
+        sheets = await run_in_pool(DataProcessor.list_sheets, input_path)
+        names = DataProcessor.sheet_filenames(sheets, target_format)
+        stats = await asyncio.gather(*(
+            run_in_pool(DataProcessor.export_sheet, input_path, sheet, target_format, os.path.join(work_dir, name))
+            for sheet, name in zip(sheets, names)
+        ))
+        summary = {"sheets": stats, "total_rows": sum(s["rows"] for s in stats), "seconds": round(time.perf_counter() - start, 3)}
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    entries = [(name, os.path.join(work_dir, name)) for name in names]
+    entries.append((MANIFEST_NAME, json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8")))
+    name, _ = os.path.splitext(file.filename)
+    return ZipStreamResponse(
+        iter_zip(entries),
+        filename=f"{name}_sheets.zip",
+        headers={"X-Sheet-Stats": json.dumps(summary)},
+        background=BackgroundTask(shutil.rmtree, work_dir, True),
+    )
+
 @router.post("/convert/image")
 async def convert_image(file: UploadFile = File(...), target_format: str = Form(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ImageProcessor.convert_image_buffer, file, target_format)
         input_path = save_upload(file)
         # Fix filename to original for output
         original_name = file.filename
         temp_renamed = os.path.join(os.path.dirname(input_path), original_name)
         os.replace(input_path, temp_renamed)
         
-        output_path = ImageProcessor.convert_image(temp_renamed, target_format, OUTPUT_DIR)
+        output_path = await run_in_pool(ImageProcessor.convert_image, temp_renamed, target_format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/compress/image")
-async def compress_image(file: UploadFile = File(...), size_kb: int = Form(...)):
-    try:
-        input_path = save_upload(file)
-        original_name = file.filename
-        temp_renamed = os.path.join(os.path.dirname(input_path), original_name)
-        os.replace(input_path, temp_renamed)
-        
-        output_path = ImageProcessor.compress_image(temp_renamed, size_kb)
-        
-        # If output is None (e.g. SVG without compress logic), handle gracefully
-        # For now, we assume compress_image handles what it can.
-        
-        # Move to output dir
-        final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_path))
-        shutil.move(output_path, final_path)
-        
+async def compress_image(file: UploadFile = File(...), size_kb: int = Form(...), target_format: str = Form("jpeg"), parallel: int = Form(1), dither: bool = Form(True)):
+    try:
+        # Small uploads are passed as bytes; larger ones are read by the worker from disk
+        source = file.file.getvalue() if in_memory(file) else save_upload(file)
+        buffer, filename, stats = await run_in_pool(
+            ImageProcessor.compress_image_report, source, file.filename, size_kb, target_format, max(1, parallel), dither)
+        headers = {"X-Compression-Stats": json.dumps(stats)}
+        if in_memory(file):
+            return BufferResponse(buffer.getvalue(), filename=filename, headers=headers)
+        output_path = await run_in_pool(save_buffer, buffer, OUTPUT_DIR, filename)
+        return FileResponse(output_path, filename=os.path.basename(output_path), headers=headers)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+async def render_pdf_pages(pdf_path: str, output_format: str, dpi: int, pages: str, output_dir: str) -> list[str]:
+    """
+    Rasterize the selected pages, split into contiguous blocks across the
+    process pool (each worker opens the PDF itself). Paths come back in page order.
+    """
+    page_list = PDFProcessor.parse_pages(pages, await run_in_pool(PDFProcessor.page_count, pdf_path))
+    # MuPDF is not thread-safe, so without worker processes render in one block
+    workers = config.PROCESS_WORKERS if config.PROCESS_WORKERS > 0 else 1
+    blocks = PDFProcessor.page_blocks(page_list, workers)
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    results = await asyncio.gather(*(
+        run_in_pool(PDFProcessor.render_pages, pdf_path, block, output_dir, output_format, dpi, base_name)
+        for block in blocks
+    ))
+    return [path for block_paths in results for path in block_paths]
+
+async def iter_pdf_text(pdf_path: str, page_list: list[int], blocks: bool):
+    """
+    Yield NDJSON page records in page order. Chunks of pages run on the
+    process pool, at most two per worker ahead of what has been sent, so
+    the first pages go out while later ones are still being extracted.
+    """
+    workers = config.PROCESS_WORKERS if config.PROCESS_WORKERS > 0 else 1
+    chunks = iter(PDFProcessor.text_chunks(page_list))
+    pending = deque()
+
+    def submit():
+        chunk = next(chunks, None)
+        if chunk is not None:
+            pending.append(asyncio.ensure_future(run_in_pool(PDFProcessor.extract_text, pdf_path, chunk, blocks)))
+
+    for _ in range(workers * 2):
+        submit()
+    try:
+        while pending:
+            try:
+                records = await pending.popleft()
+            except Exception as e:
+                # Headers are already sent; report the failure in-band and stop
+                yield (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+                return
+            submit()
+            yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    finally:
+        for future in pending:
+            future.cancel()
+
+async def files_response(output_paths: list[str], work_dir: str, zip_name: str):
+    """
+    One file: move it to OUTPUT_DIR. Several: stream them as a ZIP in order.
+    Either way `work_dir` is removed afterwards.
+    """
+    if len(output_paths) == 1:
+        final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_paths[0]))
+        shutil.move(output_paths[0], final_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
         return FileResponse(final_path, filename=os.path.basename(final_path))
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    # PNG/JPEG/PDF and audio/video output is already compressed; deflating it again only costs CPU
+    return ZipStreamResponse(
+        iter_zip(((os.path.basename(path), path) for path in output_paths), zipfile.ZIP_STORED),
+        filename=zip_name,
+        background=BackgroundTask(shutil.rmtree, work_dir, True),
+    )
 
 @router.post("/convert/pdf-to-image")
-async def pdf_to_image(file: UploadFile = File(...), format: str = Form("png")):
+async def pdf_to_image(file: UploadFile = File(...), format: str = Form("png"), dpi: int = Form(72), pages: str = Form("")):
     try:
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
-        
-        output_paths = PDFProcessor.convert_pdf_to_images(temp_renamed, format)
-        
-        # If multiple files, zip them
-        if len(output_paths) > 1:
-            zip_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file.filename)[0]}_images.zip")
-            ArchiveProcessor.create_zip(output_paths, zip_path)
-            return FileResponse(zip_path, filename=os.path.basename(zip_path))
-        else:
-            final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_paths[0]))
-            shutil.move(output_paths[0], final_path)
-            return FileResponse(final_path, filename=os.path.basename(final_path))
-            
+
+        work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+        try:
+            output_paths = await render_pdf_pages(temp_renamed, format, dpi, pages, work_dir)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        return await files_response(output_paths, work_dir, f"{os.path.splitext(file.filename)[0]}_images.zip")
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/extract/pdf-text")
+async def extract_pdf_text(file: UploadFile = File(...), pages: str = Form(""), blocks: bool = Form(False)):
+    """
+    Text of each page as NDJSON, streamed in page order as it is extracted.
+    `blocks=true` adds each text block's position.
+    """
+    try:
+        pdf_path = save_upload(file)
+        page_list = PDFProcessor.parse_pages(pages, await run_in_pool(PDFProcessor.page_count, pdf_path))
+        filename = f"{os.path.splitext(file.filename)[0]}.ndjson"
+        return NdjsonStreamResponse(iter_pdf_text(pdf_path, page_list, blocks), filename=filename)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/pdf/split")
+async def split_pdf(file: UploadFile = File(...), ranges: str = Form(""), every: int = Form(0)):
+    """
+    Split by page ranges ("1-5,6-10": one PDF per range) or into parts of
+    `every` pages. A single part comes back as a PDF, several as a ZIP.
+    """
+    try:
+        pdf_path = save_upload(file)
+        parts = PDFProcessor.split_parts(await run_in_pool(PDFProcessor.page_count, pdf_path), ranges, every)
+        work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+        base_name = os.path.splitext(file.filename)[0]
+        output_paths = [os.path.join(work_dir, name) for name in PDFProcessor.part_filenames(parts, base_name)]
+
+        # Parts are written in blocks across the process pool, each worker opening the source once
+        workers = config.PROCESS_WORKERS if config.PROCESS_WORKERS > 0 else 1
+        blocks = PDFProcessor.page_blocks(list(range(len(parts))), workers, min_block=1)
+        await asyncio.gather(*(
+            run_in_pool(PDFProcessor.write_parts, pdf_path, [parts[i] for i in block], [output_paths[i] for i in block])
+            for block in blocks
+        ))
+        return await files_response(output_paths, work_dir, f"{base_name}_split.zip")
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/pdf/merge")
+async def merge_pdf(files: list[UploadFile] = File(...)):
+    try:
+        input_paths = [save_upload(file) for file in files]
+        output_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(files[0].filename)[0]}_merged.pdf")
+        await run_in_pool(PDFProcessor.merge_pdfs, input_paths, output_path)
+        return FileResponse(output_path, filename=os.path.basename(output_path))
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# ===== PDF PAGE PREVIEWS =====
+# Uploads are kept in the result cache under their SHA-256 (the doc_id) and
+# rendered pages under (doc_id, page, dpi, format)
+
+def pdf_source_key(doc_id: str) -> str:
+    return ResultCache.make_key("pdf-source", [doc_id], {})
+
+@router.post("/pdf/open")
+async def open_pdf(file: UploadFile = File(...)):
+    try:
+        if not result_cache.enabled:
+            return JSONResponse(status_code=503, content={"error": "Page previews need the result cache (FORMATR_CACHE_MAX_MB > 0)"})
+        doc_id = getattr(file, "sha256", None) or await run_in_pool(hash_file, file.file)
+        key = pdf_source_key(doc_id)
+        if result_cache.get(key) is None:
+            meta = {"filename": file.filename, "media_type": "application/pdf"}
+            if in_memory(file):
+                await run_in_pool(result_cache.put_bytes, key, file.file.getvalue(), meta)
+            else:
+                await run_in_pool(result_cache.put, key, save_upload(file), meta)
+        source = result_cache.get(key)
+        if source is None:
+            return JSONResponse(status_code=413, content={"error": "Document is larger than the cache"})
+        pages = await run_in_pool(PDFProcessor.document_pages, source["path"])
+        return {"doc_id": doc_id, "pages": pages, "page_url": f"/api/pdf/{doc_id}/page/{{n}}"}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/pdf/{doc_id}/edit")
+async def edit_pdf(doc_id: str, rotate: int = Form(0), pages: str = Form(""), title: str = Form(None), author: str = Form(None), incremental: bool = Form(True)):
+    """
+    Edit a document registered with /pdf/open. By default the result is an
+    incremental update: the original bytes plus the changed objects.
+    """
+    try:
+        source = result_cache.get(pdf_source_key(doc_id))
+        if source is None:
+            return JSONResponse(status_code=404, content={"error": "Unknown document"})
+        metadata = {key: value for key, value in (("title", title), ("author", author)) if value is not None}
+        base = os.path.splitext(source.get("filename") or doc_id)[0]
+        output_path = os.path.join(OUTPUT_DIR, f"{base}_edited.pdf")
+        stats = await run_in_pool(PDFProcessor.edit_pdf, source["path"], output_path, rotate, pages, metadata, incremental)
+        return FileResponse(output_path, filename=os.path.basename(output_path), headers={"X-Edit-Stats": json.dumps(stats)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.get("/pdf/{doc_id}/page/{n}")
+async def pdf_page(doc_id: str, n: int, dpi: int = 72, format: str = "png"):
+    try:
+        format = format.lower()
+        if format not in PREVIEW_FORMATS or not MIN_DPI <= dpi <= MAX_DPI:
+            return JSONResponse(status_code=400, content={"error": f"Use format png or jpg and dpi {MIN_DPI}-{MAX_DPI}"})
+        # Content-addressed, so a rendered page never changes
+        headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+        key = ResultCache.make_key("pdf-page", [doc_id], {"page": n, "dpi": dpi, "format": format})
+        hit = result_cache.get(key)
+        if hit is not None and os.path.exists(hit["path"]):
+            return FileResponse(hit["path"], media_type=hit["media_type"], headers={**headers, "X-Cache": "HIT"})
+
+        source = result_cache.get(pdf_source_key(doc_id))
+        if source is None or not os.path.exists(source["path"]):
+            return JSONResponse(status_code=404, content={"error": "Document not found; upload it with POST /api/pdf/open"})
+        try:
+            data = await run_in_pool(PDFProcessor.render_page, source["path"], n - 1, dpi, format)
+        except IndexError as e:
+            return JSONResponse(status_code=404, content={"error": str(e)})
+
+        media_type = PREVIEW_FORMATS[format]
+        await run_in_pool(result_cache.put_bytes, key, data, {"filename": f"page_{n}.{format}", "media_type": media_type})
+        return Response(content=data, media_type=media_type, headers={**headers, "X-Cache": "MISS"})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
@@ -148,11 +405,32 @@ async def convert_media(file: UploadFile = File(...), target_format: str = Form(
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = AVProcessor.convert_media(temp_renamed, target_format, OUTPUT_DIR)
+        output_path = await run_in_pool(AVProcessor.convert_media, temp_renamed, target_format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@router.post("/convert/media-renditions")
+async def convert_media_renditions(file: UploadFile = File(...), renditions: str = Form(...)):
+    """
+    Several outputs from one upload and one decode, e.g. "mp3:128k,m4a:256k,opus:64k"
+    or "mp4:1080p,mp4:720p:2M,mp4:480p". Several come back as a ZIP.
+    """
+    try:
+        specs = AVProcessor.parse_renditions(renditions)
+        input_path = save_upload(file)
+        base_name = os.path.splitext(file.filename)[0]
+        work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+        output_paths = [os.path.join(work_dir, name) for name in AVProcessor.rendition_filenames(specs, base_name)]
+        try:
+            await run_in_pool(AVProcessor.render_renditions, input_path, specs, output_paths)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        return await files_response(output_paths, work_dir, f"{base_name}_renditions.zip")
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
 @router.post("/convert/doc")
 async def convert_doc(file: UploadFile = File(...), target_format: str = Form("pdf")):
     try:
@@ -160,32 +438,51 @@ async def convert_doc(file: UploadFile = File(...), target_format: str = Form("p
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = DocProcessor.convert_document(temp_renamed, target_format, OUTPUT_DIR)
+        output_path = await run_in_pool(DocProcessor.convert_document, temp_renamed, target_format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/convert/image-to-pdf")
-async def image_to_pdf(file: UploadFile = File(...), percentage: int = Form(100)):
+async def image_to_pdf(file: UploadFile = File(...), percentage: int = Form(100), linearize: bool = Form(False)):
     try:
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        # Resize first if needed using existing method logic (skipping extra API call)
-        processed_image = temp_renamed
-        if percentage < 100:
-             processed_image = ImageProcessor.resize_image(temp_renamed, percentage=percentage)
+        # Resize (or re-encode formats PDF can't hold as is) first
+        processed_image = await run_in_pool(ImageProcessor.prepare_for_pdf, temp_renamed, percentage)
         
         # Use PDFProcessor to convert single image to PDF
         # We can reuse `convert_images_to_pdf` logic for a list of 1
         output_pdf = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file.filename)[0]}.pdf")
-        PDFProcessor.convert_images_to_pdf([processed_image], output_pdf)
+        await run_in_pool(PDFProcessor.convert_images_to_pdf, [processed_image], output_pdf)
+        if linearize:
+            await run_in_pool(PDFProcessor.linearize, output_pdf)
         
         return FileResponse(output_pdf, filename=os.path.basename(output_pdf))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@router.post("/convert/images-to-pdf")
+async def images_to_pdf(files: list[UploadFile] = File(...), percentage: int = Form(100), linearize: bool = Form(False)):
+    try:
+        # Each upload keeps its own name in the request's scratch dir
+        input_paths = [save_upload(file) for file in files]
+
+        # Preprocess every image at once on the pool; pages follow upload order
+        image_paths = await asyncio.gather(*(
+            run_in_pool(ImageProcessor.prepare_for_pdf, path, percentage) for path in input_paths
+        ))
+        output_pdf = os.path.join(OUTPUT_DIR, f"{os.path.splitext(files[0].filename)[0]}.pdf")
+        await run_in_pool(PDFProcessor.convert_images_to_pdf, list(image_paths), output_pdf)
+        if linearize:
+            await run_in_pool(PDFProcessor.linearize, output_pdf)
+
+        return FileResponse(output_pdf, filename=os.path.basename(output_pdf))
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
 @router.post("/convert/image-to-docx")
 async def image_to_docx(file: UploadFile = File(...), percentage: int = Form(100)):
     try:
@@ -195,16 +492,16 @@ async def image_to_docx(file: UploadFile = File(...), percentage: int = Form(100
         
         processed_image = temp_renamed
         if percentage < 100:
-             processed_image = ImageProcessor.resize_image(temp_renamed, percentage=percentage)
+             processed_image = await run_in_pool(ImageProcessor.resize_image, temp_renamed, percentage=percentage)
              
-        output_docx = DocProcessor.create_docx_from_image(processed_image, OUTPUT_DIR)
+        output_docx = await run_in_pool(DocProcessor.create_docx_from_image, processed_image, OUTPUT_DIR)
         
         return FileResponse(output_docx, filename=os.path.basename(output_docx))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/convert/docx-to-image")
-async def docx_to_image(file: UploadFile = File(...), format: str = Form("png")):
+async def docx_to_image(file: UploadFile = File(...), format: str = Form("png"), dpi: int = Form(72)):
     try:
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
@@ -212,28 +509,53 @@ async def docx_to_image(file: UploadFile = File(...), format: str = Form("png"))
         
         # Step 1: DOCX -> PDF
         # Use a temporary dir for intermediate PDF
-        pdf_path = DocProcessor.convert_document(temp_renamed, "pdf", TEMP_DIR)
+        pdf_path = await run_in_pool(DocProcessor.convert_document, temp_renamed, "pdf", TEMP_DIR)
         
         # Step 2: PDF -> Images
-        output_paths = PDFProcessor.convert_pdf_to_images(pdf_path, format)
-        
-        # Zip or Single
-        if len(output_paths) > 1:
-            zip_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file.filename)[0]}_images.zip")
-            ArchiveProcessor.create_zip(output_paths, zip_path)
-            # Move images to output for reference or keep in temp?
-            # Existing logic saves images in `TEMP_DIR` effectively because PDF was in TEMP_DIR. 
-            # Actually PDFProcessor saves images in `os.path.dirname(file_path)`.
-            # So images are in TEMP_DIR.
-            return FileResponse(zip_path, filename=os.path.basename(zip_path))
-        else:
-            final_path = os.path.join(OUTPUT_DIR, os.path.basename(output_paths[0]))
-            shutil.move(output_paths[0], final_path)
-            return FileResponse(final_path, filename=os.path.basename(final_path))
+        work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+        try:
+            output_paths = await render_pdf_pages(pdf_path, format, dpi, "", work_dir)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        return await files_response(output_paths, work_dir, f"{os.path.splitext(file.filename)[0]}_images.zip")
             
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return StreamingResponse(jobs.iter_events(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    if job.state == jobs.FAILED:
+        return JSONResponse(status_code=500, content={"error": job.error})
+    if not job.done:
+        return JSONResponse(status_code=409, content={"error": f"Job is {job.state}", "state": job.state})
+    if job.result_path:
+        return FileResponse(job.result_path, filename=job.result_filename, media_type=job.media_type)
+    if job.result_filename:
+        return BufferResponse(job.result_body, filename=job.result_filename, media_type=job.media_type)
+    return Response(content=job.result_body, media_type=job.media_type)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
 class AnalyzeRequest(BaseModel):
     filename: str
 
@@ -248,7 +570,7 @@ async def convert_archive(file: UploadFile = File(...), target_format: str = For
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = ArchiveProcessor.convert_archive(temp_renamed, target_format, OUTPUT_DIR)
+        output_path = await run_in_pool(ArchiveProcessor.convert_archive, temp_renamed, target_format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -264,9 +586,18 @@ async def extract_images(file: UploadFile = File(...)):
         output_paths = []
         
         if ext == '.pdf':
-            output_paths = PDFProcessor.convert_pdf_to_images(temp_renamed, "png") # Default to PNG
+            work_dir = tempfile.mkdtemp(dir=TEMP_DIR)
+            try:
+                output_paths = await run_in_pool(PDFProcessor.extract_images, temp_renamed, work_dir)
+            except Exception:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                raise
+            if not output_paths:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return JSONResponse(status_code=404, content={"error": "No images found in document"})
+            return await files_response(output_paths, work_dir, f"{os.path.splitext(file.filename)[0]}_extracted_images.zip")
         elif ext == '.docx':
-            output_paths = DocProcessor.extract_images_from_docx(temp_renamed, OUTPUT_DIR)
+            output_paths = await run_in_pool(DocProcessor.extract_images_from_docx, temp_renamed, OUTPUT_DIR)
         else:
              return JSONResponse(status_code=400, content={"error": "Unsupported file type for image extraction"})
 
@@ -275,7 +606,7 @@ async def extract_images(file: UploadFile = File(...)):
 
         if len(output_paths) > 1:
             zip_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file.filename)[0]}_extracted_images.zip")
-            ArchiveProcessor.create_zip(output_paths, zip_path)
+            await run_in_pool(ArchiveProcessor.create_zip, output_paths, zip_path)
             return FileResponse(zip_path, filename=os.path.basename(zip_path))
         else:
             return FileResponse(output_paths[0], filename=os.path.basename(output_paths[0]))
@@ -290,7 +621,7 @@ async def extract_audio(file: UploadFile = File(...), format: str = Form("mp3"))
         os.replace(input_path, temp_renamed)
         
         # FFmpeg handles extraction if we just convert video to audio format
-        output_path = AVProcessor.convert_media(temp_renamed, format, OUTPUT_DIR)
+        output_path = await run_in_pool(AVProcessor.convert_media, temp_renamed, format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -298,8 +629,10 @@ async def extract_audio(file: UploadFile = File(...), format: str = Form("mp3"))
 @router.post("/dev/convert-config")
 async def dev_convert_config(file: UploadFile = File(...), target_format: str = Form(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(DevProcessor.convert_config_buffer, file, target_format)
         input_path = save_upload(file)
-        output_path = DevProcessor.convert_config(input_path, target_format, OUTPUT_DIR)
+        output_path = await run_in_pool(DevProcessor.convert_config, input_path, target_format, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -307,27 +640,34 @@ async def dev_convert_config(file: UploadFile = File(...), target_format: str =
 @router.post("/dev/base64")
 async def dev_base64(file: UploadFile = File(...), action: str = Form(...)):
     try:
+        if in_memory(file):
+            func = DevProcessor.base64_encode_buffer if action == 'encode' else DevProcessor.base64_decode_buffer
+            return await buffer_response(func, file)
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
         if action == 'encode':
-            output_path = DevProcessor.base64_encode(temp_renamed, OUTPUT_DIR)
+            output_path = await run_in_pool(DevProcessor.base64_encode, temp_renamed, OUTPUT_DIR)
         else:
-            output_path = DevProcessor.base64_decode(temp_renamed, OUTPUT_DIR)
+            output_path = await run_in_pool(DevProcessor.base64_decode, temp_renamed, OUTPUT_DIR)
             
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/dev/md-to-pdf")
-async def dev_md_to_pdf(file: UploadFile = File(...)):
+async def dev_md_to_pdf(file: UploadFile = File(...), linearize: bool = Form(False)):
     try:
+        if in_memory(file) and not linearize:
+            return await buffer_response(DevProcessor.md_to_pdf_buffer, file)
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = DevProcessor.md_to_pdf(temp_renamed, OUTPUT_DIR)
+        output_path = await run_in_pool(DevProcessor.md_to_pdf, temp_renamed, OUTPUT_DIR)
+        if linearize:
+            await run_in_pool(PDFProcessor.linearize, output_path)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -377,10 +717,12 @@ async def dev_translate(request: TranslationRequest):
 # ===== PHASE 1 ENDPOINTS =====
 
 @router.post("/convert/csv-to-json")
-async def convert_csv_to_json(file: UploadFile = File(...)):
+async def convert_csv_to_json(file: UploadFile = File(...), output_format: str = Form("json"), compact: bool = Form(False)):
     try:
+        if in_memory(file):
+            return await buffer_response(DataProcessor.csv_to_json_buffer, file, output_format, compact)
         input_path = save_upload(file)
-        output_path = DataProcessor.csv_to_json(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.csv_to_json, input_path, OUTPUT_DIR, output_format, compact)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -388,8 +730,10 @@ async def convert_csv_to_json(file: UploadFile = File(...)):
 @router.post("/convert/json-to-csv")
 async def convert_json_to_csv(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(DataProcessor.json_to_csv_buffer, file)
         input_path = save_upload(file)
-        output_path = DataProcessor.json_to_csv(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.json_to_csv, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -397,29 +741,35 @@ async def convert_json_to_csv(file: UploadFile = File(...)):
 @router.post("/convert/csv-to-excel")
 async def convert_csv_to_excel(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(DataProcessor.csv_to_excel_buffer, file)
         input_path = save_upload(file)
-        output_path = DataProcessor.csv_to_excel(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.csv_to_excel, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/convert/excel-to-csv")
-async def convert_excel_to_csv(file: UploadFile = File(...)):
+async def convert_excel_to_csv(file: UploadFile = File(...), sheets: str = Form("active")):
     try:
+        if sheets == "all":
+            return await export_all_sheets(file, "csv")
+        if in_memory(file):
+            return await buffer_response(DataProcessor.excel_to_csv_buffer, file)
         input_path = save_upload(file)
-        output_path = DataProcessor.excel_to_csv(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.excel_to_csv, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/convert/video-to-gif")
-async def convert_video_to_gif(file: UploadFile = File(...), fps: int = Form(10), width: int = Form(480)):
+async def convert_video_to_gif(file: UploadFile = File(...), fps: int = Form(10), width: int = Form(480), format: str = Form("gif")):
     try:
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = AVProcessor.video_to_gif(temp_renamed, OUTPUT_DIR, fps, width)
+        output_path = await run_in_pool(AVProcessor.video_to_gif, temp_renamed, OUTPUT_DIR, fps, width, format)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -427,8 +777,10 @@ async def convert_video_to_gif(file: UploadFile = File(...), fps: int = Form(10)
 @router.post("/format/beautify-js")
 async def beautify_js(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.beautify_js_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.beautify_js(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.beautify_js, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -436,8 +788,10 @@ async def beautify_js(file: UploadFile = File(...)):
 @router.post("/format/minify-js")
 async def minify_js(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.minify_js_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.minify_js(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.minify_js, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -445,8 +799,10 @@ async def minify_js(file: UploadFile = File(...)):
 @router.post("/format/beautify-css")
 async def beautify_css(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.beautify_css_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.beautify_css(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.beautify_css, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -454,8 +810,10 @@ async def beautify_css(file: UploadFile = File(...)):
 @router.post("/format/minify-css")
 async def minify_css(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.minify_css_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.minify_css(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.minify_css, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -463,8 +821,10 @@ async def minify_css(file: UploadFile = File(...)):
 @router.post("/format/beautify-html")
 async def beautify_html(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.beautify_html_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.beautify_html(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.beautify_html, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -472,33 +832,26 @@ async def beautify_html(file: UploadFile = File(...)):
 @router.post("/format/minify-html")
 async def minify_html(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(CodeFormatter.minify_html_buffer, file)
         input_path = save_upload(file)
-        output_path = CodeFormatter.minify_html(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(CodeFormatter.minify_html, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/convert/html-to-pdf")
-async def html_to_pdf(file: UploadFile = File(...)):
+async def html_to_pdf(file: UploadFile = File(...), linearize: bool = Form(False)):
     try:
+        if in_memory(file) and not linearize:
+            return await buffer_response(DevProcessor.html_to_pdf_buffer, file)
         input_path = save_upload(file)
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        # Read HTML content
-        with open(temp_renamed, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Convert to PDF using xhtml2pdf
-        from xhtml2pdf import pisa
-        output_path = os.path.join(OUTPUT_DIR, f"{os.path.splitext(file.filename)[0]}.pdf")
-        
-        with open(output_path, "wb") as pdf_file:
-            pisa_status = pisa.CreatePDF(html_content, dest=pdf_file)
-        
-        if pisa_status.err:
-            raise Exception("HTML to PDF conversion failed")
-        
+        output_path = await run_in_pool(DevProcessor.html_to_pdf, temp_renamed, OUTPUT_DIR)
+        if linearize:
+            await run_in_pool(PDFProcessor.linearize, output_path)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -507,10 +860,14 @@ async def html_to_pdf(file: UploadFile = File(...)):
 # ===== PHASE 2 TIER 1 ENDPOINTS =====
 
 @router.post("/convert/excel-to-json")
-async def convert_excel_to_json(file: UploadFile = File(...)):
+async def convert_excel_to_json(file: UploadFile = File(...), sheets: str = Form("active")):
     try:
+        if sheets == "all":
+            return await export_all_sheets(file, "json")
+        if in_memory(file):
+            return await buffer_response(DataProcessor.excel_to_json_buffer, file)
         input_path = save_upload(file)
-        output_path = DataProcessor.excel_to_json(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.excel_to_json, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -518,8 +875,10 @@ async def convert_excel_to_json(file: UploadFile = File(...)):
 @router.post("/convert/xls-to-xlsx")
 async def convert_xls_to_xlsx(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(DataProcessor.xls_to_xlsx_buffer, file)
         input_path = save_upload(file)
-        output_path = DataProcessor.xls_to_xlsx(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(DataProcessor.xls_to_xlsx, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -531,7 +890,7 @@ async def extract_pptx_images(file: UploadFile = File(...)):
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_folder = OfficeProcessor.extract_pptx_images(temp_renamed, OUTPUT_DIR)
+        output_folder = await run_in_pool(OfficeProcessor.extract_pptx_images, temp_renamed, OUTPUT_DIR)
         
         # Create a ZIP of the extracted images
         import shutil
@@ -547,7 +906,7 @@ async def extract_pptx_text(file: UploadFile = File(...)):
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = OfficeProcessor.extract_pptx_text(temp_renamed, OUTPUT_DIR)
+        output_path = await run_in_pool(OfficeProcessor.extract_pptx_text, temp_renamed, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -559,7 +918,7 @@ async def get_pptx_info(file: UploadFile = File(...)):
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = OfficeProcessor.get_pptx_info(temp_renamed, OUTPUT_DIR)
+        output_path = await run_in_pool(OfficeProcessor.get_pptx_info, temp_renamed, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -567,8 +926,10 @@ async def get_pptx_info(file: UploadFile = File(...)):
 @router.post("/convert/toml-to-json")
 async def convert_toml_to_json(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ConfigProcessor.toml_to_json_buffer, file)
         input_path = save_upload(file)
-        output_path = ConfigProcessor.toml_to_json(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(ConfigProcessor.toml_to_json, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -576,8 +937,10 @@ async def convert_toml_to_json(file: UploadFile = File(...)):
 @router.post("/convert/toml-to-yaml")
 async def convert_toml_to_yaml(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ConfigProcessor.toml_to_yaml_buffer, file)
         input_path = save_upload(file)
-        output_path = ConfigProcessor.toml_to_yaml(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(ConfigProcessor.toml_to_yaml, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -585,8 +948,10 @@ async def convert_toml_to_yaml(file: UploadFile = File(...)):
 @router.post("/convert/env-to-json")
 async def convert_env_to_json(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ConfigProcessor.env_to_json_buffer, file)
         input_path = save_upload(file)
-        output_path = ConfigProcessor.env_to_json(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(ConfigProcessor.env_to_json, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -594,8 +959,10 @@ async def convert_env_to_json(file: UploadFile = File(...)):
 @router.post("/convert/json-to-env")
 async def convert_json_to_env(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ConfigProcessor.json_to_env_buffer, file)
         input_path = save_upload(file)
-        output_path = ConfigProcessor.json_to_env(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(ConfigProcessor.json_to_env, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -603,8 +970,10 @@ async def convert_json_to_env(file: UploadFile = File(...)):
 @router.post("/validate/env")
 async def validate_env(file: UploadFile = File(...)):
     try:
+        if in_memory(file):
+            return await buffer_response(ConfigProcessor.validate_env_buffer, file)
         input_path = save_upload(file)
-        output_path = ConfigProcessor.validate_env(input_path, OUTPUT_DIR)
+        output_path = await run_in_pool(ConfigProcessor.validate_env, input_path, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -616,7 +985,7 @@ async def convert_7z_to_zip(file: UploadFile = File(...)):
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_path = ArchiveProcessor.convert_7z_to_zip(temp_renamed, OUTPUT_DIR)
+        output_path = await run_in_pool(ArchiveProcessor.convert_7z_to_zip, temp_renamed, OUTPUT_DIR)
         return FileResponse(output_path, filename=os.path.basename(output_path))
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -628,7 +997,7 @@ async def extract_7z(file: UploadFile = File(...)):
         temp_renamed = os.path.join(os.path.dirname(input_path), file.filename)
         os.replace(input_path, temp_renamed)
         
-        output_folder = ArchiveProcessor.extract_7z(temp_renamed, OUTPUT_DIR)
+        output_folder = await run_in_pool(ArchiveProcessor.extract_7z, temp_renamed, OUTPUT_DIR)
         
         # Create a ZIP of the extracted contents
         import shutil
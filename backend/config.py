@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+# Deployment tunables. Every value can be overridden with an environment
+# variable of the same name prefixed by FORMATR_ (e.g. FORMATR_THREAD_WORKERS=8).
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(f"FORMATR_{name}")
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Per-request scratch directories for uploads (only /tmp is writable on serverless)
+TEMP_DIR = os.environ.get("FORMATR_TEMP_DIR") or os.path.join(tempfile.gettempdir(), "formatr_uploads")
+
+# Where path-based conversions write their results. Point it at /tmp on serverless
+OUTPUT_DIR = os.environ.get("FORMATR_OUTPUT_DIR") or os.path.join(os.path.expanduser("~"), "Downloads", "FORMATR_Output")
+
+# Uploads whose request body is at most this many KB are kept in memory and,
+# for processors with `*_buffer` variants, answered without touching disk. 0 disables
+MEMORY_THRESHOLD_KB = _env_int("MEMORY_THRESHOLD_KB", 2048)
+
+# Worker pools (see backend/utils/executor.py)
+# Thread pool: file I/O and subprocess-bound work (FFmpeg, LibreOffice, archives)
+THREAD_WORKERS = _env_int("THREAD_WORKERS", min(32, CPU_COUNT + 4))
+# Process pool: CPU-bound Pillow / PyMuPDF / parsing work. 0 disables it and
+# routes everything through the thread pool (e.g. serverless without /dev/shm)
+PROCESS_WORKERS = _env_int("PROCESS_WORKERS", CPU_COUNT)
+
+# Background jobs (see backend/utils/jobs.py)
+# Finished jobs are forgotten after this many seconds; their output files are kept
+JOB_TTL_SECONDS = _env_int("JOB_TTL_SECONDS", 3600)
+
+# Result cache (see backend/utils/cache.py). CACHE_MAX_MB=0 disables it
+CACHE_DIR = os.environ.get("FORMATR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "formatr_cache")
+CACHE_MAX_MB = _env_int("CACHE_MAX_MB", 1024)
+
+# PDF page previews (GET /api/pdf/{doc_id}/page/{n}): documents kept open per
+# worker process, so scrolling through pages does not re-parse the file
+PDF_OPEN_DOCUMENTS = _env_int("PDF_OPEN_DOCUMENTS", 8)
+
+# Long videos (see AVProcessor.transcode_segmented): inputs of at least this
+# many seconds whose video is re-encoded are split at keyframes and the pieces
+# encoded by SEGMENT_WORKERS FFmpeg processes at once. 0 disables
+SEGMENT_MIN_SECONDS = _env_int("SEGMENT_MIN_SECONDS", 120)
+SEGMENT_WORKERS = _env_int("SEGMENT_WORKERS", CPU_COUNT)
+
+# Upload size limits in MB per file category (see SmartDetector categories).
+# Override one with e.g. FORMATR_MAX_UPLOAD_MB_VIDEO=20480
+UPLOAD_LIMITS_MB = {
+    category: _env_int(f"MAX_UPLOAD_MB_{category.upper()}", default)
+    for category, default in {
+        "image": 100,
+        "document": 500,
+        "office": 500,
+        "data": 2048,
+        "developer": 2048,  # JSON/YAML/XML; JSON -> CSV streams large arrays
+        "archive": 4096,
+        "audio": 2048,
+        "video": 10240,
+        "default": 100,
+    }.items()
+}
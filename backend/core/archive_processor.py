@@ -5,6 +5,8 @@ import tarfile
 import py7zr
 
 class ArchiveProcessor:
+    POOL = "thread"  # zlib and file I/O release the GIL
+
     @staticmethod
     def convert_archive(input_path: str, target_format: str, output_dir: str) -> str:
         """
@@ -1,36 +1,205 @@
 import os
+import re
+import json
+import bisect
+import tempfile
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from backend import config
+from backend.utils import progress
+
+# Codecs each output container can hold, per stream type, and the encoder used
+# for streams it cannot. None accepts any codec; an encoder of None drops the
+# stream instead. Formats not listed are left to FFmpeg's defaults.
+TEXT_SUBTITLES = {"subrip", "ass", "ssa", "webvtt", "mov_text", "text"}
+BITMAP_SUBTITLES = {"hdmv_pgs_subtitle", "dvd_subtitle", "dvb_subtitle"}
+_MP4_AUDIO = {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"}
+CONTAINER_CODECS = {
+    "mp4": {
+        "video": ({"h264", "hevc", "mpeg4", "av1"}, "libx264"),
+        "audio": (_MP4_AUDIO, "aac"),
+        "subtitle": ({"mov_text"}, "mov_text"),
+    },
+    "mov": {
+        "video": ({"h264", "hevc", "mpeg4", "prores", "mjpeg"}, "libx264"),
+        "audio": (_MP4_AUDIO | {"pcm_s16le", "pcm_s24le"}, "aac"),
+        "subtitle": ({"mov_text"}, "mov_text"),
+    },
+    "mkv": {
+        "video": (None, None),
+        "audio": (None, None),
+        "subtitle": (TEXT_SUBTITLES - {"mov_text"} | BITMAP_SUBTITLES, "srt"),
+        "attachment": (None, None),
+    },
+    "webm": {
+        "video": ({"vp8", "vp9", "av1"}, "libvpx-vp9"),
+        "audio": ({"opus", "vorbis"}, "libopus"),
+        "subtitle": ({"webvtt"}, "webvtt"),
+    },
+    "avi": {
+        "video": ({"mpeg4", "h264", "mjpeg"}, "mpeg4"),
+        "audio": ({"mp3", "ac3", "pcm_s16le"}, "libmp3lame"),
+    },
+    "mp3": {"audio": ({"mp3"}, "libmp3lame")},
+    "m4a": {"audio": ({"aac", "alac"}, "aac")},
+    "aac": {"audio": ({"aac"}, "aac")},
+    "ogg": {"audio": ({"vorbis", "opus", "flac"}, "libvorbis")},
+    "opus": {"audio": ({"opus"}, "libopus")},
+    "flac": {"audio": ({"flac"}, "flac")},
+    "wav": {"audio": ({"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}, "pcm_s16le")},
+}
+# Encoder for containers that take any video codec (FFmpeg's own default for MKV)
+DEFAULT_VIDEO_ENCODER = "libx264"
+# Encoder options for video_to_gif's output formats
+ANIMATION_FORMATS = {
+    "gif": ["-loop", "0"],
+    "webp": ["-c:v", "libwebp_anim", "-quality", "75", "-loop", "0"],
+    "mp4": ["-c:v", "libx264", "-crf", "23", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+}
+# Encoders for renditions in containers that take any codec (MKV)
+DEFAULT_AUDIO_ENCODER = "aac"
+# "mp4:720p:2M" -> format, then options: a height ("720p") and/or a bitrate ("128k", "2M")
+_RENDITION_OPTION = re.compile(r"^(?:(?P<height>\d+)p|(?P<bitrate>\d+(?:\.\d+)?)(?P<unit>[km]))$", re.I)
+# How much of FFmpeg's stderr is kept for error messages
+STDERR_TAIL_BYTES = 16 * 1024
 
 class AVProcessor:
+    POOL = "thread"  # work happens in the ffmpeg subprocess
+
     @staticmethod
     def check_ffmpeg():
         if not shutil.which("ffmpeg"):
             raise EnvironmentError("FFmpeg not found in system PATH.")
 
+    @staticmethod
+    def run_ffmpeg(cmd: list, part: str = None, tracker: progress.Progress = None):
+        """
+        Run an FFmpeg command. With `part`, its `-progress` output is read as
+        it is written and each update (media seconds and frames done) goes to
+        `tracker`, by default the current job's Progress.
+        stderr is written to a temporary file instead of memory; on failure
+        raises CalledProcessError with its last STDERR_TAIL_BYTES as `stderr`.
+        """
+        tracker = tracker or progress.current()
+        report = part is not None and tracker is not None
+        if report:
+            cmd = cmd[:1] + ["-nostats", "-progress", "pipe:1"] + cmd[1:]
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE if report else subprocess.DEVNULL, stderr=errors)
+            if report:
+                # key=value lines; each block ends with progress=continue|end
+                block = {}
+                for line in process.stdout:
+                    key, _, value = line.decode(errors="replace").strip().partition("=")
+                    block[key] = value
+                    if key == "progress":
+                        out_us = block.get("out_time_us", "N/A")
+                        seconds = int(out_us) / 1e6 if out_us.lstrip("-").isdigit() else 0.0
+                        tracker.update(part, max(seconds, 0.0), int(block.get("frame") or 0))
+                        block = {}
+            if process.wait() != 0:
+                errors.seek(max(0, errors.tell() - STDERR_TAIL_BYTES))
+                raise subprocess.CalledProcessError(process.returncode, cmd, stderr=errors.read())
+
+    @staticmethod
+    def _expect(info: dict, passes: int = 1):
+        """Tell the current job's Progress how many media seconds are coming"""
+        tracker = progress.current()
+        if tracker is not None and info:
+            tracker.expect(passes * float(info.get("format", {}).get("duration") or 0))
+
+    @staticmethod
+    def probe(file_path: str) -> dict:
+        """
+        Stream and format info from ffprobe, or None when ffprobe is not
+        installed or cannot read the file.
+        """
+        if not shutil.which("ffprobe"):
+            return None
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=index,codec_type,codec_name:stream_disposition=attached_pic:format=format_name,duration",
+            "-of", "json", file_path
+        ]
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            return None
+        return json.loads(process.stdout)
+
+    @staticmethod
+    def stream_args(streams: list, target_format: str, video: str = None) -> list:
+        """
+        FFmpeg output arguments that copy every stream the target container
+        can hold and transcode only the others. Streams the container has no
+        place for (video in an audio format, attachments, data) are dropped,
+        and audio formats keep only the first audio track.
+        `video` is a stream specifier (e.g. "1:v:0") for video that is already
+        encoded; it is copied in place of the first video stream and any other
+        video streams are dropped.
+        Returns None for formats without a codec table.
+        """
+        container = CONTAINER_CODECS.get(target_format)
+        if container is None:
+            return None
+        args, out, video_mapped = [], 0, False
+        for stream in streams:
+            kind = stream.get("codec_type")
+            if kind == "video" and stream.get("disposition", {}).get("attached_pic"):
+                continue  # cover art, not a video track
+            if kind not in container:
+                continue
+            if kind == "video" and video:
+                if not video_mapped:
+                    args += ["-map", video, f"-c:{out}", "copy"]
+                    video_mapped, out = True, out + 1
+                continue
+            accepted, encoder = container[kind]
+            copy = accepted is None or stream.get("codec_name") in accepted
+            if not copy and (encoder is None or kind == "subtitle" and stream.get("codec_name") not in TEXT_SUBTITLES):
+                continue  # e.g. bitmap subtitles cannot become text ones
+            args += ["-map", f"0:{stream['index']}", f"-c:{out}", "copy" if copy else encoder]
+            if copy and stream.get("codec_name") == "hevc" and target_format in ("mp4", "mov"):
+                args += [f"-tag:{out}", "hvc1"]  # the tag Apple players expect
+            out += 1
+            if set(container) == {"audio"}:
+                break
+        if not args:
+            raise ValueError(f"No streams in the input can be written as {target_format}")
+        return args
+
     @staticmethod
     def convert_media(file_path: str, target_format: str, output_dir: str = None) -> str:
         """
         Convert audio or video to target format using FFmpeg.
+        Streams whose codec the target container supports are copied
+        (remuxed) rather than re-encoded; see stream_args.
         """
         try:
             filename = os.path.basename(file_path)
             name_no_ext = os.path.splitext(filename)[0]
+            target_format = target_format.lower().lstrip(".")
             output_path = os.path.join(output_dir, f"{name_no_ext}.{target_format}")
             
             # Ensure ffmpeg is available
             AVProcessor.check_ffmpeg()
             
-            cmd = [
-                "ffmpeg",
-                "-i", file_path,
-                output_path
-            ]
+            info = AVProcessor.probe(file_path)
+            AVProcessor._expect(info)
+            args = AVProcessor.stream_args(info.get("streams", []), target_format) if info else None
+            encoder = AVProcessor._video_encoder(info, args, target_format)
+            if encoder and AVProcessor.segmentable(info):
+                return AVProcessor.transcode_segmented(file_path, output_path, info, ["-c:v", encoder])
+
+            cmd = ["ffmpeg", "-y", "-i", file_path]
+            if args:
+                cmd += args
+            cmd.append(output_path)
             
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            AVProcessor.run_ffmpeg(cmd, part="convert")
             return output_path
         except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"FFmpeg conversion failed: {e.stderr.decode()}")
+            raise RuntimeError(f"FFmpeg conversion failed: {e.stderr.decode(errors='replace')}")
             
     @staticmethod
     def compress_video(file_path: str, target_res: str = None, bitrate: str = None) -> str:
@@ -44,61 +213,254 @@ class AVProcessor:
         base, ext = os.path.splitext(file_path)
         output_path = f"{base}_compressed{ext}"
         
-        cmd = ["ffmpeg", "-i", file_path, "-y"]
-        
+        video_args = []
         if target_res:
             # simple scaling
-            cmd.extend(["-vf", f"scale={target_res}"])
+            video_args.extend(["-vf", f"scale={target_res}"])
             
         if bitrate:
-            cmd.extend(["-b:v", bitrate])
+            video_args.extend(["-b:v", bitrate])
             
+        container = CONTAINER_CODECS.get(ext.lower().lstrip("."), {})
+        info = AVProcessor.probe(file_path)
+        AVProcessor._expect(info)
+        if "video" in container and AVProcessor.segmentable(info):
+            encoder = container["video"][1] or DEFAULT_VIDEO_ENCODER
+            return AVProcessor.transcode_segmented(file_path, output_path, info, video_args + ["-c:v", encoder])
+
+        cmd = ["ffmpeg", "-i", file_path, "-y"] + video_args
         cmd.append(output_path)
         
-        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if process.returncode != 0:
-            raise RuntimeError(f"FFmpeg compression failed: {process.stderr.decode()}")
+        try:
+            AVProcessor.run_ffmpeg(cmd, part="compress")
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"FFmpeg compression failed: {e.stderr.decode(errors='replace')}")
             
         return output_path
     
     @staticmethod
-    def video_to_gif(file_path: str, output_dir: str, fps: int = 10, width: int = 480) -> str:
+    def _video_encoder(info: dict, args: list, target_format: str) -> str:
+        """Encoder convert_media uses for the first video stream, None if it is copied or absent"""
+        if not args or "video" not in CONTAINER_CODECS[target_format]:
+            return None
+        for stream in info["streams"]:
+            if stream.get("codec_type") == "video" and not stream.get("disposition", {}).get("attached_pic"):
+                position = args.index(f"0:{stream['index']}")
+                codec = args[position + 2]
+                return None if codec == "copy" else codec
+        return None
+
+    @staticmethod
+    def segmentable(info: dict) -> bool:
+        """Whether a probed input is long enough to be encoded in segments"""
+        if not info or config.SEGMENT_MIN_SECONDS <= 0 or config.SEGMENT_WORKERS < 2:
+            return False
+        duration = float(info.get("format", {}).get("duration") or 0)
+        return duration >= config.SEGMENT_MIN_SECONDS
+
+    @staticmethod
+    def keyframe_times(file_path: str) -> list:
+        """Timestamps of the first video stream's keyframes, read from packet flags without decoding"""
+        cmd = [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", file_path
+        ]
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        times = []
+        for line in process.stdout.decode().splitlines():
+            pts, _, flags = line.partition(",")
+            if "K" in flags and pts not in ("", "N/A"):
+                times.append(float(pts))
+        return sorted(times)
+
+    @staticmethod
+    def segment_times(keyframes: list, duration: float, parts: int) -> list:
         """
-        Convert video to optimized GIF with palette generation.
+        Cut points that split `duration` into about `parts` equal pieces, each
+        moved forward to the next keyframe so the pieces can be cut without
+        re-encoding.
+        """
+        cuts = []
+        for i in range(1, parts):
+            position = bisect.bisect_left(keyframes, duration * i / parts)
+            if position < len(keyframes) and keyframes[position] > (cuts[-1] if cuts else 0):
+                cuts.append(keyframes[position])
+        return cuts
+
+    @staticmethod
+    def transcode_segmented(file_path: str, output_path: str, info: dict, video_args: list) -> str:
+        """
+        Re-encode the first video stream in pieces, SEGMENT_WORKERS FFmpeg
+        processes at a time:
+        1. split it at keyframes by stream copy (segment muxer);
+        2. encode each piece with `video_args`;
+        3. join the pieces with the concat demuxer, copying them, and mux in
+           the input's other streams as convert_media would.
+        Audio is encoded once in step 3, so there are no gaps at the joins.
+        Each piece reports to the current job's Progress as its own part.
+        """
+        target_format = os.path.splitext(output_path)[1].lower().lstrip(".")
+        duration = float(info["format"]["duration"])
+        workers = config.SEGMENT_WORKERS
+        cuts = AVProcessor.segment_times(AVProcessor.keyframe_times(file_path), duration, workers)
+        threads = str(max(1, config.CPU_COUNT // workers))
+        tracker = progress.current()  # pool threads below do not inherit the context
+
+        work_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(file_path))
+        try:
+            split_cmd = ["ffmpeg", "-v", "error", "-i", file_path, "-map", "0:v:0", "-c", "copy", "-f", "segment"]
+            if cuts:
+                split_cmd += ["-segment_times", ",".join(f"{t:.6f}" for t in cuts)]
+            split_cmd += ["-reset_timestamps", "1", os.path.join(work_dir, "part_%04d.mkv")]
+            AVProcessor.run_ffmpeg(split_cmd)
+            parts = sorted(name for name in os.listdir(work_dir) if name.startswith("part_"))
+
+            def encode(name):
+                encoded = os.path.join(work_dir, f"encoded_{name}")
+                cmd = ["ffmpeg", "-v", "error", "-i", os.path.join(work_dir, name), "-map", "0:v:0"]
+                cmd += video_args + ["-threads", threads, encoded]
+                AVProcessor.run_ffmpeg(cmd, part=name, tracker=tracker)
+                return encoded
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                encoded = list(pool.map(encode, parts))
+
+            list_path = os.path.join(work_dir, "parts.txt")
+            with open(list_path, "w") as f:
+                f.writelines(f"file '{os.path.basename(path)}'\n" for path in encoded)  # relative to the list
+            join_cmd = ["ffmpeg", "-y", "-i", file_path, "-f", "concat", "-safe", "0", "-i", list_path]
+            join_cmd += AVProcessor.stream_args(info["streams"], target_format, video="1:v:0")
+            join_cmd.append(output_path)
+            AVProcessor.run_ffmpeg(join_cmd)
+            return output_path
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"FFmpeg segmented encode failed: {e.stderr.decode(errors='replace')}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def video_to_gif(file_path: str, output_dir: str, fps: int = 10, width: int = 480, target_format: str = "gif") -> str:
+        """
+        Convert video to an animation, decoding the source once.
         fps: frames per second (lower = smaller file)
         width: output width in pixels (height auto-scaled)
+        target_format: "gif" (palette generated from the clip itself),
+        "webp" (animated WebP) or "mp4" (muted H.264, for <video autoplay loop muted>);
+        WebP and MP4 are usually several times smaller and faster to encode.
         """
         AVProcessor.check_ffmpeg()
         
+        target_format = target_format.lower().lstrip(".")
+        if target_format not in ANIMATION_FORMATS:
+            raise ValueError(f"Unsupported animation format: {target_format}")
         filename = os.path.basename(file_path)
         name_no_ext = os.path.splitext(filename)[0]
-        output_path = os.path.join(output_dir, f"{name_no_ext}.gif")
-        palette_path = os.path.join(output_dir, f"{name_no_ext}_palette.png")
+        output_path = os.path.join(output_dir, f"{name_no_ext}.{target_format}")
+        
+        frames = f"fps={fps},scale={width}:{'-2' if target_format == 'mp4' else '-1'}:flags=lanczos"
+        cmd = ["ffmpeg", "-y", "-i", file_path]
+        if target_format == "gif":
+            # One decode: split the frames, build the palette from one copy and apply it to the other
+            cmd += ["-filter_complex", f"[0:v:0]{frames},split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+        else:
+            cmd += ["-map", "0:v:0", "-vf", frames]
+        cmd += ANIMATION_FORMATS[target_format] + ["-an", output_path]
         
+        AVProcessor._expect(AVProcessor.probe(file_path))
         try:
-            # Step 1: Generate palette for better quality
-            palette_cmd = [
-                "ffmpeg", "-i", file_path,
-                "-vf", f"fps={fps},scale={width}:-1:flags=lanczos,palettegen",
-                "-y", palette_path
-            ]
-            subprocess.run(palette_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Step 2: Create GIF using palette
-            gif_cmd = [
-                "ffmpeg", "-i", file_path, "-i", palette_path,
-                "-lavfi", f"fps={fps},scale={width}:-1:flags=lanczos[x];[x][1:v]paletteuse",
-                "-y", output_path
-            ]
-            subprocess.run(gif_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Cleanup palette
-            if os.path.exists(palette_path):
-                os.remove(palette_path)
-            
+            AVProcessor.run_ffmpeg(cmd, part="animation")
             return output_path
         except subprocess.CalledProcessError as e:
-            if os.path.exists(palette_path):
-                os.remove(palette_path)
-            raise RuntimeError(f"Video to GIF conversion failed: {e.stderr.decode()}")
+            raise RuntimeError(f"Video to {target_format.upper()} conversion failed: {e.stderr.decode(errors='replace')}")
+
+    @staticmethod
+    def parse_renditions(spec: str) -> list:
+        """
+        Parse a comma-separated rendition list such as "mp3:128k,m4a:256k,opus:64k"
+        or "mp4:1080p,mp4:720p:2M,mp4:480p". Each entry is a format with an
+        optional output height and bitrate (the video bitrate for video formats).
+        """
+        renditions = []
+        for entry in filter(None, (part.strip() for part in spec.split(","))):
+            target_format, *options = entry.split(":")
+            target_format = target_format.lower()
+            container = CONTAINER_CODECS.get(target_format)
+            if container is None:
+                raise ValueError(f"Unsupported rendition format: {target_format}")
+            rendition = {"format": target_format, "height": None, "bitrate": None, "video": "video" in container}
+            for option in options:
+                match = _RENDITION_OPTION.match(option)
+                if match is None:
+                    raise ValueError(f"Invalid rendition option '{option}' in '{entry}'")
+                if match["height"] is not None:
+                    if not rendition["video"]:
+                        raise ValueError(f"{target_format} has no video to scale to {option}")
+                    rendition["height"] = int(match["height"])
+                else:
+                    # FFmpeg reads a lowercase "m" as milli
+                    rendition["bitrate"] = match["bitrate"] + ("k" if match["unit"] in "kK" else "M")
+            renditions.append(rendition)
+        if not renditions:
+            raise ValueError("No renditions given")
+        return renditions
+
+    @staticmethod
+    def rendition_filenames(renditions: list, base: str) -> list:
+        """Output names like clip_720p.mp4 or clip_128k.mp3, numbered when two would clash"""
+        names, seen = [], {}
+        for rendition in renditions:
+            label = [f"{rendition['height']}p"] if rendition["height"] else []
+            if rendition["bitrate"]:
+                label.append(rendition["bitrate"])
+            stem = "_".join([base] + label)
+            seen[(stem, rendition["format"])] = count = seen.get((stem, rendition["format"]), 0) + 1
+            names.append(f"{stem}{'_' + str(count) if count > 1 else ''}.{rendition['format']}")
+        return names
+
+    @staticmethod
+    def render_renditions(file_path: str, renditions: list, output_paths: list) -> list:
+        """
+        Encode every rendition in one FFmpeg run, so the source is read and
+        decoded once. Scaled video renditions share one decoded stream through
+        a split filter; audio renditions share the decoded audio.
+        """
+        AVProcessor.check_ffmpeg()
+        info = AVProcessor.probe(file_path) or {}
+        kinds = {stream.get("codec_type") for stream in info.get("streams", [])
+                 if not stream.get("disposition", {}).get("attached_pic")}
+        if any(r["video"] for r in renditions) and "video" not in kinds:
+            raise ValueError("The input has no video stream")
+        if not all(r["video"] for r in renditions) and "audio" not in kinds:
+            raise ValueError("The input has no audio stream")
 
+        cmd = ["ffmpeg", "-y", "-i", file_path]
+        scaled = [i for i, r in enumerate(renditions) if r["height"]]
+        if scaled:
+            graph = f"[0:v:0]split={len(scaled)}" + "".join(f"[s{i}]" for i in scaled) + ";"
+            graph += ";".join(f"[s{i}]scale=-2:{renditions[i]['height']}:flags=lanczos[v{i}]" for i in scaled)
+            cmd += ["-filter_complex", graph]
+
+        for i, (rendition, output_path) in enumerate(zip(renditions, output_paths)):
+            container = CONTAINER_CODECS[rendition["format"]]
+            audio_encoder = container["audio"][1] or DEFAULT_AUDIO_ENCODER
+            if rendition["video"]:
+                cmd += ["-map", f"[v{i}]" if rendition["height"] else "0:v:0"]
+                cmd += ["-c:v", container["video"][1] or DEFAULT_VIDEO_ENCODER]
+                if rendition["bitrate"]:
+                    cmd += ["-b:v", rendition["bitrate"]]
+                if "audio" in kinds:
+                    cmd += ["-map", "0:a:0", "-c:a", audio_encoder]
+                if rendition["format"] in ("mp4", "mov"):
+                    cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+            else:
+                cmd += ["-map", "0:a:0", "-c:a", audio_encoder]
+                if rendition["bitrate"]:
+                    cmd += ["-b:a", rendition["bitrate"]]
+            cmd.append(output_path)
+
+        AVProcessor._expect(info)
+        try:
+            AVProcessor.run_ffmpeg(cmd, part="renditions")
+            return output_paths
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"FFmpeg renditions failed: {e.stderr.decode(errors='replace')}")
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import os
+
+# Helpers shared by the processors' in-memory (`*_buffer`) variants.
+# Buffer variants take the upload as bytes plus its original filename and
+# return (BytesIO, output_filename) instead of writing into an output dir.
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def save_buffer(buffer: io.BytesIO, output_dir: str, filename: str) -> str:
+    """
+    Write a buffer variant's result to disk for the path-based methods.
+    """
+    output_path = os.path.join(output_dir, filename)
+    with open(output_path, 'wb') as f:
+        f.write(buffer.getbuffer())
+    return output_path
+
+
+def text_buffer(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def text_reader(data: bytes, newline: str = None) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline=newline)
+
+
+def decode_text(data: bytes) -> str:
+    # Same newline handling as open(path, 'r')
+    return text_reader(data).read()
+
+
+@contextlib.contextmanager
+def text_writer(buffer: io.BytesIO, newline: str = None):
+    """
+    Text-mode view of a BytesIO that leaves the buffer open afterwards.
+    """
+    wrapper = io.TextIOWrapper(buffer, encoding='utf-8', newline=newline)
+    try:
+        yield wrapper
+    finally:
+        wrapper.flush()
+        wrapper.detach()
@@ -1,124 +1,117 @@
 import os
+import io
+import re
 import jsbeautifier
 import cssbeautifier
 from bs4 import BeautifulSoup
+from backend.core.buffers import decode_text, read_file, save_buffer, text_buffer
 
 class CodeFormatter:
+    POOL = "process"  # beautifiers are pure Python
+
+    # Path-based methods read the file, run the in-memory variant and write the result
+
     @staticmethod
     def beautify_js(input_path: str, output_dir: str) -> str:
         """Beautify/prettify JavaScript code"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.beautify_js_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def beautify_js_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}_formatted{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
+        code = decode_text(data)
+
         opts = jsbeautifier.default_options()
         opts.indent_size = 2
         formatted = jsbeautifier.beautify(code, opts)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(formatted)
-        
-        return output_path
-    
+
+        return text_buffer(formatted), f"{name}_formatted{ext}"
+
     @staticmethod
     def minify_js(input_path: str, output_dir: str) -> str:
         """Minify JavaScript code (basic)"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.minify_js_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def minify_js_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.min{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
+        code = decode_text(data)
+
         # Basic minification: remove comments and extra whitespace
         lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('//')]
         minified = ' '.join(lines)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(minified)
-        
-        return output_path
-    
+
+        return text_buffer(minified), f"{name}.min{ext}"
+
     @staticmethod
     def beautify_css(input_path: str, output_dir: str) -> str:
         """Beautify/prettify CSS code"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.beautify_css_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def beautify_css_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}_formatted{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
+        code = decode_text(data)
+
         opts = cssbeautifier.default_options()
         opts.indent_size = 2
         formatted = cssbeautifier.beautify(code, opts)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(formatted)
-        
-        return output_path
-    
+
+        return text_buffer(formatted), f"{name}_formatted{ext}"
+
     @staticmethod
     def minify_css(input_path: str, output_dir: str) -> str:
         """Minify CSS code (basic)"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.minify_css_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def minify_css_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.min{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
+        code = decode_text(data)
+
         # Basic minification: remove comments and extra whitespace
-        import re
         minified = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
         minified = re.sub(r'\s+', ' ', minified)
         minified = minified.replace(' {', '{').replace('{ ', '{')
         minified = minified.replace(' }', '}').replace('} ', '}')
         minified = minified.replace(': ', ':').replace('; ', ';')
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(minified)
-        
-        return output_path
-    
+
+        return text_buffer(minified), f"{name}.min{ext}"
+
     @staticmethod
     def beautify_html(input_path: str, output_dir: str) -> str:
         """Beautify/prettify HTML code"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.beautify_html_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def beautify_html_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}_formatted{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            html = f.read()
-        
+        html = decode_text(data)
+
         soup = BeautifulSoup(html, 'html.parser')
         formatted = soup.prettify()
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(formatted)
-        
-        return output_path
-    
+
+        return text_buffer(formatted), f"{name}_formatted{ext}"
+
     @staticmethod
     def minify_html(input_path: str, output_dir: str) -> str:
         """Minify HTML code"""
-        filename = os.path.basename(input_path)
+        buffer, filename = CodeFormatter.minify_html_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def minify_html_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, ext = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.min{ext}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            html = f.read()
-        
+        html = decode_text(data)
+
         # Basic minification
-        import re
         minified = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
         minified = re.sub(r'\s+', ' ', minified)
         minified = minified.replace('> <', '><')
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(minified)
-        
-        return output_path
+
+        return text_buffer(minified), f"{name}.min{ext}"
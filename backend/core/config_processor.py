@@ -1,152 +1,154 @@
 import os
+import io
 import json
 try:
     import tomllib  # Python 3.11+
 except ImportError:
     import tomli as tomllib
 import yaml
+from backend.core.buffers import decode_text, read_file, save_buffer, text_buffer, text_reader
 
 class ConfigProcessor:
+    POOL = "thread"  # small files, not worth the IPC
+
+    # Path-based methods read the file, run the in-memory variant and write the result
+
     @staticmethod
     def toml_to_json(input_path: str, output_dir: str) -> str:
         """Convert TOML to JSON"""
-        filename = os.path.basename(input_path)
+        buffer, filename = ConfigProcessor.toml_to_json_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def toml_to_json_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.json")
-        
-        with open(input_path, 'rb') as f:
-            data = tomllib.load(f)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-        
-        return output_path
-    
+        parsed = tomllib.loads(decode_text(data))
+        return text_buffer(json.dumps(parsed, indent=2)), f"{name}.json"
+
     @staticmethod
     def toml_to_yaml(input_path: str, output_dir: str) -> str:
         """Convert TOML to YAML"""
-        filename = os.path.basename(input_path)
+        buffer, filename = ConfigProcessor.toml_to_yaml_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def toml_to_yaml_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.yaml")
-        
-        with open(input_path, 'rb') as f:
-            data = tomllib.load(f)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
-        
-        return output_path
-    
+        parsed = tomllib.loads(decode_text(data))
+        output = yaml.dump(parsed, default_flow_style=False, allow_unicode=True)
+        return text_buffer(output), f"{name}.yaml"
+
     @staticmethod
     def env_to_json(input_path: str, output_dir: str) -> str:
         """Convert .env file to JSON"""
-        filename = os.path.basename(input_path)
+        buffer, filename = ConfigProcessor.env_to_json_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def env_to_json_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.json")
-        
+
         env_vars = {}
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                
-                # Skip empty lines and comments
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Parse KEY=VALUE
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Remove quotes if present
-                    if value.startswith('"') and value.endswith('"'):
-                        value = value[1:-1]
-                    elif value.startswith("'") and value.endswith("'"):
-                        value = value[1:-1]
-                    
-                    env_vars[key] = value
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(env_vars, f, indent=2)
-        
-        return output_path
-    
+
+        for line_num, line in enumerate(text_reader(data), 1):
+            line = line.strip()
+
+            # Skip empty lines and comments
+            if not line or line.startswith('#'):
+                continue
+
+            # Parse KEY=VALUE
+            if '=' in line:
+                key, value = line.split('=', 1)
+                key = key.strip()
+                value = value.strip()
+
+                # Remove quotes if present
+                if value.startswith('"') and value.endswith('"'):
+                    value = value[1:-1]
+                elif value.startswith("'") and value.endswith("'"):
+                    value = value[1:-1]
+
+                env_vars[key] = value
+
+        return text_buffer(json.dumps(env_vars, indent=2)), f"{name}.json"
+
     @staticmethod
     def json_to_env(input_path: str, output_dir: str) -> str:
         """Convert JSON to .env file"""
-        filename = os.path.basename(input_path)
+        buffer, filename = ConfigProcessor.json_to_env_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def json_to_env_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.env")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("# Generated from JSON\n\n")
-            
-            for key, value in data.items():
-                # Quote values with spaces
-                if isinstance(value, str) and ' ' in value:
-                    f.write(f'{key}="{value}"\n')
-                else:
-                    f.write(f'{key}={value}\n')
-        
-        return output_path
-    
+        parsed = json.loads(decode_text(data))
+
+        lines = ["# Generated from JSON\n\n"]
+
+        for key, value in parsed.items():
+            # Quote values with spaces
+            if isinstance(value, str) and ' ' in value:
+                lines.append(f'{key}="{value}"\n')
+            else:
+                lines.append(f'{key}={value}\n')
+
+        return text_buffer("".join(lines)), f"{name}.env"
+
     @staticmethod
     def validate_env(input_path: str, output_dir: str) -> str:
         """Validate .env file and report issues"""
-        filename = os.path.basename(input_path)
+        buffer, filename = ConfigProcessor.validate_env_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def validate_env_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}_validation.txt")
-        
+
         issues = []
         seen_keys = {}
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                original_line = line
-                line = line.strip()
-                
-                # Skip empty lines and comments
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Check for = sign
-                if '=' not in line:
-                    issues.append(f"Line {line_num}: Missing '=' sign: {original_line.strip()}")
-                    continue
-                
-                key, value = line.split('=', 1)
-                key = key.strip()
-                
-                # Check for duplicate keys
-                if key in seen_keys:
-                    issues.append(f"Line {line_num}: Duplicate key '{key}' (first seen on line {seen_keys[key]})")
-                else:
-                    seen_keys[key] = line_num
-                
-                # Check for empty keys
-                if not key:
-                    issues.append(f"Line {line_num}: Empty key name")
-                
-                # Check for spaces in keys
-                if ' ' in key:
-                    issues.append(f"Line {line_num}: Key contains spaces: '{key}'")
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"ENV File Validation Report\n")
-            f.write(f"{'='*50}\n\n")
-            f.write(f"File: {filename}\n")
-            f.write(f"Total variables: {len(seen_keys)}\n\n")
-            
-            if issues:
-                f.write(f"Issues found: {len(issues)}\n\n")
-                for issue in issues:
-                    f.write(f"⚠️  {issue}\n")
+
+        for line_num, line in enumerate(text_reader(data), 1):
+            original_line = line
+            line = line.strip()
+
+            # Skip empty lines and comments
+            if not line or line.startswith('#'):
+                continue
+
+            # Check for = sign
+            if '=' not in line:
+                issues.append(f"Line {line_num}: Missing '=' sign: {original_line.strip()}")
+                continue
+
+            key, value = line.split('=', 1)
+            key = key.strip()
+
+            # Check for duplicate keys
+            if key in seen_keys:
+                issues.append(f"Line {line_num}: Duplicate key '{key}' (first seen on line {seen_keys[key]})")
             else:
-                f.write("✅ No issues found!\n")
-        
-        return output_path
+                seen_keys[key] = line_num
+
+            # Check for empty keys
+            if not key:
+                issues.append(f"Line {line_num}: Empty key name")
+
+            # Check for spaces in keys
+            if ' ' in key:
+                issues.append(f"Line {line_num}: Key contains spaces: '{key}'")
+
+        report = [
+            "ENV File Validation Report\n",
+            f"{'='*50}\n\n",
+            f"File: {filename}\n",
+            f"Total variables: {len(seen_keys)}\n\n",
+        ]
+        if issues:
+            report.append(f"Issues found: {len(issues)}\n\n")
+            for issue in issues:
+                report.append(f"⚠️  {issue}\n")
+        else:
+            report.append("✅ No issues found!\n")
+
+        return text_buffer("".join(report)), f"{name}_validation.txt"
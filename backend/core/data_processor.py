@@ -1,138 +1,685 @@
 import os
+import io
+import re
 import json
 import csv
+import datetime
+import itertools
+import time
 import openpyxl
 import xlrd
+from backend.core.buffers import text_reader, text_writer
+
+# Rows encoded per write() call by the streaming converters
+WRITE_BATCH_ROWS = 1000
+# Excel's per-sheet limit; longer outputs continue on a new sheet
+MAX_SHEET_ROWS = 1_048_576
+# Rows sampled to infer CSV column types for Excel output
+INFER_SAMPLE_ROWS = 1000
+
+# Summary written alongside the per-sheet files of an all-sheets export
+MANIFEST_NAME = "_manifest.json"
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+JSON_READ_CHUNK = 1024 * 1024
+_NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class _JSONStream:
+    """
+    Incremental reader over a text stream that decodes one JSON value at a time
+    with the C scanner (JSONDecoder.raw_decode), reading more input as needed.
+    """
+    def __init__(self, src):
+        self.src = src
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read(self, size: int):
+        chunk = self.src.read(size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input), not consumed."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if self.eof:
+                return ''
+            self._read(JSON_READ_CHUNK)
+
+    def value(self):
+        """Decode the value at the current (non-whitespace) position."""
+        size = JSON_READ_CHUNK
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the end of the buffer ("3" of "3.5e10") still
+                # decodes; only accept it once the next character cannot continue it
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads with the buffer so a large record is re-scanned only a few times
+            self._read(size)
+            size = max(size, len(self.buf))
+
+
+def iter_json_records(src):
+    """
+    Yield records from a JSON text stream one at a time: the elements of a
+    top-level array, or each value of an NDJSON (or single-object) document.
+    """
+    stream = _JSONStream(src)
+    if stream.peek() != '[':
+        while stream.peek():
+            yield stream.value()
+        return
+
+    stream.pos += 1
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        separator = stream.peek()
+        stream.pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Invalid JSON array: expected ',' or ']' but found {separator!r}")
+        stream.peek()
+
+
+_encode_cell = json.JSONEncoder(ensure_ascii=False).encode
+_DATE_TYPES = (datetime.date, datetime.time)
+
+
+def _json_float(value: float) -> str:
+    # Same spelling as json.dumps for the non-finite values
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return float.__repr__(value)
+
+
+# JSON text for flat scalar values, keyed by exact type (bool before int matters)
+_SCALAR_JSON = {
+    str: json.encoder.encode_basestring_ascii,
+    int: int.__repr__,
+    float: _json_float,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+}
+
+
+def flatten_record(record, prefix: str = '', out: dict = None) -> dict:
+    """
+    Flatten nested objects into dotted keys ({"a": {"b": 1}} -> {"a.b": 1}).
+    Lists and empty objects are kept as JSON text; non-object records become
+    a single "value" column.
+    """
+    if out is None:
+        out = {}
+        if type(record) is not dict:
+            record = {"value": record}
+    for key, value in record.items():
+        kind = type(value)
+        if kind is dict and value:
+            flatten_record(value, f"{prefix}{key}.", out)
+        elif kind is dict or kind is list:
+            out[prefix + key] = _encode_cell(value)
+        else:
+            out[prefix + key] = value
+    return out
+
+
+def collect_keys(record, fields: dict, prefix: str = ''):
+    """
+    Add the column names flatten_record() would produce to `fields` (an
+    insertion-ordered dict used as a set) without building the row.
+    """
+    if prefix == '' and type(record) is not dict:
+        fields.setdefault("value")
+        return
+    for key, value in record.items():
+        if type(value) is dict and value:
+            collect_keys(value, fields, f"{prefix}{key}.")
+        elif prefix + key not in fields:
+            fields[prefix + key] = None
+
+
+# Text patterns accepted as typed values. Ints are limited to 15 digits (Excel's
+# precision) and leading zeros are rejected so IDs and ZIP codes stay text.
+# Longer digit-only values are not floats either, for the same reason.
+_INT_TEXT = re.compile(r'-?(?:0|[1-9]\d{0,14})')
+_LONG_INT_TEXT = re.compile(r'-?\d{16,}')
+_FLOAT_TEXT = re.compile(r'-?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?')
+_DATE_TEXT = re.compile(r'\d{4}-\d{2}-\d{2}')
+_DATETIME_TEXT = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?')
+
+
+def _parse_int(text: str) -> int:
+    if not _INT_TEXT.fullmatch(text):
+        raise ValueError(text)
+    return int(text)
+
+
+def _parse_float(text: str) -> float:
+    if not _FLOAT_TEXT.fullmatch(text) or _LONG_INT_TEXT.fullmatch(text):
+        raise ValueError(text)
+    return float(text)
+
+
+def _parse_date(text: str) -> datetime.date:
+    if not _DATE_TEXT.fullmatch(text):
+        raise ValueError(text)
+    return datetime.date.fromisoformat(text)
+
+
+def _parse_datetime(text: str) -> datetime.datetime:
+    if not _DATETIME_TEXT.fullmatch(text):
+        raise ValueError(text)
+    return datetime.datetime.fromisoformat(text)
+
+
+# Tried in order; a column gets the first parser that accepts all its sampled values
+_COLUMN_PARSERS = [_parse_int, _parse_float, _parse_datetime, _parse_date]
+
+
+def infer_column_parsers(rows: list[list[str]]) -> list:
+    """
+    Pick a parser per column from sample rows (None = keep as text).
+    Empty cells are ignored; a column with no values stays text.
+    """
+    parsers = []
+    width = max((len(row) for row in rows), default=0)
+    for col in range(width):
+        values = [row[col] for row in rows if col < len(row) and row[col] != '']
+        parser = None
+        if values:
+            for candidate in _COLUMN_PARSERS:
+                try:
+                    for value in values:
+                        candidate(value)
+                except ValueError:
+                    continue
+                parser = candidate
+                break
+        parsers.append(parser)
+    return parsers
+
+
+def convert_row(row: list[str], parsers: list) -> list:
+    """
+    Apply column parsers to a CSV row. Values that do not parse stay text;
+    empty cells become blank cells.
+    """
+    out = []
+    for col, value in enumerate(row):
+        if value == '':
+            value = None
+        elif col < len(parsers) and parsers[col] is not None:
+            try:
+                value = parsers[col](value)
+            except ValueError:
+                pass
+        out.append(value)
+    return out
+
+
+def is_header_row(row: list[str], parsers: list) -> bool:
+    typed = [(value, parser) for value, parser in zip(row, parsers) if parser is not None and value != '']
+    if not typed:
+        return True
+    try:
+        for value, parser in typed:
+            parser(value)
+    except ValueError:
+        return True
+    return False
+
+
+def _xls_cell_value(cell, datemode: int):
+    if cell.ctype == xlrd.XL_CELL_EMPTY or cell.ctype == xlrd.XL_CELL_BLANK:
+        return None
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        try:
+            return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+        except xlrd.xldate.XLDateError:
+            return cell.value
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_ERROR:
+        return xlrd.error_text_from_code.get(cell.value, '#ERROR')
+    return cell.value
+
 
 class DataProcessor:
+    POOL = "process"  # pure-Python parsing of large sheets
+
+    # Each conversion is written once against file objects (`_csv_to_json` etc.).
+    # The path-based methods open files on disk; the `*_buffer` variants run the
+    # same code over in-memory buffers.
+
+    JSON_FORMATS = ["json", "ndjson"]
+
     @staticmethod
-    def csv_to_json(input_path: str, output_dir: str) -> str:
-        """Convert CSV to JSON without Pandas"""
+    def csv_to_json(input_path: str, output_dir: str, output_format: str = "json", compact: bool = False) -> str:
+        """Convert CSV to JSON (or NDJSON) without Pandas, one row at a time"""
         filename = os.path.basename(input_path)
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.json")
-        
-        data = []
-        with open(input_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-            
+        output_path = os.path.join(output_dir, f"{name}.{output_format.lower()}")
+
+        with open(input_path, 'r', encoding='utf-8', newline='') as src, open(output_path, 'w', encoding='utf-8') as dst:
+            DataProcessor._csv_to_json(src, dst, output_format, compact)
+
         return output_path
-    
+
+    @staticmethod
+    def csv_to_json_buffer(data: bytes, filename: str, output_format: str = "json", compact: bool = False) -> tuple[io.BytesIO, str]:
+        name, _ = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        with text_writer(buffer) as dst:
+            DataProcessor._csv_to_json(text_reader(data, newline=''), dst, output_format, compact)
+        return buffer, f"{name}.{output_format.lower()}"
+
+    @staticmethod
+    def _csv_to_json(src, dst, output_format: str = "json", compact: bool = False) -> int:
+        reader = csv.DictReader(src)
+        return DataProcessor._write_json_records(reader, dst, output_format, compact)
+
+    @staticmethod
+    def _write_json_records(records, dst, output_format: str = "json", compact: bool = False) -> int:
+        """
+        Write dicts to `dst` as they arrive, so memory does not grow with the
+        input. The default (indented array) output is identical to
+        json.dump(list(records), dst, indent=2). Returns the record count.
+        """
+        output_format = output_format.lower()
+        if output_format not in DataProcessor.JSON_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        if compact:
+            encode = json.JSONEncoder(separators=(',', ':')).encode
+        elif output_format == "ndjson":
+            encode = json.JSONEncoder().encode
+        else:
+            encode = DataProcessor._indented_encoder()
+
+        if output_format == "ndjson":
+            first, separator, end = '', '\n', '\n'
+        elif compact:
+            first, separator, end = '[', ',', ']'
+        else:
+            first, separator, end = '[\n  ', ',\n  ', '\n]'
+
+        # Encode in batches so large files are not written one small string at a time
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(encode(record))
+            if len(batch) == WRITE_BATCH_ROWS:
+                dst.write((first if count == 0 else separator) + separator.join(batch))
+                count += len(batch)
+                batch.clear()
+        if batch:
+            dst.write((first if count == 0 else separator) + separator.join(batch))
+            count += len(batch)
+
+        if count:
+            dst.write(end)
+        elif output_format == "json":
+            dst.write('[]')
+        return count
+
+    @staticmethod
+    def _indented_encoder():
+        """
+        Encoder for one element of an indent=2 array. json's indenting encoder
+        is pure Python and rebuilds itself on every call, so flat records of
+        scalars (CSV and sheet rows) are formatted directly; anything else goes
+        through json.
+        """
+        indented = json.JSONEncoder(indent=2).encode
+        quote = json.encoder.encode_basestring_ascii
+        scalar = _SCALAR_JSON
+
+        def encode(record):
+            if record and all(type(k) is str and type(v) in scalar for k, v in record.items()):
+                return '{\n    ' + ',\n    '.join(f'{quote(k)}: {scalar[type(v)](v)}' for k, v in record.items()) + '\n  }'
+            # Indent each element one level, as json.dump(..., indent=2) does
+            return indented(record).replace('\n', '\n  ')
+
+        return encode
+
     @staticmethod
     def json_to_csv(input_path: str, output_dir: str) -> str:
-        """Convert JSON to CSV without Pandas"""
+        """Convert a JSON array or NDJSON file to CSV without Pandas, one record at a time"""
         filename = os.path.basename(input_path)
         name, _ = os.path.splitext(filename)
         output_path = os.path.join(output_dir, f"{name}.csv")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if not data:
-            return output_path
-            
-        keys = data[0].keys()
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(data)
-            
+
+        with open(output_path, 'w', newline='', encoding='utf-8') as dst:
+            DataProcessor._json_to_csv(lambda: open(input_path, 'r', encoding='utf-8'), dst)
+
         return output_path
-    
+
+    @staticmethod
+    def json_to_csv_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, _ = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        with text_writer(buffer, newline='') as dst:
+            DataProcessor._json_to_csv(lambda: text_reader(data), dst)
+        return buffer, f"{name}.csv"
+
+    @staticmethod
+    def _json_to_csv(open_source, dst) -> int:
+        """
+        Two passes over the source (`open_source` returns a fresh text stream):
+        the first collects the union of (flattened) keys so fields that only
+        appear in later records still get a column, the second writes the rows.
+        Memory is bounded by one record plus the column names.
+        """
+        fields = {}
+        with open_source() as src:
+            for record in iter_json_records(src):
+                collect_keys(record, fields)
+
+        if not fields:
+            return 0
+
+        writer = csv.writer(dst)
+        writer.writerow(fields)
+        count = 0
+        batch = []
+        with open_source() as src:
+            for record in iter_json_records(src):
+                flat = flatten_record(record)
+                batch.append([flat.get(key) for key in fields])
+                if len(batch) == WRITE_BATCH_ROWS:
+                    writer.writerows(batch)
+                    count += len(batch)
+                    batch.clear()
+        writer.writerows(batch)
+        return count + len(batch)
+
     @staticmethod
     def csv_to_excel(input_path: str, output_dir: str) -> str:
         """Convert CSV to Excel (XLSX) without Pandas"""
         filename = os.path.basename(input_path)
         name, _ = os.path.splitext(filename)
         output_path = os.path.join(output_dir, f"{name}.xlsx")
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                ws.append(row)
-        
-        wb.save(output_path)
+
+        with open(input_path, 'r', encoding='utf-8', newline='') as src:
+            DataProcessor._csv_to_excel(src, output_path)
         return output_path
-    
+
+    @staticmethod
+    def csv_to_excel_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, _ = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        DataProcessor._csv_to_excel(text_reader(data, newline=''), buffer)
+        return buffer, f"{name}.xlsx"
+
+    @staticmethod
+    def _csv_to_excel(src, dst) -> int:
+        reader = csv.reader(src)
+        first = next(reader, None)
+        if first is None:
+            return DataProcessor._write_xlsx([], dst)
+
+        # Column types come from a bounded sample, so memory stays flat
+        sample = list(itertools.islice(reader, INFER_SAMPLE_ROWS))
+        parsers = infer_column_parsers(sample)
+
+        # The first row is a header unless it fits the inferred column types
+        header = None
+        rows = itertools.chain(sample, reader)
+        if is_header_row(first, parsers):
+            header = first
+        else:
+            rows = itertools.chain([first], rows)
+
+        return DataProcessor._write_xlsx((convert_row(row, parsers) for row in rows), dst, header)
+
+    @staticmethod
+    def _write_xlsx(rows, dst, header: list = None) -> int:
+        """
+        Write rows with a write-only workbook, which serializes each row as it
+        is appended instead of keeping a cell object per value. Past Excel's
+        row limit a new sheet is started, repeating the header.
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        ws = None
+        sheet_rows = MAX_SHEET_ROWS
+        count = 0
+        for row in rows:
+            if sheet_rows == MAX_SHEET_ROWS:
+                ws = wb.create_sheet(f"Sheet{len(wb.worksheets) + 1}")
+                sheet_rows = 0
+                if header is not None:
+                    ws.append(header)
+                    sheet_rows = 1
+            ws.append(row)
+            sheet_rows += 1
+            count += 1
+
+        if ws is None:
+            ws = wb.create_sheet("Sheet1")
+            if header is not None:
+                ws.append(header)
+        wb.save(dst)
+        return count
+
+    @staticmethod
+    def _iter_sheet_rows(source, ext: str, sheet: str = None):
+        """
+        Yield the rows of `sheet` (default: the first/active sheet) as they are
+        read. `source` is a path or a binary file object. XLSX is opened read-only, which parses the
+        sheet XML incrementally instead of building a cell object per value.
+        """
+        if ext.lower() == '.xls':
+            # Legacy XLS handling; xlrd parses the whole sheet, on_demand skips the others
+            if hasattr(source, 'read'):
+                rb = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+            else:
+                rb = xlrd.open_workbook(source, on_demand=True)
+            try:
+                ws = rb.sheet_by_index(0) if sheet is None else rb.sheet_by_name(sheet)
+                for row_idx in range(ws.nrows):
+                    yield [_xls_cell_value(cell, rb.datemode) for cell in ws.row(row_idx)]
+            finally:
+                rb.release_resources()
+        else:
+            # Modern XLSX handling
+            wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+            try:
+                ws = wb.active if sheet is None else wb[sheet]
+                yield from ws.iter_rows(values_only=True)
+            finally:
+                wb.close()
+
     @staticmethod
     def excel_to_csv(input_path: str, output_dir: str) -> str:
         """Convert Excel (XLSX/XLS) to CSV without Pandas"""
         filename = os.path.basename(input_path)
         name, ext = os.path.splitext(filename)
         output_path = os.path.join(output_dir, f"{name}.csv")
-        
-        data = []
-        if ext.lower() == '.xls':
-            # Legacy XLS handling
-            rb = xlrd.open_workbook(input_path)
-            sheet = rb.sheet_by_index(0)
-            for row_idx in range(sheet.nrows):
-                data.append(sheet.row_values(row_idx))
-        else:
-            # Modern XLSX handling
-            wb = openpyxl.load_workbook(input_path, data_only=True)
-            ws = wb.active
-            for row in ws.iter_rows(values_only=True):
-                data.append(list(row))
-        
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerows(data)
-            
+
+        with open(output_path, 'w', newline='', encoding='utf-8') as dst:
+            DataProcessor._excel_to_csv(input_path, ext, dst)
+
         return output_path
-    
+
+    @staticmethod
+    def excel_to_csv_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, ext = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        with text_writer(buffer, newline='') as dst:
+            DataProcessor._excel_to_csv(io.BytesIO(data), ext, dst)
+        return buffer, f"{name}.csv"
+
+    @staticmethod
+    def _excel_to_csv(source, ext: str, dst, sheet: str = None) -> int:
+        writer = csv.writer(dst)
+        count = 0
+        batch = []
+        for row in DataProcessor._iter_sheet_rows(source, ext, sheet):
+            batch.append(row)
+            if len(batch) == WRITE_BATCH_ROWS:
+                writer.writerows(batch)
+                count += len(batch)
+                batch.clear()
+        writer.writerows(batch)
+        return count + len(batch)
+
     @staticmethod
     def excel_to_json(input_path: str, output_dir: str) -> str:
         """Convert Excel (XLSX/XLS) to JSON without Pandas"""
         filename = os.path.basename(input_path)
         name, ext = os.path.splitext(filename)
         output_path = os.path.join(output_dir, f"{name}.json")
-        
-        rows = []
-        if ext.lower() == '.xls':
-            rb = xlrd.open_workbook(input_path)
-            sheet = rb.sheet_by_index(0)
-            header = sheet.row_values(0)
-            for row_idx in range(1, sheet.nrows):
-                row_data = dict(zip(header, sheet.row_values(row_idx)))
-                rows.append(row_data)
-        else:
-            wb = openpyxl.load_workbook(input_path, data_only=True)
-            ws = wb.active
-            rows_iter = ws.iter_rows(values_only=True)
-            header = next(rows_iter)
-            for row in rows_iter:
-                row_data = dict(zip(header, row))
-                rows.append(row_data)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(rows, f, indent=2)
-            
+
+        with open(output_path, 'w', encoding='utf-8') as dst:
+            DataProcessor._excel_to_json(input_path, ext, dst)
+
         return output_path
-    
+
+    @staticmethod
+    def excel_to_json_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, ext = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        with text_writer(buffer) as dst:
+            DataProcessor._excel_to_json(io.BytesIO(data), ext, dst)
+        return buffer, f"{name}.json"
+
+    @staticmethod
+    def _excel_to_json(source, ext: str, dst, sheet: str = None) -> int:
+        sheet_rows = DataProcessor._iter_sheet_rows(source, ext, sheet)
+        header = next(sheet_rows, None)
+        if header is None:
+            return DataProcessor._write_json_records([], dst)
+
+        # Dates and times have no JSON type; write them as ISO 8601 strings
+        records = (
+            {key: value.isoformat() if isinstance(value, _DATE_TYPES) else value for key, value in zip(header, row)}
+            for row in sheet_rows
+        )
+        return DataProcessor._write_json_records(records, dst)
+
+    @staticmethod
+    def list_sheets(input_path: str) -> list[str]:
+        """Names of every worksheet in an Excel (XLSX/XLS) file, in workbook order"""
+        if os.path.splitext(input_path)[1].lower() == '.xls':
+            rb = xlrd.open_workbook(input_path, on_demand=True)
+            try:
+                return rb.sheet_names()
+            finally:
+                rb.release_resources()
+        wb = openpyxl.load_workbook(input_path, read_only=True)
+        try:
+            return [ws.title for ws in wb.worksheets]
+        finally:
+            wb.close()
+
+    @staticmethod
+    def export_sheet(input_path: str, sheet: str, target_format: str, output_path: str) -> dict:
+        """
+        Convert one worksheet to CSV or JSON. Each call reopens the workbook, so
+        sheets can be exported by separate worker processes.
+        Returns the sheet's row count and conversion time.
+        """
+        ext = os.path.splitext(input_path)[1]
+        start = time.perf_counter()
+        if target_format == "csv":
+            with open(output_path, 'w', newline='', encoding='utf-8') as dst:
+                rows = DataProcessor._excel_to_csv(input_path, ext, dst, sheet)
+        elif target_format == "json":
+            with open(output_path, 'w', encoding='utf-8') as dst:
+                rows = DataProcessor._excel_to_json(input_path, ext, dst, sheet)
+        else:
+            raise ValueError(f"Unsupported format: {target_format}")
+
+        return {
+            "sheet": sheet,
+            "file": os.path.basename(output_path),
+            "rows": rows,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    @staticmethod
+    def sheet_filenames(sheets: list[str], target_format: str) -> list[str]:
+        """
+        One archive entry name per sheet. Sheet names may contain characters
+        that are unsafe in file names, and can collide once those are replaced.
+        """
+        names = []
+        seen = {MANIFEST_NAME.lower()}
+        for sheet in sheets:
+            base = _UNSAFE_FILENAME.sub('_', sheet).strip(' .') or "sheet"
+            name = f"{base}.{target_format}"
+            n = 2
+            while name.lower() in seen:
+                name = f"{base}_{n}.{target_format}"
+                n += 1
+            seen.add(name.lower())
+            names.append(name)
+        return names
+
     @staticmethod
     def xls_to_xlsx(input_path: str, output_dir: str) -> str:
         """Convert legacy Excel (XLS) to modern Excel (XLSX) without Pandas"""
         filename = os.path.basename(input_path)
         name, _ = os.path.splitext(filename)
         output_path = os.path.join(output_dir, f"{name}.xlsx")
-        
-        wb_new = openpyxl.Workbook()
-        ws_new = wb_new.active
-        
-        rb = xlrd.open_workbook(input_path)
-        sheet = rb.sheet_by_index(0)
-        
-        for row_idx in range(sheet.nrows):
-            ws_new.append(sheet.row_values(row_idx))
-            
-        wb_new.save(output_path)
+
+        DataProcessor._xls_to_xlsx(input_path, output_path)
         return output_path
+
+    @staticmethod
+    def xls_to_xlsx_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, _ = os.path.splitext(filename)
+        buffer = io.BytesIO()
+        DataProcessor._xls_to_xlsx(io.BytesIO(data), buffer)
+        return buffer, f"{name}.xlsx"
+
+    @staticmethod
+    def _xls_to_xlsx(source, dst) -> int:
+        """
+        Copy every sheet, under its own name, into a write-only workbook. XLS
+        sheets fit within XLSX's row limit, so no sheet needs splitting.
+        """
+        if hasattr(source, 'read'):
+            rb = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+        else:
+            rb = xlrd.open_workbook(source, on_demand=True)
+        wb = openpyxl.Workbook(write_only=True)
+        count = 0
+        try:
+            for index, name in enumerate(rb.sheet_names()):
+                rs = rb.sheet_by_index(index)
+                ws = wb.create_sheet(name)
+                # XLS cells are already typed (dates converted by _xls_cell_value)
+                for row_idx in range(rs.nrows):
+                    ws.append([_xls_cell_value(cell, rb.datemode) for cell in rs.row(row_idx)])
+                count += rs.nrows
+                rb.unload_sheet(index)
+        finally:
+            rb.release_resources()
+
+        if not wb.worksheets:
+            wb.create_sheet("Sheet1")
+        wb.save(dst)
+        return count
@@ -1,111 +1,108 @@
 import os
+import io
 import json
 import yaml
 import xmltodict
 import base64
 import markdown
 from xhtml2pdf import pisa
+from backend.core.buffers import decode_text, read_file, save_buffer, text_writer
 
 class DevProcessor:
+    POOL = "process"  # markdown + xhtml2pdf rendering
+
+    # Path-based methods read the file, run the in-memory variant and write the result
+
     @staticmethod
     def convert_config(input_path: str, target_format: str, output_dir: str) -> str:
         """
         Convert between JSON, YAML, and XML.
         """
-        filename = os.path.basename(input_path)
+        buffer, filename = DevProcessor.convert_config_buffer(read_file(input_path), os.path.basename(input_path), target_format)
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def convert_config_buffer(data: bytes, filename: str, target_format: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.{target_format}")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = decode_text(data)
 
         # Parse Input
-        data = None
+        parsed = None
         try:
             # Try parsing as JSON
-            data = json.loads(content)
+            parsed = json.loads(content)
         except json.JSONDecodeError:
             try:
                 # Try parsing as YAML
-                data = yaml.safe_load(content)
+                parsed = yaml.safe_load(content)
             except yaml.YAMLError:
                 try:
                     # Try parsing as XML
-                    data = xmltodict.parse(content)
-                    # xmltodict usually wraps root, unwrap if needed or keep consistent
-                    if len(data) == 1:
-                        key = list(data.keys())[0]
-                        # Optional: unwrap root if converting to JSON/YAML for cleaner structure?
-                        # For now keep it raw to ensure reversibility
+                    parsed = xmltodict.parse(content)
+                    # xmltodict usually wraps root; keep it raw to ensure reversibility
                 except Exception:
                     pass
-        
-        if data is None:
+
+        if parsed is None:
             raise ValueError("Could not parse input file. Ensure it is valid JSON, YAML, or XML.")
+        if target_format not in ('json', 'yaml', 'xml'):
+            raise ValueError(f"Unsupported target format: {target_format}")
 
         # Write Output
-        with open(output_path, 'w', encoding='utf-8') as f:
+        buffer = io.BytesIO()
+        with text_writer(buffer) as f:
             if target_format == 'json':
-                json.dump(data, f, indent=2)
+                json.dump(parsed, f, indent=2)
             elif target_format == 'yaml':
-                yaml.dump(data, f, default_flow_style=False)
-            elif target_format == 'xml':
-                # wrap in root if not present (xml must has single root)
-                if len(data) > 1:
-                    data = {'root': data}
-                xmltodict.unparse(data, f, pretty=True)
+                yaml.dump(parsed, f, default_flow_style=False)
             else:
-                raise ValueError(f"Unsupported target format: {target_format}")
-                
-        return output_path
+                # wrap in root if not present (xml must has single root)
+                if len(parsed) > 1:
+                    parsed = {'root': parsed}
+                xmltodict.unparse(parsed, f, pretty=True)
+
+        return buffer, f"{name}.{target_format}"
 
     @staticmethod
     def base64_encode(input_path: str, output_dir: str) -> str:
         """
         Encode file content to Base64 text file.
         """
-        filename = os.path.basename(input_path)
-        output_path = os.path.join(output_dir, f"{filename}.b64.txt")
-        
-        with open(input_path, 'rb') as f:
-            encoded = base64.b64encode(f.read()).decode('utf-8')
-            
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(encoded)
-            
-        return output_path
+        buffer, filename = DevProcessor.base64_encode_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def base64_encode_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        return io.BytesIO(base64.b64encode(data)), f"{filename}.b64.txt"
 
     @staticmethod
     def base64_decode(input_path: str, output_dir: str) -> str:
         """
         Decode Base64 text file back to original.
         """
-        filename = os.path.basename(input_path)
+        buffer, filename = DevProcessor.base64_decode_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def base64_decode_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         # Remove .b64.txt or .txt suffix
-        name = filename.replace('.b64.txt', '').replace('.txt', '')
         # If we don't know extension, default to .bin, but user usually converts "image.png.b64.txt" -> "image.png"
-        output_path = os.path.join(output_dir, name)
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            
-        with open(output_path, 'wb') as f:
-            f.write(base64.b64decode(content))
-            
-        return output_path
+        name = filename.replace('.b64.txt', '').replace('.txt', '')
+        return io.BytesIO(base64.b64decode(decode_text(data).strip())), name
 
     @staticmethod
     def md_to_pdf(input_path: str, output_dir: str) -> str:
         """
         Convert Markdown to PDF.
         """
-        filename = os.path.basename(input_path)
+        buffer, filename = DevProcessor.md_to_pdf_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def md_to_pdf_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
         name, _ = os.path.splitext(filename)
-        output_path = os.path.join(output_dir, f"{name}.pdf")
-        
-        with open(input_path, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-            
+        md_content = decode_text(data)
+
         # Convert MD to HTML
         html_content = markdown.markdown(md_content, extensions=['extra', 'codehilite', 'tables'])
         
@@ -130,10 +127,30 @@ class DevProcessor:
         """
         
         # Convert HTML to PDF
-        with open(output_path, "wb") as f:
-            pisa_status = pisa.CreatePDF(styled_html, dest=f)
+        buffer = io.BytesIO()
+        pisa_status = pisa.CreatePDF(styled_html, dest=buffer)
             
         if pisa_status.err:
             raise Exception("PDF generation failed")
             
-        return output_path
+        return buffer, f"{name}.pdf"
+
+    @staticmethod
+    def html_to_pdf(input_path: str, output_dir: str) -> str:
+        """
+        Convert an HTML file to PDF.
+        """
+        buffer, filename = DevProcessor.html_to_pdf_buffer(read_file(input_path), os.path.basename(input_path))
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def html_to_pdf_buffer(data: bytes, filename: str) -> tuple[io.BytesIO, str]:
+        name, _ = os.path.splitext(filename)
+
+        buffer = io.BytesIO()
+        pisa_status = pisa.CreatePDF(decode_text(data), dest=buffer)
+
+        if pisa_status.err:
+            raise Exception("HTML to PDF conversion failed")
+
+        return buffer, f"{name}.pdf"
@@ -9,6 +9,8 @@ from docx.shared import Inches
 import zipfile
 
 class DocProcessor:
+    POOL = "thread"  # LibreOffice / Word do the work out of process
+
     @staticmethod
     def get_soffice_path():
         # Common paths for Windows
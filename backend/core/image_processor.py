@@ -1,64 +1,153 @@
 import os
 import io
-from PIL import Image
+import math
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops, ImageOps, ImageStat, features
+from backend import config
+from backend.core.buffers import read_file, save_buffer
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# Target-size compression. JPEG/WebP are searched by quality, PNG by palette size;
+# "auto" tries each and keeps whichever fits with the least visible loss
+COMPRESS_FORMATS = {"jpeg": ("JPEG", "jpg"), "jpg": ("JPEG", "jpg"), "webp": ("WEBP", "webp"), "png": ("PNG", "png")}
+AUTO_FORMAT = "auto"
+MIN_QUALITY = 10
+MAX_QUALITY = 95
+MAX_ENCODES = 8
+PALETTE_COLORS = [256, 128, 64, 32, 16, 8, 4, 2]
+# (zlib level, strategy) pairs tried on the final PNG. The first, fast one is
+# also used while searching; level 9 is often several times slower
+PNG_ZLIB_SETTINGS = [
+    (6, zlib.Z_DEFAULT_STRATEGY), (6, zlib.Z_FILTERED), (6, zlib.Z_RLE),
+    (9, zlib.Z_DEFAULT_STRATEGY), (9, zlib.Z_FILTERED), (9, zlib.Z_RLE),
+]
+_ZLIB_STRATEGY_NAMES = {zlib.Z_DEFAULT_STRATEGY: "default", zlib.Z_FILTERED: "filtered", zlib.Z_RLE: "rle"}
+
+# Typical bits per pixel at a given JPEG quality. Only the curve's shape is
+# used (to turn a measured size ratio into a quality step), so it also
+# serves WebP and images that are far from typical.
+_QUALITY_BPP = [(10, 0.15), (30, 0.35), (50, 0.5), (70, 0.75), (80, 1.0), (90, 1.6), (95, 2.4)]
+
+
+def _interpolate(x: float, points: list, xi: int, yi: int) -> float:
+    # Piecewise-linear in log(bpp), clamped to the table's ends
+    pts = [(p[xi], p[yi]) for p in points]
+    if x <= pts[0][0]:
+        return pts[0][1]
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return pts[-1][1]
+
+
+def _bpp_for_quality(quality: float) -> float:
+    return math.exp(_interpolate(quality, [(q, math.log(b)) for q, b in _QUALITY_BPP], 0, 1))
+
+
+def _quality_for_bpp(bpp: float) -> float:
+    return _interpolate(math.log(bpp), [(q, math.log(b)) for q, b in _QUALITY_BPP], 1, 0)
+
+
+def _psnr(reference: Image.Image, data: bytes) -> float:
+    """
+    PSNR (dB) of an encoded image against the reference, capped at 100 for
+    identical pixels. With alpha, colors are compared premultiplied, so the
+    color hidden under fully transparent pixels does not count.
+    """
+    with Image.open(io.BytesIO(data)) as decoded:
+        decoded = decoded.convert(reference.mode)
+    if reference.mode == 'RGBA':
+        bands = [ImageChops.difference(reference.getchannel('A'), decoded.getchannel('A'))]
+        premultiplied = []
+        for image in (reference, decoded):
+            flat = Image.new('RGB', image.size)
+            flat.paste(image, mask=image.getchannel('A'))
+            premultiplied.append(flat)
+        bands.extend(ImageChops.difference(*premultiplied).split())
+    else:
+        bands = ImageChops.difference(reference, decoded).split()
+    mse = sum(ImageStat.Stat(band).rms[0] ** 2 for band in bands) / len(bands)
+    return round(10 * math.log10(255 * 255 / mse), 2) if mse > 1e-10 else 100.0
+
 
 class ImageProcessor:
+    POOL = "process"  # Pillow encode/decode is CPU-bound
+
     SUPPORTED_FORMATS = ['PNG', 'JPEG', 'JPG', 'WEBP']
 
+    # Path-based methods read the file, run the in-memory variant and write the result
+
+    @staticmethod
+    def _open(source, ext: str) -> Image.Image:
+        """
+        Open a path or binary file object. SVGs are rasterized to PNG first.
+        """
+        if ext.lower() == '.svg':
+            from svglib.svglib import svg2rlg
+            from reportlab.graphics import renderPM
+            drawing = svg2rlg(source)
+            return Image.open(io.BytesIO(renderPM.drawToString(drawing, fmt="PNG")))
+        return Image.open(source)
+
+    @staticmethod
+    def _to_rgb(img: Image.Image) -> Image.Image:
+        # Handle alpha channel for JPEG
+        if img.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            return background
+        return img.convert("RGB")
+
     @staticmethod
     def convert_image(file_path: str, target_format: str, output_dir: str = None) -> str:
         """
         Convert an image to a specific format.
         """
+        if output_dir is None:
+            output_dir = os.path.dirname(file_path)
+
+        buffer, filename = ImageProcessor.convert_image_buffer(read_file(file_path), os.path.basename(file_path), target_format)
+        return save_buffer(buffer, output_dir, filename)
+
+    @staticmethod
+    def convert_image_buffer(data: bytes, filename: str, target_format: str) -> tuple[io.BytesIO, str]:
         if target_format.upper() not in ImageProcessor.SUPPORTED_FORMATS:
             raise ValueError(f"Unsupported format: {target_format}")
 
-        filename = os.path.basename(file_path)
         name, ext = os.path.splitext(filename)
-        
-        if output_dir is None:
-            output_dir = os.path.dirname(file_path)
-            
-        output_path = os.path.join(output_dir, f"{name}.{target_format.lower()}")
-        
-        # Handle SVG separately
-        if ext.lower() == '.svg':
-            drawing = svg2rlg(file_path)
-            if target_format.lower() == 'png':
-                renderPM.drawToFile(drawing, output_path, fmt="PNG")
-            elif target_format.lower() == 'jpg' or target_format.lower() == 'jpeg':
-                renderPM.drawToFile(drawing, output_path, fmt="JPG")
-            else:
-                 # Fallback for others, render to PNG then convert
-                 temp_png = output_path + ".png"
-                 renderPM.drawToFile(drawing, temp_png, fmt="PNG")
-                 with Image.open(temp_png) as img:
-                     img.save(output_path)
-                 os.remove(temp_png)
-            return output_path
-
-        # Standard Image handling (includes HEIC, TIFF)
-        with Image.open(file_path) as img:
-            if target_format.upper() in ["JPG", "JPEG"]:
-                # Handle alpha channel for JPEG
-                if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1])
-                    img = background
-                else:
-                    img = img.convert("RGB")
-            img.save(output_path)
-            
-        return output_path
+        pil_format = 'JPEG' if target_format.upper() == 'JPG' else target_format.upper()
+
+        # Standard Image handling (includes HEIC, TIFF, rasterized SVG)
+        buffer = io.BytesIO()
+        with ImageProcessor._open(io.BytesIO(data), ext) as img:
+            if pil_format == 'JPEG':
+                img = ImageProcessor._to_rgb(img)
+            img.save(buffer, pil_format)
+
+        return buffer, f"{name}.{target_format.lower()}"
 
     @staticmethod
     def resize_image(file_path: str, width: int = None, height: int = None, percentage: int = None) -> str:
         """
         Resize image by fixed width/height or percentage.
         """
-        img = Image.open(file_path)
+        # Written next to the input with a "_resized" suffix
+        buffer, filename = ImageProcessor.resize_image_buffer(read_file(file_path), os.path.basename(file_path), width, height, percentage)
+        return save_buffer(buffer, os.path.dirname(file_path), filename)
+
+    @staticmethod
+    def resize_image_buffer(data: bytes, filename: str, width: int = None, height: int = None, percentage: int = None) -> tuple[io.BytesIO, str]:
+        name, ext = os.path.splitext(filename)
+        img = ImageProcessor._open(io.BytesIO(data), ext)
         original_width, original_height = img.size
-        
+
         new_width, new_height = original_width, original_height
 
         if percentage:
@@ -76,51 +165,329 @@ class ImageProcessor:
             ratio = height / original_height
             new_height = height
             new_width = int(original_width * ratio)
-            
+
         resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        output_path = file_path # Overwrite or new? Let's assume overwrite for "processing" unless specified otherwise.
-        # Ideally, we should create a new file or add a suffix. Let's add suffix.
-        base, ext = os.path.splitext(file_path)
-        output_path = f"{base}_resized{ext}"
-        
-        resized_img.save(output_path)
+
+        # Keep the input's format; SVGs come out as PNG
+        pil_format = Image.registered_extensions().get(ext.lower())
+        if pil_format is None:
+            pil_format, ext = 'PNG', '.png'
+        if pil_format == 'JPEG':
+            resized_img = ImageProcessor._to_rgb(resized_img)
+
+        buffer = io.BytesIO()
+        resized_img.save(buffer, pil_format)
+        return buffer, f"{name}_resized{ext}"
+
+    @staticmethod
+    def prepare_for_pdf(file_path: str, percentage: int = 100) -> str:
+        """
+        Get one image ready for PDFProcessor.convert_images_to_pdf. JPEG and
+        PNG files at full size are returned untouched so their data can be
+        embedded as is; anything else is scaled by `percentage`, turned upright
+        and written next to the input (JPEG stays JPEG, the rest becomes PNG).
+        """
+        name, ext = os.path.splitext(file_path)
+        scale = percentage / 100 if percentage and percentage < 100 else 1
+        with ImageProcessor._open(file_path, ext) as img:
+            is_jpeg = img.format == 'JPEG'
+            if scale == 1 and img.format in ('JPEG', 'PNG') and ext.lower() != '.svg':
+                return file_path
+            img = ImageOps.exif_transpose(img)
+            if scale != 1:
+                size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+                img = img.resize(size, Image.Resampling.LANCZOS)
+
+            if is_jpeg:
+                output_path = f"{name}_pdf.jpg"
+                img.save(output_path, 'JPEG', quality=95)
+            else:
+                if img.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+                output_path = f"{name}_pdf.png"
+                img.save(output_path, 'PNG')
         return output_path
 
     @staticmethod
-    def compress_image(file_path: str, target_size_kb: int) -> str:
+    def compress_image(file_path: str, target_size_kb: int, target_format: str = "jpeg", parallel: int = 1, dither: bool = True) -> str:
         """
         Compress image to target size in KB.
         """
-        # SVG/HEIC compression is complex, for now convert to JPG then compress
-        filename = os.path.basename(file_path)
+        buffer, filename, _ = ImageProcessor.compress_image_report(
+            file_path, os.path.basename(file_path), target_size_kb, target_format, parallel, dither)
+        return save_buffer(buffer, os.path.dirname(file_path), filename)
+
+    @staticmethod
+    def compress_image_buffer(data: bytes, filename: str, target_size_kb: int, target_format: str = "jpeg", parallel: int = 1, dither: bool = True) -> tuple[io.BytesIO, str]:
+        buffer, filename, _ = ImageProcessor.compress_image_report(data, filename, target_size_kb, target_format, parallel, dither)
+        return buffer, filename
+
+    @staticmethod
+    def compress_image_report(source, filename: str, target_size_kb: int, target_format: str = "jpeg", parallel: int = 1, dither: bool = True) -> tuple[io.BytesIO, str, dict]:
+        """
+        Compress to at most `target_size_kb`, at the highest quality that fits.
+        `source` is the image bytes or a path. Also returns encode statistics:
+        the quality chosen and every encode tried, with its size and time.
+        With target_format="auto", PNG (lossless or palette), JPEG and WebP are
+        all tried and the one that fits with the best PSNR is kept. JPEG is left
+        out for images with transparency.
+        """
+        target_format = target_format.lower()
+        if target_format != AUTO_FORMAT and target_format not in COMPRESS_FORMATS:
+            raise ValueError(f"Unsupported format: {target_format}")
         name, ext = os.path.splitext(filename)
-        
-        if ext.lower() in ['.svg', '.heic', '.heif']:
-             # Pre-convert to JPG for compression
-             temp_jpg = os.path.join(os.path.dirname(file_path), f"{name}_temp.jpg")
-             ImageProcessor.convert_image(file_path, "JPG", os.path.dirname(file_path))
-             file_path = temp_jpg # Proceed with this new file
-        
-        img = Image.open(file_path)
-        if img.mode != 'RGB':
+        target_bytes = target_size_kb * 1024
+        start = time.perf_counter()
+
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        # SVG/HEIC and everything else are re-encoded
+        img = ImageProcessor._prepare(ImageProcessor._open(source, ext))
+
+        if target_format == AUTO_FORMAT:
+            formats = ["png", "webp"] if img.mode == 'RGBA' else ["png", "jpeg", "webp"]
+        else:
+            formats = [target_format]
+        results = [ImageProcessor._compress_as(img, fmt, target_bytes, parallel, dither) for fmt in formats]
+
+        if len(results) > 1:
+            for result in results:
+                result["psnr"] = _psnr(img, result["data"])
+            fitting = [r for r in results if len(r["data"]) <= target_bytes]
+            chosen = max(fitting, key=lambda r: (r["psnr"], -len(r["data"]))) if fitting else min(results, key=lambda r: len(r["data"]))
+        else:
+            chosen = results[0]
+
+        attempts = [attempt for result in results for attempt in result["attempts"]]
+        stats = {
+            "format": chosen["format"],
+            "quality": chosen["quality"],
+            "bytes": len(chosen["data"]),
+            "target_bytes": target_bytes,
+            "fits": len(chosen["data"]) <= target_bytes,
+            "encodes": len(attempts),
+            "attempts": attempts,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        if chosen["format"] == "png":
+            stats["colors"] = chosen["colors"]
+            stats["zlib"] = chosen["zlib"]
+        if len(results) > 1:
+            stats["candidates"] = [
+                {"format": r["format"], "quality": r["quality"], "bytes": len(r["data"]), "psnr": r["psnr"]}
+                for r in results
+            ]
+        return io.BytesIO(chosen["data"]), f"compressed_{name}.{COMPRESS_FORMATS[chosen['format']][1]}", stats
+
+    @staticmethod
+    def _prepare(img: Image.Image) -> Image.Image:
+        """
+        Normalize to RGB, or RGBA if any pixel is transparent, and drop ICC
+        profiles, EXIF and text so none of it is written back out.
+        """
+        if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+            img = img.convert('RGBA')
+            if img.getextrema()[3][0] == 255:
+                img = img.convert('RGB')
+        else:
             img = img.convert('RGB')
-            
-        output_path = os.path.join(os.path.dirname(file_path), f"compressed_{name}.jpg")
-        
-        # Binary search for quality
-        min_quality = 10
-        max_quality = 95
-        
-        while min_quality <= max_quality:
-            quality = (min_quality + max_quality) // 2
-            img.save(output_path, "JPEG", optimize=True, quality=quality)
-            
-            size_kb = os.path.getsize(output_path) / 1024
-            
-            if size_kb <= target_size_kb:
-                min_quality = quality + 1
+        img.info = {}
+        return img
+
+    @staticmethod
+    def _compress_as(img: Image.Image, target_format: str, target_bytes: int, parallel: int, dither: bool) -> dict:
+        pil_format = COMPRESS_FORMATS[target_format][0]
+        result = {"format": "jpeg" if pil_format == 'JPEG' else target_format}
+        if pil_format == 'PNG':
+            data, colors, zlib_setting, attempts = ImageProcessor._search_png(img, target_bytes, dither)
+            result.update(quality=None, colors=colors, zlib=zlib_setting)
+        else:
+            if pil_format == 'JPEG' and img.mode != 'RGB':
+                img = ImageProcessor._to_rgb(img)
+            data, quality, attempts = ImageProcessor._search_quality(img, pil_format, target_bytes, parallel)
+            result["quality"] = quality
+        for attempt in attempts:
+            attempt["format"] = result["format"]
+        result.update(data=data, attempts=attempts)
+        return result
+
+    @staticmethod
+    def _encode_png(img: Image.Image, level: int, strategy: int) -> tuple[bytes, float]:
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG", compress_level=level, compress_type=strategy)
+        return buffer.getvalue(), time.perf_counter() - start
+
+    @staticmethod
+    def _quantize(img: Image.Image, colors: int, dither: bool) -> Image.Image:
+        # Median cut gives better palettes but only handles RGB; libimagequant does both
+        if features.check_feature("libimagequant"):
+            method = Image.Quantize.LIBIMAGEQUANT
+        else:
+            method = Image.Quantize.FASTOCTREE if img.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        return img.quantize(colors, method=method, dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE)
+
+    @staticmethod
+    def _exact_palette(img: Image.Image) -> Image.Image | None:
+        """
+        Palette copy of an image with at most 256 distinct colors, or None if
+        one would lose anything. Transparency must be all-or-nothing per pixel;
+        transparent pixels become one spare color marked transparent (tRNS).
+        """
+        colors = img.getcolors(256)
+        if colors is None:
+            return None
+        key = None
+        if img.mode == 'RGBA':
+            if any(color[3] not in (0, 255) for _, color in colors):
+                return None
+            opaque = {color[:3] for _, color in colors if color[3] == 255}
+            # 512 candidates, at most 256 taken
+            key = next(c for c in ((r, g, 0) for g in (0, 1) for r in range(256)) if c not in opaque)
+            rgb = Image.new('RGB', img.size, key)
+            rgb.paste(img.convert('RGB'), mask=img.getchannel('A'))
+        else:
+            rgb = img
+        quantized = rgb.quantize(256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        if ImageChops.difference(rgb, quantized.convert('RGB')).getbbox() is not None:
+            return None
+        if key is not None and len(opaque) < len(colors):
+            palette = quantized.getpalette()
+            quantized.info['transparency'] = next(i for i in range(len(palette) // 3) if tuple(palette[i * 3:i * 3 + 3]) == key)
+        return quantized
+
+    @staticmethod
+    def _search_png(img: Image.Image, target_bytes: int, dither: bool = True) -> tuple[bytes, int | None, dict, list]:
+        """
+        Lossless if it fits, otherwise the largest palette (binary search over
+        PALETTE_COLORS) that does; `colors` is None for lossless. The search
+        encodes with the fast first zlib setting, then the result is re-encoded
+        with the others in PNG_ZLIB_SETTINGS and the smallest kept. A larger
+        palette that just missed the target is squeezed first, since it may fit
+        then. Pillow picks the per-row PNG filters itself.
+        """
+        attempts = []
+
+        def encode(image, colors, level, strategy):
+            data, seconds = ImageProcessor._encode_png(image, level, strategy)
+            attempts.append({
+                "colors": colors, "zlib": f"{level}/{_ZLIB_STRATEGY_NAMES[strategy]}",
+                "bytes": len(data), "ms": round(seconds * 1000, 1),
+            })
+            return data
+
+        def squeeze(candidate):
+            image, colors, best = candidate
+            setting = PNG_ZLIB_SETTINGS[0]
+            for level, strategy in PNG_ZLIB_SETTINGS[1:]:
+                data = encode(image, colors, level, strategy)
+                if len(data) < len(best):
+                    best, setting = data, (level, strategy)
+            return best, colors, {"level": setting[0], "strategy": _ZLIB_STRATEGY_NAMES[setting[1]]}, attempts
+
+        # Up to 256 colors (UI, logos, screenshots) a palette is still lossless
+        lossless = ImageProcessor._exact_palette(img) or img
+        data = encode(lossless, None, *PNG_ZLIB_SETTINGS[0])
+        if len(data) <= target_bytes:
+            return squeeze((lossless, None, data))
+
+        fits = None
+        closest = (lossless, None, data)  # smallest candidate over the target
+        palette = [c for c in PALETTE_COLORS if lossless is img or c < len(img.getcolors(256))]
+        lo, hi = 0, len(palette) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            quantized = ImageProcessor._quantize(img, palette[mid], dither)
+            data = encode(quantized, palette[mid], *PNG_ZLIB_SETTINGS[0])
+            if len(data) <= target_bytes:
+                fits = (quantized, palette[mid], data)
+                hi = mid - 1
             else:
-                max_quality = quality - 1
-                
-        return output_path
+                if len(data) < len(closest[2]):
+                    closest = (quantized, palette[mid], data)
+                lo = mid + 1
+
+        if fits is None:
+            return squeeze(closest)
+        if len(closest[2]) <= target_bytes * 1.15:
+            result = squeeze(closest)
+            if len(result[0]) <= target_bytes:
+                return result
+        return squeeze(fits)
+
+    @staticmethod
+    def _encode(img: Image.Image, pil_format: str, quality: int) -> tuple[bytes, float]:
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        if pil_format == 'JPEG':
+            img.save(buffer, "JPEG", optimize=True, quality=quality)
+        else:
+            img.save(buffer, pil_format, quality=quality, method=4)
+        return buffer.getvalue(), time.perf_counter() - start
+
+    @staticmethod
+    def _search_quality(img: Image.Image, pil_format: str, target_bytes: int, parallel: int = 1) -> tuple[bytes, int, list]:
+        """
+        Find the highest quality whose encoding fits in `target_bytes`.
+
+        Size grows roughly exponentially with quality, so instead of bisecting
+        the next quality is interpolated from the encodes on either side of the
+        target (or, with one side known, from the bpp curve). The first guess
+        comes from the target's bits per pixel. With `parallel` > 1 each round
+        also encodes neighbouring qualities on threads; Pillow releases the GIL
+        while encoding. `parallel` is capped at MAX_ENCODES and the CPU count.
+        """
+        parallel = min(max(1, parallel), MAX_ENCODES, config.CPU_COUNT)
+        lo, hi = MIN_QUALITY, MAX_QUALITY  # qualities not yet ruled out
+        best = None      # (quality, data) highest quality that fits
+        over = None      # (quality, size) lowest quality that does not
+        smallest = None  # (quality, data) fallback when nothing fits
+        attempts = []
+        guess = _quality_for_bpp(target_bytes * 8 / (img.width * img.height))
+
+        pool = ThreadPoolExecutor(max_workers=parallel) if parallel > 1 else None
+        encode_all = pool.map if pool is not None else map
+        try:
+            while lo <= hi and len(attempts) < MAX_ENCODES:
+                # In parallel, bracket the estimate with neighbours spaced by the remaining range
+                step = max(1, (hi - lo) // (2 * parallel))
+                offsets = range(-(parallel // 2), parallel - parallel // 2)
+                candidates = {min(max(round(guess) + k * step, lo), hi) for k in offsets}
+                # Out of encodes, keep the candidates closest to the estimate
+                candidates = sorted(sorted(candidates, key=lambda q: abs(q - guess))[:MAX_ENCODES - len(attempts)])
+
+                # save() keeps per-call state on the image, so each thread encodes a copy
+                encode = (lambda q: ImageProcessor._encode(img, pil_format, q)) if pool is None else (lambda q: ImageProcessor._encode(img.copy(), pil_format, q))
+                for quality, (data, seconds) in zip(candidates, encode_all(encode, candidates)):
+                    attempts.append({"quality": quality, "bytes": len(data), "ms": round(seconds * 1000, 1)})
+                    if len(data) <= target_bytes:
+                        if best is None or quality > best[0]:
+                            best = (quality, data)
+                        lo = max(lo, quality + 1)
+                    else:
+                        if over is None or quality < over[0]:
+                            over = (quality, len(data))
+                        if smallest is None or len(data) < len(smallest[1]):
+                            smallest = (quality, data)
+                        hi = min(hi, quality - 1)
+
+                if lo > hi:
+                    break
+                if best is not None and over is not None:
+                    q0, s0 = best[0], len(best[1])
+                    q1, s1 = over
+                    t = math.log(target_bytes / s0) / math.log(s1 / s0) if s1 > s0 else 0.5
+                    guess = q0 + t * (q1 - q0)
+                    # Keep each step shrinking the range, even if the estimate hugs one end
+                    margin = (hi - lo) // 4
+                    guess = min(max(guess, lo + margin), hi - margin)
+                else:
+                    q, size = (best[0], len(best[1])) if best is not None else over
+                    guess = _quality_for_bpp(_bpp_for_quality(q) * target_bytes / size)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        quality, data = best if best is not None else smallest
+        return data, quality, attempts
+
@@ -4,6 +4,8 @@ from PIL import Image
 import io
 
 class OfficeProcessor:
+    POOL = "thread"  # mostly zip member reads
+
     @staticmethod
     def extract_pptx_images(input_path: str, output_dir: str) -> str:
         """Extract all images from PowerPoint file"""
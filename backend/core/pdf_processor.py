@@ -1,71 +1,683 @@
+import io
 import os
+import re
+import math
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
 import fitz # PyMuPDF
+from PIL import Image
+from backend import config
+
+try:
+    import pikepdf  # qpdf; MuPDF no longer writes linearized files
+except ImportError:
+    pikepdf = None
+
+# Render resolution bounds; at 600 DPI an A4 page is ~100 MB of RGB pixels
+MIN_DPI = 18
+MAX_DPI = 600
+
+PREVIEW_FORMATS = {"png": "image/png", "jpg": "image/jpeg"}
+# Image streams that are complete files as stored in the PDF
+RAW_IMAGE_FILTERS = {"DCTDecode": "jpg", "JPXDecode": "jp2"}
+
+# Embedded image policy per compression level: resample to `dpi`, re-encode as JPEG
+PDF_COMPRESSION_LEVELS = {
+    "low": {"dpi": 200, "quality": 85},
+    "medium": {"dpi": 150, "quality": 75},
+    "high": {"dpi": 96, "quality": 60},
+}
+# Only resample images at least this much above the target DPI
+RESAMPLE_MARGIN = 1.2
+# Bilevel scans are smaller as JBIG2/CCITT than as any JPEG
+BILEVEL_FILTERS = ("JBIG2Decode", "CCITTFaxDecode")
+MIN_IMAGE_SIDE = 16
+
+# Images embedded as stored: JPEG data is already a DCTDecode stream, and the
+# IDAT data of a non-interlaced PNG is a FlateDecode stream with PNG predictors
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_COLOR_SPACES = {"L": ("/DeviceGray", 1), "RGB": ("/DeviceRGB", 3), "CMYK": ("/DeviceCMYK", 4)}
+PNG_COLOR_TYPES = {0: ("/DeviceGray", 1), 2: ("/DeviceRGB", 3), 3: (None, 1)}
+# EXIF orientations that are a plain rotation, as clockwise page rotation
+EXIF_ROTATION = {1: 0, 3: 180, 6: 90, 8: 270}
+DEFAULT_IMAGE_DPI = 96
+
+
+class _OpenDocuments:
+    """
+    Small LRU of open documents, so repeated page renders skip re-parsing.
+    One per worker process; the lock covers the thread-pool fallback, since a
+    MuPDF document must not be used from two threads at once.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._docs: OrderedDict[str, fitz.Document] = OrderedDict()
+
+    def get(self, path: str) -> fitz.Document:
+        # Call with self.lock held
+        doc = self._docs.get(path)
+        if doc is not None:
+            self._docs.move_to_end(path)
+            return doc
+        doc = fitz.open(path)
+        self._docs[path] = doc
+        while len(self._docs) > self.capacity:
+            _, old = self._docs.popitem(last=False)
+            old.close()
+        return doc
+
+
+_open_documents = _OpenDocuments(config.PDF_OPEN_DOCUMENTS)
+
+
+def _png_chunks(data: bytes):
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        chunk_type = data[pos + 4:pos + 8]
+        yield chunk_type, data[pos + 8:pos + 8 + length]
+        if chunk_type == b"IEND":
+            return
+        pos += 12 + length
+
+
+def _embeddable_image(data: bytes) -> dict | None:
+    """
+    Describe a JPEG or PNG as a PDF image XObject that uses the file's own
+    compressed data, or None when it has to be decoded (other formats,
+    transparency, interlacing, mirrored EXIF orientations).
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Exception:
+        return None
+    dpi = img.info.get("dpi") or (DEFAULT_IMAGE_DPI, DEFAULT_IMAGE_DPI)
+    image = {
+        "width": img.width,
+        "height": img.height,
+        "dpi": tuple(d if d and d >= 1 else DEFAULT_IMAGE_DPI for d in dpi),
+        "rotate": 0,
+    }
+
+    if img.format == "JPEG":
+        orientation = img.getexif().get(0x0112, 1)
+        if img.mode not in JPEG_COLOR_SPACES or orientation not in EXIF_ROTATION:
+            return None
+        colorspace, _ = JPEG_COLOR_SPACES[img.mode]
+        image.update(stream=data, rotate=EXIF_ROTATION[orientation])
+        image["keys"] = {"Filter": "/DCTDecode", "ColorSpace": colorspace, "BitsPerComponent": "8"}
+        if img.mode == "CMYK" and "adobe" in img.info:
+            # Adobe CMYK JPEGs store inverted values
+            image["keys"]["Decode"] = "[1 0 1 0 1 0 1 0]"
+        return image
+
+    if img.format == "PNG":
+        chunks, idat = {}, []
+        for chunk_type, body in _png_chunks(data):
+            if chunk_type == b"IDAT":
+                idat.append(body)
+            else:
+                chunks.setdefault(chunk_type, body)
+        header = chunks.get(b"IHDR", b"")
+        if len(header) != 13 or not idat or b"tRNS" in chunks:
+            return None
+        depth, color_type, interlace = header[8], header[9], header[12]
+        if interlace or color_type not in PNG_COLOR_TYPES:
+            return None
+        colorspace, colors = PNG_COLOR_TYPES[color_type]
+        if colorspace is None:
+            palette = chunks.get(b"PLTE")
+            if not palette:
+                return None
+            colorspace = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+        image["stream"] = b"".join(idat)
+        image["keys"] = {
+            "Filter": "/FlateDecode",
+            "DecodeParms": f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {depth} /Columns {img.width} >>",
+            "ColorSpace": colorspace,
+            "BitsPerComponent": str(depth),
+        }
+        return image
+    return None
+
+
+def _runs(pages: list[int]) -> list[tuple[int, int]]:
+    # Consecutive ascending pages as (first, last) runs, for insert_pdf
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+_REFERENCE = re.compile(r"(\d+) 0 R")
+
+
+def _object_digest(doc: fitz.Document, xref: int, memo: dict) -> str:
+    """
+    Content hash of an object and everything it references, so identical
+    images and fonts from different files hash alike whatever their xrefs.
+    """
+    if xref in memo:
+        return memo[xref] or str(xref)  # None: reference cycle, hash the number
+    memo[xref] = None
+    source = doc.xref_object(xref, compressed=True)
+    text = _REFERENCE.sub(lambda m: _object_digest(doc, int(m.group(1)), memo), source)
+    digest = hashlib.sha256(text.encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref))
+    memo[xref] = digest.hexdigest()
+    return memo[xref]
+
+
+def _resource_key(doc: fitz.Document, owner: int, kind: str, name: str) -> tuple[int, str]:
+    """
+    Object and key path of /Resources/<kind>/<name> on a page or form. Indirect
+    dictionaries are followed here: xref_set_key cannot set a path through them.
+    """
+    xref, path = owner, []
+    for key in ("Resources", kind):
+        path.append(key)
+        value_type, value = doc.xref_get_key(xref, "/".join(path))
+        if value_type == "xref":
+            xref, path = int(value.split()[0]), []
+    return xref, "/".join(path + [name])
+
+
+def _share_duplicates(doc: fitz.Document) -> int:
+    """
+    Point every page's references to identical images and fonts at one copy,
+    leaving the duplicates unreferenced for garbage collection. Linear in the
+    number of resources, unlike garbage=4's search over every object.
+    """
+    memo, first, shared = {}, {}, 0
+    for page in doc:
+        resources = [("XObject", xref, name, referencer) for xref, *_, name, _, referencer in page.get_images(full=True)]
+        resources += [("Font", xref, name, referencer) for xref, _, _, _, name, _, referencer in page.get_fonts(full=True)]
+        for kind, xref, name, referencer in resources:
+            if xref <= 0:
+                continue
+            keep = first.setdefault(_object_digest(doc, xref, memo), xref)
+            if keep != xref:
+                doc.xref_set_key(*_resource_key(doc, referencer or page.xref, kind, name), f"{keep} 0 R")
+                shared += 1
+    return shared
+
+
+def _extracted_image(doc, xref: int, smask: int) -> tuple[bytes, str]:
+    kind, value = doc.xref_get_key(xref, "Filter")
+    filters = value.strip("[]").split() if kind in ("name", "array") else []
+    if not smask and len(filters) == 1 and filters[0].lstrip("/") in RAW_IMAGE_FILTERS:
+        return doc.xref_stream_raw(xref), RAW_IMAGE_FILTERS[filters[0].lstrip("/")]
+    if smask:
+        pix, mask = fitz.Pixmap(doc, xref), fitz.Pixmap(doc, smask)
+        if pix.colorspace and pix.colorspace.n > 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)  # PNG has no CMYK
+        return fitz.Pixmap(pix, mask).tobytes("png"), "png"
+    image = doc.extract_image(xref)
+    return image["image"], image["ext"]
+
 
 class PDFProcessor:
+    POOL = "process"  # PyMuPDF rendering is CPU-bound
+
+    @staticmethod
+    def page_count(file_path: str) -> int:
+        with fitz.open(file_path) as doc:
+            return len(doc)
+
     @staticmethod
-    def convert_pdf_to_images(file_path: str, output_format: str = 'png') -> list[str]:
+    def parse_pages(spec: str, page_count: int) -> list[int]:
         """
-        Convert PDF pages to images.
+        Turn a 1-based page range like "1-3,7,10-" into 0-based page indexes,
+        in the order given. Empty means every page; a page listed twice
+        ("1,1", "1-3,2") is kept at its first position only.
+        """
+        if not spec or not spec.strip():
+            return list(range(page_count))
+        pages = []
+        for part in spec.split(','):
+            part = part.strip()
+            try:
+                if '-' in part:
+                    first, _, last = part.partition('-')
+                    start = int(first) if first.strip() else 1
+                    end = int(last) if last.strip() else page_count
+                else:
+                    start = end = int(part)
+            except ValueError:
+                raise ValueError(f"Invalid page range: {part!r}")
+            if not 1 <= start <= end <= page_count:
+                raise ValueError(f"Page range {part!r} is outside 1-{page_count}")
+            pages.extend(range(start - 1, end))
+        return list(dict.fromkeys(pages))
+
+    @staticmethod
+    def render_pages(file_path: str, pages: list[int], output_dir: str, output_format: str = 'png', dpi: int = 72, base_name: str = None) -> list[str]:
+        """
+        Render the given 0-based pages at `dpi`, one image per page, in order.
+        Opens the document itself, so separate worker processes can each render
+        a block of pages.
         """
-        doc = fitz.open(file_path)
+        if not MIN_DPI <= dpi <= MAX_DPI:
+            raise ValueError(f"DPI must be between {MIN_DPI} and {MAX_DPI}")
+        if base_name is None:
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+
         output_paths = []
+        with fitz.open(file_path) as doc:
+            for i in pages:
+                pix = doc.load_page(i).get_pixmap(dpi=dpi, alpha=False)
+                output_path = os.path.join(output_dir, f"{base_name}_page_{i+1}.{output_format}")
+                pix.save(output_path)
+                output_paths.append(output_path)
+        return output_paths
+
+    @staticmethod
+    def page_blocks(pages: list[int], workers: int, min_block: int = 4) -> list[list[int]]:
+        """
+        Split pages into at most `workers` contiguous blocks of at least
+        `min_block` pages, so each worker opens the document once.
+        """
+        count = max(1, min(workers, len(pages) // min_block))
+        size, extra = divmod(len(pages), count)
+        blocks, start = [], 0
+        for n in range(count):
+            end = start + size + (1 if n < extra else 0)
+            blocks.append(pages[start:end])
+            start = end
+        return blocks
+
+    @staticmethod
+    def document_pages(file_path: str) -> int:
+        """Page count, opening the document through the open-document LRU"""
+        with _open_documents.lock:
+            return len(_open_documents.get(file_path))
+
+    @staticmethod
+    def render_page(file_path: str, page: int, dpi: int = 72, output_format: str = 'png') -> bytes:
+        """
+        Render one 0-based page to PNG/JPEG bytes, for previews. The document
+        stays open in this worker's LRU for the next page request.
+        """
+        if output_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unsupported format: {output_format}")
+        if not MIN_DPI <= dpi <= MAX_DPI:
+            raise ValueError(f"DPI must be between {MIN_DPI} and {MAX_DPI}")
+        with _open_documents.lock:
+            doc = _open_documents.get(file_path)
+            if not 0 <= page < len(doc):
+                raise IndexError(f"Page {page + 1} is outside 1-{len(doc)}")
+            pix = doc.load_page(page).get_pixmap(dpi=dpi, alpha=False)
+            return pix.tobytes(output_format)
+
+    @staticmethod
+    def convert_pdf_to_images(file_path: str, output_format: str = 'png', dpi: int = 72, pages: str = None, output_dir: str = None) -> list[str]:
+        """
+        Convert PDF pages to images.
+        `pages` is a 1-based range like "1-3,7"; images are written next to the
+        input unless `output_dir` is given.
+        """
+        if output_dir is None:
+            output_dir = os.path.dirname(file_path)
+        page_list = PDFProcessor.parse_pages(pages, PDFProcessor.page_count(file_path))
+        return PDFProcessor.render_pages(file_path, page_list, output_dir, output_format, dpi)
+
+    @staticmethod
+    def extract_images(file_path: str, output_dir: str) -> list[str]:
+        """
+        Write out each embedded image once (an image shared by several pages
+        is one xref), in order of first appearance. JPEG and JPEG 2000 streams
+        with no other filter and no soft mask are copied as stored, without
+        decoding; images with a soft mask become RGBA PNGs, anything else is
+        decoded to PNG by PyMuPDF. Images that cannot be decoded are skipped.
+        """
         base_name = os.path.splitext(os.path.basename(file_path))[0]
-        output_dir = os.path.dirname(file_path)
-
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            pix = page.get_pixmap()
-            output_name = f"{base_name}_page_{i+1}.{output_format}"
-            output_path = os.path.join(output_dir, output_name)
-            pix.save(output_path)
-            output_paths.append(output_path)
-        
+        output_paths = []
+        seen = set()
+        with fitz.open(file_path) as doc:
+            for page_index in range(len(doc)):
+                for xref, smask, *_ in doc.get_page_images(page_index, full=True):
+                    if xref in seen:
+                        continue
+                    seen.add(xref)
+                    try:
+                        data, ext = _extracted_image(doc, xref, smask)
+                    except Exception:
+                        continue  # e.g. a broken stream; the other images are still returned
+
+                    output_path = os.path.join(output_dir, f"{base_name}_page_{page_index + 1}_img_{xref}.{ext}")
+                    with open(output_path, "wb") as f:
+                        f.write(data)
+                    output_paths.append(output_path)
         return output_paths
 
     @staticmethod
-    def compress_pdf(file_path: str, level: str = 'medium') -> str:
+    def compression_policy(level: str, grayscale: bool = False) -> dict:
+        if level not in PDF_COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level: {level}")
+        return {**PDF_COMPRESSION_LEVELS[level], "grayscale": grayscale}
+
+    @staticmethod
+    def plan_image_recompression(file_path: str, policy: dict) -> list[dict]:
+        """
+        Find the embedded images worth re-encoding: those shown above the
+        policy DPI (measured where the image is drawn largest), or any colour
+        image when converting to grayscale. Each image xref is listed once,
+        with the page it first appears on and the pixel size to resample to.
+        """
+        shown = {}
+        with fitz.open(file_path) as doc:
+            for page_index in range(len(doc)):
+                page = doc[page_index]
+                by_size = {}
+                for xref, _, width, height, *_ in page.get_images(full=True):
+                    by_size.setdefault((width, height), set()).add(xref)
+                if any(len(xrefs) > 1 for xrefs in by_size.values()):
+                    # Ambiguous: xrefs=True tells them apart by hashing decoded pixels, which is slow
+                    infos = page.get_image_info(xrefs=True)
+                else:
+                    infos = page.get_image_info()
+                    for info in infos:
+                        info["xref"] = min(by_size.get((info["width"], info["height"]), {0}))
+                for info in infos:
+                    xref = info["xref"]
+                    if xref <= 0:  # inline image, part of the content stream
+                        continue
+                    a, b, c, d = info["transform"][:4]
+                    entry = shown.setdefault(xref, {**info, "page": page_index, "shown": (0.0, 0.0)})
+                    entry["shown"] = (max(entry["shown"][0], math.hypot(a, b)), max(entry["shown"][1], math.hypot(c, d)))
+
+            plan = []
+            for xref, info in shown.items():
+                width, height = info["width"], info["height"]
+                shown_w, shown_h = info["shown"]
+                if min(width, height) < MIN_IMAGE_SIDE or min(shown_w, shown_h) <= 0 or info["bpc"] == 1:
+                    continue
+                # Stencil and colour-key masks depend on exact sample values
+                if doc.xref_get_key(xref, "ImageMask")[1] == "true" or doc.xref_get_key(xref, "Mask")[0] != "null":
+                    continue
+                if any(name in doc.xref_get_key(xref, "Filter")[1] for name in BILEVEL_FILTERS):
+                    continue
+
+                image_dpi = min(width / (shown_w / 72), height / (shown_h / 72))
+                if image_dpi > policy["dpi"] * RESAMPLE_MARGIN:
+                    scale = policy["dpi"] / image_dpi
+                    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                elif policy["grayscale"] and info["colorspace"] != 1:
+                    size = (width, height)
+                else:
+                    continue
+                # Plain JPEGs can be decoded by Pillow straight at a reduced scale
+                draft = doc.xref_get_key(xref, "Filter")[1] == "/DCTDecode" and doc.xref_get_key(xref, "Decode")[0] == "null"
+                plan.append({"xref": xref, "page": info["page"], "size": size, "draft": draft})
+        plan.sort(key=lambda item: (item["page"], item["xref"]))
+        return plan
+
+    @staticmethod
+    def recompress_images(file_path: str, plan: list[dict], policy: dict) -> list[dict]:
+        """
+        Decode, resample and JPEG-encode a block of planned images. Opens the
+        document itself so blocks can run in separate worker processes.
+        Images that would not get smaller are left out.
+        """
+        results = []
+        with fitz.open(file_path) as doc:
+            for item in plan:
+                xref = item["xref"]
+                raw = doc.xref_stream_raw(xref)
+                img = Image.open(io.BytesIO(raw)) if item["draft"] else None
+                if img is not None and img.mode in ("L", "RGB"):
+                    # libjpeg scales by 1/2, 1/4 or 1/8 while decoding, never below `size`
+                    img.draft(img.mode, tuple(item["size"]))
+                else:
+                    pix = fitz.Pixmap(doc, xref)
+                    if pix.alpha:
+                        pix = fitz.Pixmap(pix, 0)
+                    cs = pix.colorspace
+                    if cs is None or cs.n not in (1, 3) or not cs.name.startswith(("DeviceGray", "DeviceRGB", "ICCBased")):
+                        pix = fitz.Pixmap(fitz.csRGB, pix)
+                    img = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+                if policy["grayscale"] and img.mode != "L":
+                    img = img.convert("L")
+                if img.size != tuple(item["size"]):
+                    img = img.resize(item["size"], Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=policy["quality"], optimize=True)
+                data = buf.getvalue()
+                original = len(raw)
+                if len(data) < original:
+                    results.append({
+                        "xref": xref, "page": item["page"], "data": data,
+                        "size": img.size, "gray": img.mode == "L", "saved": original - len(data),
+                    })
+        return results
+
+    @staticmethod
+    def write_compressed_pdf(file_path: str, images: list[dict], output_path: str) -> dict:
+        """
+        Swap in the re-encoded image streams and save with garbage collection,
+        deflate and object streams. Returns a report with the bytes saved on
+        each page (an image shared by several pages counts on its first page).
+        """
+        with fitz.open(file_path) as doc:
+            page_saved = [0] * len(doc)
+            for image in images:
+                xref = image["xref"]
+                width, height = image["size"]
+                # The stream is already JPEG, store it as is
+                doc.update_stream(xref, image["data"], compress=False)
+                doc.xref_set_key(xref, "Filter", "/DCTDecode")
+                doc.xref_set_key(xref, "Width", str(width))
+                doc.xref_set_key(xref, "Height", str(height))
+                doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if image["gray"] else "/DeviceRGB")
+                doc.xref_set_key(xref, "BitsPerComponent", "8")
+                doc.xref_set_key(xref, "DecodeParms", "null")
+                doc.xref_set_key(xref, "Decode", "null")
+                page_saved[image["page"]] += image["saved"]
+            doc.save(output_path, garbage=4, deflate=True, use_objstms=True, clean=True)
+
+        bytes_before, bytes_after = os.path.getsize(file_path), os.path.getsize(output_path)
+        return {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "images_recompressed": len(images),
+            "image_bytes_saved": sum(page_saved),
+            "page_bytes_saved": page_saved,
+        }
+
+    @staticmethod
+    def compress_pdf(file_path: str, level: str = 'medium', grayscale: bool = False) -> str:
         """
         Compress PDF.
-        Level: low (less compression), medium, high (max compression)
-        Uses garbage collection and deflate.
-        """
-        doc = fitz.open(file_path)
-        
-        # Map levels to garbage collection options
-        # 0: no garbage collection
-        # 1: unreferenced objects
-        # 2: unreferenced objects + streams
-        # 3: unreferenced objects + streams + fonts
-        # 4: check streams for duplication
-        
-        gc_level = 4
-        deflate = True
-        
-        if level == 'low':
-            gc_level = 1
-        elif level == 'high':
-            pass
-            
+        Level: low (less compression), medium, high (max compression); see
+        PDF_COMPRESSION_LEVELS. Runs every step in this process; the API
+        splits image re-encoding across the process pool instead.
+        """
+        policy = PDFProcessor.compression_policy(level, grayscale)
+        plan = PDFProcessor.plan_image_recompression(file_path, policy)
+        images = PDFProcessor.recompress_images(file_path, plan, policy)
+
         base, ext = os.path.splitext(file_path)
         output_path = f"{base}_compressed{ext}"
-        
-        doc.save(output_path, garbage=gc_level, deflate=deflate, clean=True)
+        PDFProcessor.write_compressed_pdf(file_path, images, output_path)
+        return output_path
+
+    @staticmethod
+    def linearize(file_path: str) -> str:
+        """
+        Rewrite a PDF in place as linearized ("fast web view"): page 1 and a
+        first-page cross-reference come first, so a viewer can show it before
+        the rest has downloaded.
+        """
+        if pikepdf is None:
+            raise ValueError("Linearized output needs pikepdf (pip install pikepdf)")
+        with pikepdf.open(file_path, allow_overwriting_input=True) as pdf:
+            pdf.save(file_path, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.preserve)
+        return file_path
+
+    @staticmethod
+    def edit_pdf(file_path: str, output_path: str, rotate: int = 0, pages: str = None, metadata: dict = None, incremental: bool = True) -> dict:
+        """
+        Rotate pages (a 1-based range, default all) and update metadata on a
+        copy of `file_path`. Incremental saves keep the original bytes and
+        append only the changed objects; otherwise the copy is rewritten.
+        """
+        if rotate % 90:
+            raise ValueError("Rotation must be a multiple of 90")
+        shutil.copyfile(file_path, output_path)
+        with fitz.open(output_path) as doc:
+            if rotate:
+                for i in PDFProcessor.parse_pages(pages, len(doc)):
+                    doc[i].set_rotation((doc[i].rotation + rotate) % 360)
+            if metadata:
+                doc.set_metadata(metadata)
+            # Damaged files are repaired on open and have to be written in full
+            incremental = incremental and doc.can_save_incrementally()
+            if incremental:
+                doc.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            else:
+                data = doc.tobytes(garbage=4, deflate=True, use_objstms=True)
+        if not incremental:
+            with open(output_path, "wb") as f:
+                f.write(data)
+        return {
+            "incremental": incremental,
+            "bytes_before": os.path.getsize(file_path),
+            "bytes_after": os.path.getsize(output_path),
+        }
+
+    @staticmethod
+    def text_chunks(pages: list[int], first: int = 2, largest: int = 64) -> list[list[int]]:
+        """
+        Split pages into chunks that double in size from `first` to `largest`:
+        small ones so the first records come back quickly, then larger ones
+        so each worker reopens the document less often.
+        """
+        chunks, size, start = [], first, 0
+        while start < len(pages):
+            chunks.append(pages[start:start + size])
+            start += size
+            size = min(size * 2, largest)
+        return chunks
+
+    @staticmethod
+    def extract_text(file_path: str, pages: list[int], blocks: bool = False) -> list[dict]:
+        """
+        One record per 0-based page: {"page": 1-based number, "text": ...}.
+        With `blocks`, also the page size and each text block's bbox and text.
+        """
+        records = []
+        with fitz.open(file_path) as doc:
+            for i in pages:
+                page = doc.load_page(i)
+                record = {"page": i + 1, "text": page.get_text("text")}
+                if blocks:
+                    record["width"], record["height"] = page.rect.width, page.rect.height
+                    record["blocks"] = [
+                        {"bbox": [round(v, 2) for v in (x0, y0, x1, y1)], "text": text}
+                        for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks")
+                        if block_type == 0  # 1 is an image block
+                    ]
+                records.append(record)
+        return records
+
+    @staticmethod
+    def split_parts(page_count: int, ranges: str = None, every: int = 0) -> list[list[int]]:
+        """
+        0-based pages of each output part: one part per comma-separated range
+        ("1-5,6-10,20-"), or consecutive parts of `every` pages. Blank ranges
+        ("1-5,", "1-2,,4") are skipped; parse_pages would read them as every page.
+        """
+        parts = [part.strip() for part in (ranges or '').split(',') if part.strip()]
+        if parts:
+            return [PDFProcessor.parse_pages(part, page_count) for part in parts]
+        if every > 0:
+            return [list(range(start, min(start + every, page_count))) for start in range(0, page_count, every)]
+        raise ValueError("Give page ranges or a number of pages per part")
+
+    @staticmethod
+    def part_filenames(parts: list[list[int]], base_name: str) -> list[str]:
+        names = []
+        for pages in parts:
+            label = f"{pages[0] + 1}" if len(pages) == 1 else f"{pages[0] + 1}-{pages[-1] + 1}"
+            name = f"{base_name}_pages_{label}.pdf"
+            if name in names:
+                name = f"{base_name}_pages_{label}_{len(names) + 1}.pdf"
+            names.append(name)
+        return names
+
+    @staticmethod
+    def write_parts(file_path: str, parts: list[list[int]], output_paths: list[str]) -> list[str]:
+        """
+        Copy the pages of each part into a new PDF. Page objects are copied,
+        not rendered; within a part, fonts and images that pages share are
+        copied once. Opens the source itself, so blocks of parts can be
+        written by separate worker processes.
+        """
+        with fitz.open(file_path) as src:
+            for pages, output_path in zip(parts, output_paths):
+                with fitz.open() as part:
+                    runs = _runs(pages)
+                    for n, (first, last) in enumerate(runs):
+                        # final=False keeps the map of objects already copied for the next run
+                        part.insert_pdf(src, from_page=first, to_page=last, final=n == len(runs) - 1)
+                    part.save(output_path, garbage=1, deflate=True, use_objstms=True)
+        return output_paths
+
+    @staticmethod
+    def merge_pdfs(file_paths: list[str], output_path: str) -> str:
+        """
+        Append every page of each PDF, in order. Images and fonts that are
+        identical across files (the same logo or embedded font) are written
+        once.
+        """
+        with fitz.open() as merged:
+            for file_path in file_paths:
+                with fitz.open(file_path) as src:
+                    merged.insert_pdf(src)
+            _share_duplicates(merged)
+            merged.save(output_path, garbage=1, deflate=True, use_objstms=True)
         return output_path
 
     @staticmethod
     def convert_images_to_pdf(image_paths: list[str], output_path: str):
         """
-        Convert list of images to a single PDF.
+        Convert list of images to a single PDF, one page per image, sized by
+        the image's DPI (96 if unset). JPEG and PNG data is embedded as is;
+        anything else is decoded by PyMuPDF.
         """
         doc = fitz.open()
         for img_path in image_paths:
-            img = fitz.open(img_path)
-            rect = img[0].rect
-            pdfbytes = img.convert_to_pdf()
-            img.close()
-            imgPDF = fitz.open("pdf", pdfbytes)
-            page = doc.new_page(width=rect.width, height=rect.height)
-            page.show_pdf_page(rect, imgPDF, 0)
-        
-        doc.save(output_path)
+            with open(img_path, "rb") as f:
+                image = _embeddable_image(f.read())
+
+            if image is None:
+                # Transparency, interlacing or another format: let MuPDF decode it
+                with fitz.open(img_path) as img:
+                    rect = img[0].rect
+                page = doc.new_page(width=rect.width, height=rect.height)
+                page.insert_image(page.rect, filename=img_path)
+                continue
+
+            xref = doc.get_new_xref()
+            doc.update_object(xref, f"<< /Type /XObject /Subtype /Image /Width {image['width']} /Height {image['height']} >>")
+            doc.update_stream(xref, image["stream"], compress=False)
+            # Set after the stream, which resets the filter keys
+            for key, value in image["keys"].items():
+                doc.xref_set_key(xref, key, value)
+            x_dpi, y_dpi = image["dpi"]
+            page = doc.new_page(width=image["width"] * 72 / x_dpi, height=image["height"] * 72 / y_dpi)
+            page.insert_image(page.rect, xref=xref)
+            if image["rotate"]:
+                page.set_rotation(image["rotate"])
+
+        doc.save(output_path, garbage=1, deflate=True)
+        doc.close()
         return output_path
@@ -81,6 +81,13 @@ class SmartDetector:
                 {"id": "csv_to_excel", "name": "Convert to Excel (XLSX)", "type": "convert"}
             ]
         
+        # JSON Lines
+        elif ext in ['.ndjson', '.jsonl']:
+            category = "data"
+            actions = [
+                {"id": "json_to_csv", "name": "Convert to CSV", "type": "convert"}
+            ]
+
         # Excel Files
         elif ext in ['.xlsx', '.xls']:
             category = "data"
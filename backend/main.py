@@ -3,8 +3,9 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 import os
+from backend.utils.executor import shutdown_pools
 
-app = FastAPI(title="FORMATR", version="1.0.0")
+app = FastAPI(title="FORMATR", version="1.0.0", on_shutdown=[shutdown_pools])
 
 # Allow CORS for local development
 app.add_middleware(
@@ -13,7 +14,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Cache", "X-Sheet-Stats", "X-Compression-Stats", "X-Edit-Stats"],
 )
 
 import sys
@@ -0,0 +1,243 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+from fastapi.responses import FileResponse
+from starlette.datastructures import UploadFile
+
+from backend import config
+from backend.utils.executor import run_in_pool
+from backend.utils.responses import BufferResponse
+
+logger = logging.getLogger(__name__)
+
+# Bump when a processor's output changes so stale results are not served
+CACHE_VERSION = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ResultCache:
+    """
+    Content-addressed store of conversion outputs with a disk quota.
+    Each entry is a directory <root>/<key>/ holding `output` and `meta.json`.
+    Least recently used entries are evicted first.
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _load(self):
+        # Rebuild LRU order from the last-access time of each entry
+        found = []
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+            try:
+                with open(os.path.join(entry_dir, "meta.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                found.append((os.path.getmtime(os.path.join(entry_dir, "meta.json")), key, meta))
+            except (OSError, ValueError):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        for _, key, meta in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = meta
+            self._size += meta["size"]
+        self._evict()
+
+    @staticmethod
+    def make_key(operation: str, digests: list[str], params: dict) -> str:
+        payload = json.dumps([CACHE_VERSION, operation, digests, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """
+        Return entry metadata (with `path`) on a hit, else None.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        entry_dir = os.path.join(self.root, key)
+        try:
+            os.utime(os.path.join(entry_dir, "meta.json"))
+        except OSError:
+            pass
+        return dict(meta, path=os.path.join(entry_dir, "output"))
+
+    def put(self, key: str, source_path: str, meta: dict):
+        """
+        Copy `source_path` into the cache under `key`. Copies rather than
+        hard-links because processors overwrite their output paths in place.
+        """
+        if not self.enabled:
+            return
+        self._store(key, os.path.getsize(source_path), meta,
+                    lambda dest: shutil.copyfile(source_path, dest))
+
+    def put_bytes(self, key: str, data: bytes, meta: dict):
+        """
+        Store an in-memory result (see BufferResponse) under `key`.
+        """
+        if not self.enabled:
+            return
+
+        def write(dest):
+            with open(dest, "wb") as f:
+                f.write(data)
+
+        self._store(key, len(data), meta, write)
+
+    def _store(self, key: str, size: int, meta: dict, write_output):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+
+        staging = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        try:
+            write_output(os.path.join(staging, "output"))
+            meta = dict(meta, size=size)
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.rename(staging, os.path.join(self.root, key))
+        except OSError:
+            # Lost a race with an identical request, or the disk is full
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._entries[key] = meta
+            self._size += size
+            self.stores += 1
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, meta = self._entries.popitem(last=False)
+            self._size -= meta["size"]
+            self.evictions += 1
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+result_cache = ResultCache(config.CACHE_DIR, config.CACHE_MAX_MB * 1024 * 1024)
+
+
+def hash_file(fileobj) -> str:
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _uploads_in(value) -> list:
+    if isinstance(value, UploadFile):
+        return [value]
+    if isinstance(value, list) and value and all(isinstance(v, UploadFile) for v in value):
+        return value
+    return []
+
+
+def _result_headers(response) -> dict:
+    # Endpoint-specific result headers (X-Compression-Stats, X-Edit-Stats, ...) are
+    # part of the result: stored with it and sent again on a hit
+    return {name: value for name, value in response.headers.items()
+            if name.lower().startswith("x-") and name.lower() != "x-cache"}
+
+
+def _rename_output(filename: str, cached_upload: str, upload: str) -> str:
+    # Outputs are named after the upload ("report.pdf" -> "report_compressed.pdf"),
+    # so carry the current upload's name over to a result cached under another name
+    old_stem = os.path.splitext(cached_upload or "")[0]
+    new_stem = os.path.splitext(upload or "")[0]
+    if old_stem and new_stem and filename.startswith(old_stem):
+        return new_stem + filename[len(old_stem):]
+    return filename
+
+
+def cached_endpoint(endpoint):
+    """
+    Wrap an upload endpoint so identical (content, operation, params) requests
+    are answered from the result cache without running the processor.
+    """
+    operation = f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        uploads = [u for v in kwargs.values() for u in _uploads_in(v)]
+        if not uploads or not result_cache.enabled:
+            return await endpoint(**kwargs)
+
+        # Streamed uploads were hashed during ingest
+        digests = [getattr(u, "sha256", None) or await run_in_pool(hash_file, u.file) for u in uploads]
+        # Raw values: "Encode" and "encode" or a changed title may mean different output
+        params = {k: v for k, v in kwargs.items() if not _uploads_in(v)}
+        key = ResultCache.make_key(operation, digests, params)
+        upload_name = uploads[0].filename
+
+        hit = result_cache.get(key)
+        if hit is not None and os.path.exists(hit["path"]):
+            filename = _rename_output(hit["filename"], hit.get("upload_name"), upload_name)
+            headers = {**hit.get("headers", {}), "X-Cache": "HIT"}
+            return FileResponse(hit["path"], filename=filename, media_type=hit.get("media_type"), headers=headers)
+
+        response = await endpoint(**kwargs)
+        if isinstance(response, (FileResponse, BufferResponse)) and response.status_code == 200:
+            meta = {
+                "filename": response.filename or os.path.basename(response.path),
+                "upload_name": upload_name,
+                "media_type": response.media_type,
+                "headers": _result_headers(response),
+            }
+            try:
+                if isinstance(response, BufferResponse):
+                    await run_in_pool(result_cache.put_bytes, key, response.body, meta)
+                else:
+                    await run_in_pool(result_cache.put, key, response.path, meta)
+            except OSError as e:
+                logger.warning("Could not cache %s: %s", operation, e)
+            response.headers["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import sys
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+POOL_THREAD = "thread"
+POOL_PROCESS = "process"
+
+_pools: dict[str, Executor] = {}
+_lock = threading.Lock()
+
+
+def get_pool(kind: str = POOL_THREAD) -> Executor:
+    """
+    Return the shared executor for `kind`, creating it on first use.
+    Falls back to the thread pool when process workers are disabled or
+    the platform cannot start them.
+    """
+    with _lock:
+        if kind == POOL_PROCESS and config.PROCESS_WORKERS <= 0:
+            kind = POOL_THREAD
+
+        pool = _pools.get(kind)
+        if pool is not None:
+            return pool
+
+        if kind == POOL_PROCESS:
+            try:
+                pool = ProcessPoolExecutor(max_workers=config.PROCESS_WORKERS)
+            except (OSError, NotImplementedError) as e:
+                logger.warning("Process pool unavailable (%s), using thread pool", e)
+                _pools[POOL_PROCESS] = _thread_pool()
+                return _pools[POOL_PROCESS]
+        elif kind == POOL_THREAD:
+            pool = _thread_pool()
+        else:
+            raise ValueError(f"Unknown pool: {kind}")
+
+        _pools[kind] = pool
+        return pool
+
+
+def _thread_pool() -> Executor:
+    if POOL_THREAD not in _pools:
+        _pools[POOL_THREAD] = ThreadPoolExecutor(max_workers=config.THREAD_WORKERS, thread_name_prefix="formatr")
+    return _pools[POOL_THREAD]
+
+
+def pool_for(func) -> str:
+    """
+    Resolve the pool a processor method belongs to from its owning class's
+    POOL attribute (e.g. ImageProcessor.POOL = "process").
+    """
+    owner = sys.modules.get(func.__module__)
+    for part in func.__qualname__.split(".")[:-1]:
+        owner = getattr(owner, part, None)
+    return getattr(owner, "POOL", POOL_THREAD)
+
+
+async def run_in_pool(func, *args, pool: str = None, **kwargs):
+    """
+    Run a blocking call on its processor's pool without blocking the event loop.
+    Functions sent to the process pool must be importable (module-level or
+    static methods) and take picklable arguments.
+    """
+    kind = pool or pool_for(func)
+    executor = get_pool(kind)
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    if isinstance(executor, ThreadPoolExecutor):
+        # Like asyncio.to_thread: thread workers see the caller's context vars (e.g. job progress)
+        call = functools.partial(contextvars.copy_context().run, call)
+    try:
+        return await loop.run_in_executor(executor, call)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); drop the pool so the next call gets a fresh one
+        with _lock:
+            if _pools.get(POOL_PROCESS) is executor:
+                del _pools[POOL_PROCESS]
+        executor.shutdown(wait=False)
+        raise RuntimeError("Worker process crashed while processing the file")
+
+
+def shutdown_pools(wait: bool = True):
+    with _lock:
+        pools = list({id(p): p for p in _pools.values()}.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
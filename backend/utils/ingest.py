@@ -0,0 +1,381 @@
+import codecs
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from fastapi import Request
+from starlette.datastructures import FormData, Headers, UploadFile
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # older python-multipart releases
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from backend import config
+from backend.core.smart_detector import SmartDetector
+from backend.utils.executor import run_in_pool
+
+SNIFF_BYTES = 16
+MAX_FIELD_BYTES = 1024 * 1024
+
+# (offset, magic, format, category)
+SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "png", "image"),
+    (0, b"\xff\xd8\xff", "jpeg", "image"),
+    (0, b"GIF87a", "gif", "image"),
+    (0, b"GIF89a", "gif", "image"),
+    (0, b"II*\x00", "tiff", "image"),
+    (0, b"MM\x00*", "tiff", "image"),
+    (0, b"BM", "bmp", "image"),
+    (0, b"%PDF-", "pdf", "document"),
+    (0, b"PK\x03\x04", "zip", "archive"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z", "archive"),
+    (0, b"\x1f\x8b", "gzip", "archive"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole", "data"),  # legacy .xls/.doc/.ppt
+    (0, b"\x1a\x45\xdf\xa3", "matroska", "video"),
+    (0, b"ID3", "mp3", "audio"),
+    (0, b"fLaC", "flac", "audio"),
+    (0, b"OggS", "ogg", "audio"),
+    (8, b"WEBP", "webp", "image"),
+    (8, b"WAVE", "wav", "audio"),
+    (8, b"AVI ", "avi", "video"),
+    (4, b"ftyp", "mp4", "video"),
+]
+# Containers whose real type (docx, xlsx, pptx, xls...) is better told by the extension
+CONTAINER_FORMATS = {"zip", "ole"}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class IngestError(Exception):
+    pass
+
+
+class IngestedUpload(UploadFile):
+    """
+    UploadFile backed by a scratch file that already has its final name on disk,
+    or, for small requests, by an in-memory buffer (`path` is None until spill()).
+    `path`, `sha256`, `format` and `category` are filled in while streaming.
+    """
+    def __init__(self, file, *, path: str | None, sha256: str, format: str, category: str, scratch_dir: str, **kwargs):
+        super().__init__(file, **kwargs)
+        self.path = path
+        self.sha256 = sha256
+        self.format = format
+        self.category = category
+        self.scratch_dir = scratch_dir
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def spill(self) -> str:
+        """
+        Write an in-memory upload to the scratch directory for processors that
+        need a path. Returns the path; a no-op for uploads already on disk.
+        """
+        if self.path is None:
+            path = _scratch_path(self.scratch_dir, self.filename)
+            with open(path, "wb") as f:
+                f.write(self.file.getbuffer())
+            self.path = path
+        return self.path
+
+
+def sniff(head: bytes) -> tuple[str | None, str | None]:
+    for offset, magic, fmt, category in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if fmt == "mp4":
+                brand = head[8:12]
+                if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+                    return "heic", "image"
+                if brand == b"M4A ":
+                    return "m4a", "audio"
+            return fmt, category
+    return None, None
+
+
+def size_limit(category: str) -> int:
+    mb = config.UPLOAD_LIMITS_MB.get(category, config.UPLOAD_LIMITS_MB["default"])
+    return mb * 1024 * 1024
+
+
+def _safe_filename(filename: str) -> str:
+    # Browsers send bare names, but never trust a client path
+    name = os.path.basename(filename.replace("\\", "/")).strip()
+    return name if name not in ("", ".", "..") else "upload"
+
+
+def _scratch_path(scratch_dir: str, filename: str) -> str:
+    os.makedirs(scratch_dir, exist_ok=True)
+    path = os.path.join(scratch_dir, filename)
+    if os.path.exists(path):
+        # Several uploads with the same name in one request: keep the name, separate directory
+        subdir = tempfile.mkdtemp(dir=scratch_dir)
+        path = os.path.join(subdir, filename)
+    return path
+
+
+class _FilePart:
+    def __init__(self, field_name: str, filename: str, headers: Headers, path: str | None, scratch_dir: str, declared_length: int | None):
+        self.field_name = field_name
+        self.filename = filename
+        self.headers = headers
+        self.path = path
+        self.scratch_dir = scratch_dir
+        self.declared_length = declared_length
+        self.writer = open(path, "wb") if path else io.BytesIO()
+        self.hasher = hashlib.sha256()
+        self.head = b""
+        self.size = 0
+        self.format = None
+        self.category = None
+        self.limit = None
+
+    def classify(self):
+        fmt, category = sniff(self.head)
+        ext_category = SmartDetector.analyze_file(self.filename)["category"]
+        if category is None or (fmt in CONTAINER_FORMATS and ext_category != "unknown"):
+            category = ext_category
+        self.format = fmt
+        self.category = category
+        self.limit = size_limit(category)
+        if self.declared_length is not None and self.declared_length > self.limit + MAX_FIELD_BYTES:
+            self.too_large()
+
+    def too_large(self):
+        raise UploadTooLarge(f"{self.filename} exceeds the {self.limit // (1024 * 1024)} MB limit for {self.category} files")
+
+    def write(self, chunks: list[bytes]):
+        # Runs on the thread pool: one disk write + hash update per network chunk
+        data = b"".join(chunks)
+        if self.limit is None:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self.classify()
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            self.too_large()
+        self.hasher.update(data)
+        self.writer.write(data)
+
+    def finish(self) -> IngestedUpload:
+        if self.limit is None:
+            self.classify()
+        if self.path:
+            self.writer.close()
+            file = open(self.path, "rb")
+        else:
+            file = self.writer
+            file.seek(0)
+        return IngestedUpload(
+            file,
+            path=self.path,
+            sha256=self.hasher.hexdigest(),
+            format=self.format,
+            category=self.category,
+            scratch_dir=self.scratch_dir,
+            size=self.size,
+            filename=self.filename,
+            headers=self.headers,
+        )
+
+
+class StreamingIngest:
+    """
+    Parse a multipart request straight off the socket. File parts are written
+    once, into a per-request scratch directory, under their original filename.
+    Requests within MEMORY_THRESHOLD_KB keep their files in memory instead.
+    """
+    def __init__(self, request: Request, scratch_dir: str, single_file: bool = True):
+        self.request = request
+        self.scratch_dir = scratch_dir
+        self.content_length = _content_length(request)
+        # Only a single-file request's length bounds its file; otherwise parts are counted as they stream
+        self.declared_length = self.content_length if single_file else None
+        self.in_memory = fits_in_memory(self.content_length)
+        self.items = []
+        self._charset = "utf-8"
+        self._part_headers = []
+        self._header_name = b""
+        self._header_value = b""
+        self._field_name = None
+        self._field_data = bytearray()
+        self._file = None
+        self._pending = []  # (part, bytes) waiting to be written after this chunk
+        self._finished = []
+        self._open_parts = []
+
+    def on_part_begin(self):
+        self._part_headers = []
+        self._field_data = bytearray()
+        self._file = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._part_headers.append((self._header_name.lower(), self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        disposition = dict(self._part_headers).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        if b"name" not in options:
+            raise IngestError('The Content-Disposition header field "name" must be provided.')
+        self._field_name = options[b"name"].decode(self._charset, errors="replace")
+        if b"filename" not in options:
+            return
+
+        filename = _safe_filename(options[b"filename"].decode(self._charset, errors="replace"))
+        path = None if self.in_memory else _scratch_path(self.scratch_dir, filename)
+        self._file = _FilePart(self._field_name, filename, Headers(raw=self._part_headers), path, self.scratch_dir, self.declared_length)
+        self._open_parts.append(self._file)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._file is None:
+            self._field_data.extend(data[start:end])
+            if len(self._field_data) > MAX_FIELD_BYTES:
+                raise IngestError("Form field exceeded maximum size of 1024KB.")
+        else:
+            self._pending.append((self._file, data[start:end]))
+
+    def on_part_end(self):
+        if self._file is None:
+            self.items.append((self._field_name, self._field_data.decode(self._charset, errors="replace")))
+        else:
+            self._finished.append(self._file)
+
+    def on_end(self):
+        pass
+
+    async def parse(self) -> FormData:
+        _, params = parse_options_header(self.request.headers["content-type"])
+        charset = params.get(b"charset", b"utf-8")
+        try:
+            self._charset = codecs.lookup(charset.decode("latin-1")).name
+        except LookupError:
+            self._charset = "latin-1"
+        if b"boundary" not in params:
+            raise IngestError("Missing boundary in multipart.")
+
+        callbacks = {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+        parser = multipart.MultipartParser(params[b"boundary"], callbacks)
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                await self._flush()
+            parser.finalize()
+            await self._flush()
+        except BaseException:
+            for _, value in self.items:
+                if isinstance(value, UploadFile):
+                    value.file.close()
+            for part in self._open_parts:
+                part.writer.close()
+            raise
+        return FormData(self.items)
+
+    async def _flush(self):
+        by_part = {}
+        for part, data in self._pending:
+            by_part.setdefault(id(part), (part, []))[1].append(data)
+        self._pending.clear()
+        for part, chunks in by_part.values():
+            await run_in_pool(part.write, chunks)
+        for part in self._finished:
+            self.items.append((part.field_name, await run_in_pool(part.finish)))
+        self._finished.clear()
+
+
+def _content_length(request: Request) -> int | None:
+    value = request.headers.get("content-length", "")
+    return int(value) if value.isdigit() else None
+
+
+def fits_in_memory(content_length: int | None) -> bool:
+    # Chunked requests (no Content-Length) always go to disk
+    return content_length is not None and content_length <= config.MEMORY_THRESHOLD_KB * 1024
+
+
+def is_multipart(request: Request) -> bool:
+    return request.headers.get("content-type", "").lower().startswith("multipart/form-data")
+
+
+_last_sweep = 0.0
+# Scratch directories of requests and jobs still running; the sweep leaves them alone
+_active_dirs: set[str] = set()
+
+
+def release_scratch_dir(scratch_dir: str):
+    """Mark a request's or job's scratch directory as no longer in use"""
+    _active_dirs.discard(scratch_dir)
+
+
+def sweep_scratch_dirs():
+    """
+    Remove scratch directories left behind by finished background jobs once
+    they are older than the job TTL. Runs at most once a minute.
+    """
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < 60:
+        return
+    _last_sweep = now
+    cutoff = now - config.JOB_TTL_SECONDS
+    for name in os.listdir(config.TEMP_DIR):
+        path = os.path.join(config.TEMP_DIR, name)
+        if path in _active_dirs:
+            continue  # e.g. a long transcode still reading its input
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+async def ingest_request(request: Request, single_file: bool = True) -> str:
+    """
+    Stream a multipart request body into a fresh scratch directory and make it
+    the request's parsed form. Returns the scratch directory, which is only
+    created once something is written to it (small requests stay in memory).
+    Raises UploadTooLarge as soon as a limit is known to be exceeded: from the
+    Content-Length for single-file requests, else from each part's byte count.
+    The directory counts as in use until release_scratch_dir().
+    """
+    content_length = _content_length(request)
+    if content_length is not None:
+        if content_length > max(size_limit(c) for c in config.UPLOAD_LIMITS_MB) + MAX_FIELD_BYTES:
+            raise UploadTooLarge("Upload exceeds the maximum allowed size")
+
+    await run_in_pool(sweep_scratch_dirs)
+    scratch_dir = os.path.join(config.TEMP_DIR, uuid.uuid4().hex)
+    _active_dirs.add(scratch_dir)
+    try:
+        request._form = await StreamingIngest(request, scratch_dir, single_file).parse()
+    except BaseException:
+        release_scratch_dir(scratch_dir)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        raise
+    return scratch_dir
@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import contextvars
+import copy
+import functools
+import io
+import json
+import os
+import time
+import uuid
+
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.datastructures import UploadFile  # base class of fastapi.UploadFile; form values are this type
+
+from backend import config
+from backend.utils import progress
+from backend.utils.ingest import release_scratch_dir
+
+# Job mode is requested per call with `Prefer: respond-async` or `?mode=job`.
+# ProcessingRoute (backend/utils/routing.py) wraps every POST endpoint, so any
+# existing route can run as a job.
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_job_requested = contextvars.ContextVar("job_requested", default=False)
+
+
+class Job:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        # Set on success: either a file on disk or an in-memory body
+        self.result_path = None
+        self.result_filename = None
+        self.result_body = None
+        self.media_type = None
+        self.progress = progress.Progress()
+        self._task = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in (COMPLETED, FAILED)
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        info = {
+            "job_id": self.id,
+            "operation": self.name,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": round((self.started_at or now) - self.created_at, 3),
+            "elapsed_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+        }
+        snapshot = self.progress.snapshot()
+        if snapshot is not None:
+            # Live while running; once done it is the job's final metrics
+            info["metrics" if self.done else "progress"] = snapshot
+        if self.state == COMPLETED:
+            info["result_url"] = f"/api/jobs/{self.id}/result"
+            info["filename"] = self.result_filename
+        if self.state == FAILED:
+            info["error"] = self.error
+        return info
+
+    async def run(self, coro, uploads: list[UploadFile]):
+        self.state = RUNNING
+        self.started_at = time.time()
+        progress.bind(self.progress)
+        try:
+            result = await coro
+            if isinstance(result, StreamingResponse):
+                result = await self._spool(result)
+            self._store(result)
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            self.progress.finish(self.state == COMPLETED)
+            for upload in uploads:
+                await upload.close()
+            # The scratch directory may now be swept once it is past the TTL
+            for scratch_dir in {getattr(upload, "scratch_dir", None) for upload in uploads} - {None}:
+                release_scratch_dir(scratch_dir)
+
+    async def _spool(self, result: StreamingResponse) -> FileResponse:
+        # Streamed results (e.g. ZIP exports) are built while sent; nobody is
+        # reading yet, so write them to OUTPUT_DIR and keep the file instead.
+        # The job id keeps jobs on same-named uploads from sharing a file
+        filename = getattr(result, "filename", None) or f"{self.id}.bin"
+        path = os.path.join(config.OUTPUT_DIR, f"{self.id}_{filename}")
+        try:
+            with open(path, "wb") as f:
+                async for chunk in result.body_iterator:
+                    await asyncio.to_thread(f.write, chunk)
+        finally:
+            if result.background is not None:
+                await result.background()
+        return FileResponse(path, filename=filename, media_type=result.media_type)
+
+    def _store(self, result):
+        if isinstance(result, FileResponse):
+            self.result_path = result.path
+            self.result_filename = result.filename or os.path.basename(result.path)
+            self.media_type = result.media_type
+        elif isinstance(result, Response):
+            if result.status_code >= 400:
+                try:
+                    self.error = json.loads(result.body).get("error")
+                except (ValueError, AttributeError):
+                    self.error = None
+                self.error = self.error or f"HTTP {result.status_code}"
+                self.state = FAILED
+                return
+            self.result_body = result.body
+            self.result_filename = getattr(result, "filename", None)  # BufferResponse downloads
+            self.media_type = result.media_type
+        else:
+            self.result_body = json.dumps(result).encode("utf-8")
+            self.media_type = "application/json"
+        self.state = COMPLETED
+
+
+# How often an event stream checks a running job's progress
+EVENT_INTERVAL_SECONDS = 0.5
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_events(job: Job):
+    """
+    Server-sent events for a job: `progress` whenever its Progress changed,
+    then one event named after the final state carrying the job status.
+    """
+    version = None
+    while not job.done:
+        if job.progress.version != version:
+            version = job.progress.version
+            snapshot = job.progress.snapshot()
+            if snapshot is not None:
+                yield _event("progress", snapshot)
+        await asyncio.sleep(EVENT_INTERVAL_SECONDS)
+    yield _event(job.state, job.to_dict())
+
+
+_jobs: dict[str, Job] = {}
+
+
+def get_job(job_id: str) -> Job | None:
+    return _jobs.get(job_id)
+
+
+def _purge_expired():
+    cutoff = time.time() - config.JOB_TTL_SECONDS
+    for job_id, job in list(_jobs.items()):
+        if job.done and job.finished_at < cutoff:
+            del _jobs[job_id]
+
+
+def submit(name: str, coro, uploads: list[UploadFile] = None) -> Job:
+    """
+    Schedule an endpoint coroutine as a background job on the running loop.
+    """
+    _purge_expired()
+    job = Job(name)
+    _jobs[job.id] = job
+    job._task = asyncio.get_running_loop().create_task(job.run(coro, uploads or []))
+    return job
+
+
+def _detach_upload(upload: UploadFile) -> UploadFile:
+    # FastAPI closes the request's form files once the response is sent.
+    # Hand the spooled file to a new UploadFile and leave an empty stand-in
+    # behind, so the job keeps reading the same bytes without copying them.
+    detached = copy.copy(upload)
+    upload.file = io.BytesIO()
+    return detached
+
+
+@contextlib.contextmanager
+def job_mode(enabled: bool):
+    """
+    Mark endpoint calls made inside this block as job submissions.
+    """
+    token = _job_requested.set(enabled)
+    try:
+        yield
+    finally:
+        _job_requested.reset(token)
+
+
+def wants_job(request: Request) -> bool:
+    prefer = request.headers.get("prefer", "")
+    return "respond-async" in prefer.lower() or request.query_params.get("mode") == "job"
+
+
+def job_endpoint(endpoint):
+    """
+    Wrap an async endpoint so it can run as a background job when requested.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        if not _job_requested.get():
+            return await endpoint(**kwargs)
+
+        uploads = []
+        for key, value in kwargs.items():
+            if isinstance(value, UploadFile):
+                kwargs[key] = _detach_upload(value)
+                uploads.append(kwargs[key])
+            elif isinstance(value, list) and value and all(isinstance(v, UploadFile) for v in value):
+                kwargs[key] = [_detach_upload(v) for v in value]
+                uploads.extend(kwargs[key])
+
+        job = submit(endpoint.__name__, endpoint(**kwargs), uploads)
+        status_url = f"/api/jobs/{job.id}"
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "state": job.state, "status_url": status_url, "result_url": f"{status_url}/result"},
+            headers={"Location": status_url},
+        )
+
+    return wrapper
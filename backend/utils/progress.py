@@ -0,0 +1,83 @@
+import contextvars
+import threading
+import time
+
+# Progress of long-running processor calls (FFmpeg encodes). Job.run binds a
+# Progress to the job's context and run_in_pool carries that context into the
+# thread pool, so a processor reports with `progress.current()` and does nothing
+# when it is None (plain requests, process-pool work).
+
+_current = contextvars.ContextVar("progress", default=None)
+
+
+def current():
+    return _current.get()
+
+
+def bind(tracker: "Progress"):
+    _current.set(tracker)
+
+
+class Progress:
+    """
+    Media seconds and frames done by one or more FFmpeg processes ("parts",
+    e.g. parallel segments) against the seconds expected in total.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.finished_at = None
+        self.completed = False
+        self.expected_seconds = 0.0
+        self.parts = {}
+        self.version = 0  # bumped on every update, for event streams
+
+    def expect(self, seconds: float):
+        """Add media seconds to process, e.g. once per pass over the input"""
+        with self._lock:
+            self.started_at = self.started_at or time.time()
+            self.expected_seconds += seconds or 0
+            self.version += 1
+
+    def update(self, part: str, seconds: float, frames: int):
+        with self._lock:
+            self.started_at = self.started_at or time.time()
+            self.parts[part] = (seconds, frames)
+            self.version += 1
+
+    def finish(self, completed: bool):
+        """
+        Stop the clock, so the last snapshot serves as the operation's metrics.
+        A completed operation is 100% done even if FFmpeg's last reported
+        time falls short of the probed duration (encoder delay, last frame).
+        """
+        with self._lock:
+            self.finished_at = time.time()
+            self.completed = completed
+            self.version += 1
+
+    def snapshot(self) -> dict:
+        """Percent done, ETA and average frames/s and speed (media seconds per second) so far"""
+        with self._lock:
+            if self.started_at is None:
+                return None
+            elapsed = max((self.finished_at or time.time()) - self.started_at, 1e-6)
+            seconds = sum(done for done, _ in self.parts.values())
+            frames = sum(count for _, count in self.parts.values())
+            expected = self.expected_seconds
+            completed = self.completed
+        info = {
+            "media_seconds": round(seconds, 3),
+            "frames": frames,
+            "fps": round(frames / elapsed, 2),
+            "speed": round(seconds / elapsed, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "percent": None,
+            "eta_seconds": None,
+        }
+        if expected > 0:
+            done = 1.0 if completed else min(seconds / expected, 1.0)
+            info["percent"] = round(done * 100, 1)
+            if done > 0:
+                info["eta_seconds"] = round(elapsed * (1 - done) / done, 1)
+        return info
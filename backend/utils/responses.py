@@ -0,0 +1,51 @@
+import mimetypes
+from urllib.parse import quote
+
+from fastapi.responses import Response, StreamingResponse
+
+# Not in every platform's mime table; FileResponse guesses from the same table
+mimetypes.add_type("application/x-ndjson", ".ndjson")
+
+
+def attachment(filename: str) -> str:
+    """Content-Disposition value for a download, RFC 5987-encoded when needed"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class BufferResponse(Response):
+    """
+    Download response for a result produced in memory (a processor's `*_buffer`
+    variant). Sets Content-Disposition and media type the way FileResponse does,
+    and keeps `filename` around for the result cache and background jobs.
+    """
+    def __init__(self, content: bytes, filename: str, media_type: str = None, headers: dict = None, **kwargs):
+        self.filename = filename
+        if media_type is None:
+            media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        super().__init__(content=content, media_type=media_type, headers=headers, **kwargs)
+        self.headers.setdefault("content-disposition", attachment(filename))
+
+
+class ZipStreamResponse(StreamingResponse):
+    """
+    ZIP download built while it is sent (see utils.zipstream). There is no
+    Content-Length; background jobs spool the stream to OUTPUT_DIR instead.
+    """
+    def __init__(self, content, filename: str, headers: dict = None, **kwargs):
+        self.filename = filename
+        super().__init__(content, media_type="application/zip", headers=headers, **kwargs)
+        self.headers.setdefault("content-disposition", attachment(filename))
+
+
+class NdjsonStreamResponse(StreamingResponse):
+    """
+    Newline-delimited JSON sent as records are produced. Like
+    ZipStreamResponse, keeps `filename` for background jobs to spool to.
+    """
+    def __init__(self, content, filename: str, headers: dict = None, **kwargs):
+        self.filename = filename
+        super().__init__(content, media_type="application/x-ndjson", headers=headers, **kwargs)
+        self.headers.setdefault("content-disposition", attachment(filename))
@@ -0,0 +1,70 @@
+import asyncio
+import inspect
+import shutil
+import typing
+
+from fastapi import Request, UploadFile
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from starlette.background import BackgroundTasks
+
+from backend.utils import jobs
+from backend.utils.cache import cached_endpoint
+from backend.utils.ingest import IngestError, UploadTooLarge, ingest_request, is_multipart, release_scratch_dir
+
+
+def _run_after(response: Response, func, *args):
+    tasks = BackgroundTasks()
+    if response.background is not None:
+        tasks.add_task(response.background)
+    tasks.add_task(func, *args)
+    response.background = tasks
+
+
+def _remove_scratch_dir(scratch_dir: str):
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    release_scratch_dir(scratch_dir)
+
+
+class ProcessingRoute(APIRoute):
+    """
+    Route class for the conversion API. For POST endpoints it:
+    - streams multipart uploads once into a per-request scratch directory (ingest),
+    - answers repeat (content, operation, params) requests from the result cache,
+    - runs the endpoint as a background job when asked (`Prefer: respond-async` or `?mode=job`).
+    """
+    def __init__(self, path: str, endpoint, **kwargs):
+        # Endpoints taking `list[UploadFile]` get several files per request, so the
+        # request's Content-Length says nothing about the size of any one of them
+        self.single_file = not any(
+            typing.get_origin(param.annotation) is list and typing.get_args(param.annotation) == (UploadFile,)
+            for param in inspect.signature(endpoint).parameters.values()
+        )
+        if "POST" in (kwargs.get("methods") or ()) and asyncio.iscoroutinefunction(endpoint):
+            endpoint = jobs.job_endpoint(cached_endpoint(endpoint))
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def processing_handler(request: Request) -> Response:
+            job_mode = jobs.wants_job(request)
+            scratch_dir = None
+            if request.method == "POST" and is_multipart(request):
+                try:
+                    scratch_dir = await ingest_request(request, single_file=self.single_file)
+                except UploadTooLarge as e:
+                    return JSONResponse(status_code=413, content={"error": str(e)})
+                except IngestError as e:
+                    return JSONResponse(status_code=400, content={"error": str(e)})
+
+            with jobs.job_mode(job_mode):
+                response = await handler(request)
+
+            # Background jobs keep their scratch files until they finish and the TTL
+            # sweep removes them; a job request that was not accepted has no job
+            if scratch_dir and not (job_mode and response.status_code == 202):
+                _run_after(response, _remove_scratch_dir, scratch_dir)
+            return response
+
+        return processing_handler
@@ -0,0 +1,53 @@
+import zipfile
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+class _Sink:
+    """
+    Write-only file object that hands back whatever zipfile wrote since the
+    last take(). Not seekable, so zipfile uses data descriptors and never
+    needs the whole archive in memory or on disk.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries, compression: int = zipfile.ZIP_DEFLATED):
+    """
+    Yield a ZIP archive piece by piece, compressing while it is sent.
+    `entries` is an iterable of (arcname, source) where source is a file path
+    or bytes. Sync generator: StreamingResponse runs it on a worker thread.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression) as zf:
+        for arcname, source in entries:
+            if isinstance(source, (bytes, bytearray)):
+                zf.writestr(arcname, source)
+            else:
+                # from_file records the size up front, so zip64 is chosen correctly
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = compression
+                with open(source, "rb") as src, zf.open(info, "w") as dest:
+                    for chunk in iter(lambda: src.read(ZIP_CHUNK_SIZE), b""):
+                        dest.write(chunk)
+                        data = sink.take()
+                        if data:
+                            yield data
+            data = sink.take()
+            if data:
+                yield data
+    # Central directory, written when the archive is closed
+    yield sink.take()
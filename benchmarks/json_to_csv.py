@@ -0,0 +1,85 @@
+"""
+Throughput of DataProcessor.json_to_csv on generated JSON array and NDJSON inputs.
+
+    python benchmarks/json_to_csv.py --records 1000000
+
+Records are mostly uniform with a nested object and a field that only appears
+late in the file, so both key discovery and dotted flattening are exercised.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.core.data_processor import DataProcessor
+
+
+def make_record(i: int, total: int) -> dict:
+    record = {
+        "id": i,
+        "name": f"user{i}",
+        "score": i * 0.5,
+        "active": i % 2 == 0,
+        "address": {"city": "Springfield", "zip": f"{i % 100000:05d}", "geo": {"lat": 1.25, "lon": -2.5}},
+        "tags": ["a", "b"],
+    }
+    if i > total * 0.9:
+        record["late_field"] = i
+    return record
+
+
+def write_input(path: str, records: int, ndjson: bool):
+    with open(path, "w", encoding="utf-8") as f:
+        if ndjson:
+            for i in range(records):
+                f.write(json.dumps(make_record(i, records)))
+                f.write("\n")
+        else:
+            f.write("[")
+            for i in range(records):
+                if i:
+                    f.write(",")
+                f.write(json.dumps(make_record(i, records)))
+            f.write("]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, ndjson, ext in (("json array", False, "json"), ("ndjson", True, "ndjson")):
+            input_path = os.path.join(tmp, f"input.{ext}")
+            write_input(input_path, args.records, ndjson)
+            size_mb = os.path.getsize(input_path) / (1024 * 1024)
+
+            start = time.perf_counter()
+            output_path = DataProcessor.json_to_csv(input_path, tmp)
+            elapsed = time.perf_counter() - start
+
+            with open(output_path, encoding="utf-8") as f:
+                header = f.readline().strip()
+            print(f"{label:>10}: {args.records:,} records, {size_mb:,.0f} MB in {elapsed:.1f}s "
+                  f"({args.records / elapsed:,.0f} records/s, {size_mb / elapsed:.1f} MB/s)")
+            print(f"{'':>10}  columns: {header}")
+
+    if resource is None:
+        return
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
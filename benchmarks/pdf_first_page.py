@@ -0,0 +1,117 @@
+"""
+Time to first page for a normal vs a linearized PDF, for a viewer that reads
+the file while it downloads.
+
+    python benchmarks/pdf_first_page.py --pages 100 --mbps 2 10 50
+
+A viewer needs a cross-reference table to find page 1's objects. In a normal
+PDF it is at the end, so page 1 waits for the whole file. A linearized file
+starts with a first-page cross-reference and page 1's objects, ending at the
+/E offset of its linearization dictionary. The benchmark checks that every
+object page 1 uses lies before /E, then reports download time at each
+bandwidth plus the measured time to render page 1.
+"""
+import argparse
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fitz
+import pikepdf
+from PIL import Image
+
+from backend.core.pdf_processor import PDFProcessor
+
+
+def write_document(path: str, pages: int):
+    # A title and a distinct photo per page, like a scanned report
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}", fontsize=24)
+        photo = io.BytesIO()
+        Image.effect_noise((900, 600), 20 + i % 50).convert("RGB").save(photo, "JPEG", quality=80)
+        page.insert_image(fitz.Rect(72, 100, 520, 400), stream=photo.getvalue())
+    doc.save(path, garbage=4, deflate=True)
+    doc.close()
+
+
+def first_page_objects(path: str) -> set[int]:
+    """Object numbers reachable from page 1, not following /Parent"""
+    with pikepdf.open(path) as pdf:
+        seen, stack = set(), [pdf.pages[0].obj]
+        while stack:
+            obj = stack.pop()
+            if not isinstance(obj, pikepdf.Object):  # numbers, names and strings come back as Python values
+                continue
+            if obj.is_indirect:
+                if obj.objgen[0] in seen:
+                    continue
+                seen.add(obj.objgen[0])
+            if isinstance(obj, pikepdf.Stream):
+                obj = obj.stream_dict
+            if isinstance(obj, pikepdf.Dictionary):
+                stack.extend(value for key, value in obj.items() if key != "/Parent")
+            elif isinstance(obj, pikepdf.Array):
+                stack.extend(obj)
+        return seen
+
+
+def bytes_to_first_page(path: str) -> int:
+    with open(path, "rb") as f:
+        data = f.read()
+    match = re.search(rb"/Linearized 1.*?/E (\d+)", data[:1024], re.S)
+    if match is None:
+        return len(data)
+    end = int(match.group(1))
+    missing = [num for num in first_page_objects(path) if not re.search(rb"(?<!\d)%d 0 obj" % num, data[:end])]
+    if missing:
+        raise SystemExit(f"objects {missing[:5]} of page 1 are after /E")
+    return end
+
+
+def render_seconds(path: str) -> float:
+    start = time.perf_counter()
+    with fitz.open(path) as doc:
+        doc[0].get_pixmap(dpi=96)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--mbps", type=float, nargs="+", default=[2, 10, 50], help="download speeds in Mbit/s")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        normal = os.path.join(work_dir, "normal.pdf")
+        linear = os.path.join(work_dir, "linear.pdf")
+        write_document(normal, args.pages)
+        shutil.copyfile(normal, linear)
+        start = time.perf_counter()
+        PDFProcessor.linearize(linear)
+        print(f"{args.pages} pages, linearized in {time.perf_counter() - start:.2f}s")
+
+        results = {}
+        for name, path in (("normal", normal), ("linearized", linear)):
+            results[name] = (os.path.getsize(path), bytes_to_first_page(path), render_seconds(path))
+            size, needed, _ = results[name]
+            print(f"{name:>10}: {size / 1e6:.1f} MB, page 1 needs the first {needed / 1e6:.2f} MB")
+
+        print(f"\n{'Mbit/s':>8} {'normal':>10} {'linearized':>12}")
+        for mbps in args.mbps:
+            row = [needed * 8 / (mbps * 1e6) + render for _, needed, render in results.values()]
+            print(f"{mbps:>8g} {row[0]:>9.2f}s {row[1]:>11.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Wall time of AVProcessor.convert_media re-encoding a long video in one FFmpeg
+process vs in keyframe-aligned segments encoded in parallel.
+
+    python benchmarks/video_segments.py --seconds 300 --workers 1 2 4 8
+
+The input is generated locally: FFmpeg's testsrc2 pattern with a sine tone,
+stored as MPEG-2 with a keyframe every 2 s, so MP4 output has to re-encode the
+video (libx264) and the AAC audio. `--workers 1` is the single-process path.
+Each output's frame count is checked against the input.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import config
+from backend.core.av_processor import AVProcessor
+
+
+def write_input(path: str, seconds: int, size: str):
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+        "-t", str(seconds), "-c:v", "mpeg2video", "-q:v", "4", "-g", "60", "-c:a", "pcm_s16le", path
+    ], check=True)
+
+
+def frame_count(path: str) -> int:
+    output = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0", "-count_packets",
+        "-show_entries", "stream=nb_read_packets", "-of", "csv=p=0", path
+    ], check=True, stdout=subprocess.PIPE).stdout
+    return int(output.split(b",")[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, config.CPU_COUNT])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(work_dir, "source.mkv")
+        write_input(source, args.seconds, args.size)
+        frames = frame_count(source)
+        print(f"{args.seconds}s {args.size} input, {frames} frames, {config.CPU_COUNT} CPUs\n")
+        config.SEGMENT_MIN_SECONDS = 1
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'MB':>6}")
+        for workers in sorted(set(args.workers)):
+            config.SEGMENT_WORKERS = workers
+            run_dir = os.path.join(work_dir, f"w{workers}")
+            os.makedirs(run_dir)
+            start = time.perf_counter()
+            output = AVProcessor.convert_media(source, "mp4", run_dir)
+            elapsed = time.perf_counter() - start
+            if frame_count(output) != frames:
+                raise SystemExit(f"{workers} workers: {frame_count(output)} frames, expected {frames}")
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x {os.path.getsize(output) / 1e6:>6.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
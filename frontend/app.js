@@ -4,7 +4,7 @@ const themeBtn = document.getElementById('theme-toggle');
 
 function updateLabel(input) {
     if (input.files && input.files.length > 0) {
-        const name = input.files[0].name;
+        const name = input.files.length > 1 ? `${input.files.length} FILES` : input.files[0].name;
         // Find the sibling label's file-name span
         const wrapper = input.parentElement;
         const nameSpan = wrapper.querySelector('.file-name');
@@ -14,6 +14,25 @@ function updateLabel(input) {
     }
 }
 
+// PDF thumbnail: register the upload once, then render single pages on demand
+async function previewPdf(input) {
+    const preview = document.getElementById('pdf-preview');
+    preview.style.display = 'none';
+    if (!input.files || input.files.length === 0) return;
+
+    const formData = new FormData();
+    formData.append('file', input.files[0]);
+    try {
+        const response = await fetch('/api/pdf/open', { method: 'POST', body: formData });
+        if (!response.ok) return;
+        const info = await response.json();
+        preview.src = info.page_url.replace('{n}', '1') + '?dpi=36';
+        preview.style.display = 'block';
+    } catch (e) {
+        console.error(e);
+    }
+}
+
 // Theme Logic
 themeBtn.addEventListener('click', () => {
     document.body.classList.toggle('dark-mode');
@@ -551,6 +570,7 @@ async function executeSmartAction(action) {
             url = '/api/compress/image';
             const size = prompt("Target Size (KB):", "500");
             formData.append('size_kb', size || 500);
+            formData.append('target_format', 'auto');
             break;
         case 'compress_pdf':
             url = '/api/compress/pdf';
@@ -614,9 +634,11 @@ async function executeSmartAction(action) {
         case 'video_to_gif':
             const gifFps = prompt("FPS (frames per second, 5-15 recommended):", "10");
             const gifWidth = prompt("Width in pixels (480-720 recommended):", "480");
+            const gifFormat = prompt("Output (gif, webp, mp4 - webp/mp4 are much smaller):", "gif");
             url = '/api/convert/video-to-gif';
             formData.append('fps', gifFps || 10);
             formData.append('width', gifWidth || 480);
+            formData.append('format', gifFormat || 'gif');
             break;
         case 'beautify_js':
             url = '/api/format/beautify-js';
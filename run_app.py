@@ -1,6 +1,7 @@
 import sys
 import os
 import threading
+import multiprocessing
 import time
 import socket
 import uvicorn
@@ -54,6 +55,8 @@ class MainWindow(QMainWindow):
         self.browser.setUrl(QUrl(f"http://127.0.0.1:{PORT}"))
 
 if __name__ == "__main__":
+    # Required for the processor pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     try:
         # Start API in a separate thread
         api_thread = threading.Thread(target=start_server, daemon=True)
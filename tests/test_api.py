@@ -0,0 +1,547 @@
+import unittest
+import io
+import time
+import shutil
+from PIL import Image
+from fastapi.testclient import TestClient
+from backend.main import app
+
+
+def png_bytes(size=(80, 40), color='blue'):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        # Keep one event loop alive for the whole test so background jobs can finish
+        self.client = TestClient(app).__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+
+    def wait_for(self, job_id):
+        for _ in range(100):
+            status = self.client.get(f"/api/jobs/{job_id}").json()
+            if status["state"] in ("completed", "failed"):
+                return status
+            time.sleep(0.05)
+        self.fail("job did not finish")
+
+    def test_job_round_trip(self):
+        response = self.client.post(
+            "/api/resize/image",
+            headers={"Prefer": "respond-async"},
+            files={"file": ("job.png", png_bytes(), "image/png")},
+            data={"percentage": "50"},
+        )
+        self.assertEqual(response.status_code, 202)
+        status = self.wait_for(response.json()["job_id"])
+        self.assertEqual(status["state"], "completed")
+
+        result = self.client.get(status["result_url"])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(Image.open(io.BytesIO(result.content)).size, (40, 20))
+
+    def test_job_failure(self):
+        response = self.client.post(
+            "/api/convert/image?mode=job",
+            files={"file": ("job.png", png_bytes(), "image/png")},
+            data={"target_format": "nope"},
+        )
+        status = self.wait_for(response.json()["job_id"])
+        self.assertEqual(status["state"], "failed")
+        self.assertIn("Unsupported format", status["error"])
+
+    @unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "FFmpeg not installed")
+    def test_job_progress_events(self):
+        import json
+        import subprocess
+        clip = subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=10", "-t", "2",
+            "-c:v", "mpeg2video", "-f", "matroska", "pipe:1"
+        ], check=True, stdout=subprocess.PIPE).stdout
+        response = self.client.post(
+            "/api/convert/media?mode=job",
+            files={"file": ("clip.mkv", clip, "video/x-matroska")},
+            data={"target_format": "mp4"},
+        )
+        job_id = response.json()["job_id"]
+        # The stream ends once the job is done
+        events = self.client.get(f"/api/jobs/{job_id}/events")
+        self.assertEqual(events.headers["content-type"], "text/event-stream; charset=utf-8")
+        last = events.text.strip().split("\n\n")[-1].split("\n")
+        self.assertEqual(last[0], "event: completed")
+        metrics = json.loads(last[1][len("data: "):])["metrics"]
+        self.assertEqual((metrics["frames"], metrics["percent"]), (20, 100.0))
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}").json()["metrics"]["frames"], 20)
+
+    @unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "FFmpeg not installed")
+    def test_media_renditions_zip(self):
+        import subprocess
+        import zipfile
+        clip = subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=128x96:rate=10",
+            "-f", "lavfi", "-i", "sine", "-t", "1", "-c:v", "mpeg4", "-c:a", "pcm_s16le", "-f", "matroska", "pipe:1"
+        ], check=True, stdout=subprocess.PIPE).stdout
+        response = self.client.post(
+            "/api/convert/media-renditions",
+            files={"file": ("clip.mkv", clip, "video/x-matroska")},
+            data={"renditions": "mp4:48p,mp4:48p:100k,mp3:64k"},
+        )
+        self.assertEqual(response.status_code, 200)
+        names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+        self.assertEqual(names, ["clip_48p.mp4", "clip_48p_100k.mp4", "clip_64k.mp3"])
+
+        response = self.client.post(
+            "/api/convert/media-renditions",
+            files={"file": ("clip.mkv", clip, "video/x-matroska")},
+            data={"renditions": "mp3:720p"},
+        )
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("no video", response.json()["error"])
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_upload_too_large(self):
+        from unittest import mock
+        from backend import config
+        with mock.patch.dict(config.UPLOAD_LIMITS_MB, {"image": 1}):
+            response = self.client.post(
+                "/api/convert/image",
+                files={"file": ("big.png", png_bytes() + b"0" * (3 * 1024 * 1024), "image/png")},
+                data={"target_format": "JPG"},
+            )
+        self.assertEqual(response.status_code, 413)
+
+    def test_multi_file_total_over_limit(self):
+        from unittest import mock
+        from backend import config
+        photo = io.BytesIO()
+        Image.effect_noise((300, 300), 60).convert("RGB").save(photo, "JPEG", quality=95)
+        # Each file is under the 1 MB image limit, the request as a whole is not
+        count = 3 * 1024 * 1024 // len(photo.getvalue()) + 1
+        with mock.patch.dict(config.UPLOAD_LIMITS_MB, {"image": 1}):
+            response = self.client.post(
+                "/api/convert/images-to-pdf",
+                files=[("files", (f"a{i}.jpg", photo.getvalue(), "image/jpeg")) for i in range(count)],
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(
+                "/api/convert/images-to-pdf",
+                files=[("files", ("big.jpg", photo.getvalue() * count, "image/jpeg"))],
+            )
+            self.assertEqual(response.status_code, 413)
+
+    def test_client_path_is_stripped(self):
+        response = self.client.post(
+            "/api/convert/image",
+            files={"file": ("../../escape.png", png_bytes(), "image/png")},
+            data={"target_format": "JPG"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="escape.jpg"', response.headers["content-disposition"])
+
+    def test_small_upload_skips_disk(self):
+        import os
+        from backend import config
+        response = self.client.post(
+            "/api/convert/csv-to-json",
+            files={"file": ("in_memory_test.csv", f"t\n{time.time()}\n".encode(), "text/csv")},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="in_memory_test.json"', response.headers["content-disposition"])
+        self.assertFalse(os.path.exists(os.path.join(config.OUTPUT_DIR, "in_memory_test.json")))
+
+    def test_sweep_skips_active_scratch_dirs(self):
+        import os
+        from unittest import mock
+        from backend import config
+        from backend.utils import ingest
+        stale = [os.path.join(config.TEMP_DIR, f"sweep_test_{name}") for name in ("active", "done")]
+        for path in stale:
+            os.makedirs(path, exist_ok=True)
+            os.utime(path, (0, 0))
+        ingest._active_dirs.add(stale[0])
+        try:
+            with mock.patch.object(ingest, "_last_sweep", 0.0):
+                ingest.sweep_scratch_dirs()
+            self.assertTrue(os.path.isdir(stale[0]))
+            self.assertFalse(os.path.isdir(stale[1]))
+        finally:
+            ingest.release_scratch_dir(stale[0])
+            shutil.rmtree(stale[0], ignore_errors=True)
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_key_uses_raw_params(self):
+        data = f"cache key {time.time()}".encode()
+
+        def post(action):
+            return self.client.post(
+                "/api/dev/base64",
+                files={"file": ("key.txt", data, "text/plain")},
+                data={"action": action},
+            )
+
+        self.assertEqual(post("encode").headers["X-Cache"], "MISS")
+        self.assertEqual(post("encode").headers["X-Cache"], "HIT")
+        self.assertNotEqual(post("Encode").headers.get("X-Cache"), "HIT")
+
+    def test_hit_replays_result_headers(self):
+        def post():
+            return self.client.post(
+                "/api/compress/image",
+                files={"file": ("stats.png", png_bytes((64, 64), "teal"), "image/png")},
+                data={"size_kb": "5", "target_format": "jpeg"},
+            )
+
+        miss = post()
+        hit = post()
+        self.assertEqual(hit.headers["X-Cache"], "HIT")
+        self.assertEqual(hit.headers["X-Compression-Stats"], miss.headers["X-Compression-Stats"])
+
+class TestPDF(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def pdf_bytes(self, pages=6):
+        import fitz
+        doc = fitz.open()
+        for i in range(pages):
+            doc.new_page(width=144, height=72).insert_text((10, 40), f"page {i + 1} {time.time()}")
+        data = doc.tobytes()
+        doc.close()
+        return data
+
+    def test_pdf_to_image_pages_and_dpi(self):
+        import zipfile
+        response = self.client.post(
+            "/api/convert/pdf-to-image",
+            files={"file": ("manual.pdf", self.pdf_bytes(), "application/pdf")},
+            data={"format": "png", "dpi": "36", "pages": "5-6,1"},
+        )
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["manual_page_5.png", "manual_page_6.png", "manual_page_1.png"])
+        self.assertEqual(Image.open(archive.open("manual_page_1.png")).size, (72, 36))
+
+        # Repeated pages are rendered once, where they first appear
+        response = self.client.post(
+            "/api/convert/pdf-to-image",
+            files={"file": ("manual.pdf", self.pdf_bytes(), "application/pdf")},
+            data={"pages": "3,1-3,2,3"},
+        )
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["manual_page_3.png", "manual_page_1.png", "manual_page_2.png"])
+
+        response = self.client.post(
+            "/api/convert/pdf-to-image",
+            files={"file": ("manual.pdf", self.pdf_bytes(), "application/pdf")},
+            data={"pages": "9"},
+        )
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("outside 1-6", response.json()["error"])
+
+    def test_page_preview(self):
+        from unittest import mock
+        from backend.core import pdf_processor
+        response = self.client.post("/api/pdf/open", files={"file": ("preview.pdf", self.pdf_bytes(3), "application/pdf")})
+        self.assertEqual(response.status_code, 200)
+        info = response.json()
+        self.assertEqual(info["pages"], 3)
+        url = info["page_url"].replace("{n}", "2")
+
+        first = self.client.get(url, params={"dpi": 144})
+        second = self.client.get(url, params={"dpi": 144})
+        self.assertEqual(first.headers["x-cache"], "MISS")
+        self.assertEqual(second.headers["x-cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(Image.open(io.BytesIO(first.content)).size, (288, 144))
+
+        # Rendering more pages reuses the open document
+        from backend.utils.cache import result_cache
+        from backend.api import pdf_source_key
+        source = result_cache.get(pdf_source_key(info["doc_id"]))["path"]
+        with mock.patch.object(pdf_processor.fitz, "open", wraps=pdf_processor.fitz.open) as opened:
+            for page in range(3):
+                pdf_processor.PDFProcessor.render_page(source, page, 36)
+        self.assertLessEqual(opened.call_count, 1)
+
+        self.assertEqual(self.client.get(info["page_url"].replace("{n}", "4")).status_code, 404)
+        self.assertEqual(self.client.get("/api/pdf/" + "0" * 64 + "/page/1").status_code, 404)
+
+    def test_extract_embedded_images(self):
+        import fitz
+        import zipfile
+        jpeg = io.BytesIO()
+        Image.new("RGB", (120, 80), "green").save(jpeg, "JPEG", comment=str(time.time()).encode())
+        logo = io.BytesIO()
+        Image.new("RGBA", (20, 20), (255, 0, 0, 128)).save(logo, "PNG")
+        doc = fitz.open()
+        for i in range(3):
+            page = doc.new_page(width=200, height=200)
+            page.insert_image(fitz.Rect(0, 0, 120, 80), stream=jpeg.getvalue())
+        doc[2].insert_image(fitz.Rect(0, 100, 20, 120), stream=logo.getvalue())
+        # A CMYK JPEG with a soft mask: decoded and masked, not copied as stored
+        cmyk = io.BytesIO()
+        Image.new("CMYK", (20, 20), (0, 255, 255, 0)).save(cmyk, "JPEG")
+        masked = doc[2].insert_image(fitz.Rect(0, 150, 20, 170), stream=cmyk.getvalue())
+        mask = doc.get_new_xref()
+        doc.update_object(mask, "<</Type/XObject/Subtype/Image/Width 20/Height 20/ColorSpace/DeviceGray/BitsPerComponent 8>>")
+        doc.update_stream(mask, bytes([128]) * 400)
+        doc.xref_set_key(masked, "SMask", f"{mask} 0 R")
+
+        response = self.client.post("/api/extract/images", files={"file": ("scan.pdf", doc.tobytes(), "application/pdf")})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        names = archive.namelist()
+        # The JPEG shared by all pages comes out once, byte for byte
+        self.assertEqual(len(names), 3)
+        self.assertTrue(names[0].startswith("scan_page_1_img_") and names[0].endswith(".jpg"))
+        self.assertEqual(archive.read(names[0]), jpeg.getvalue())
+        self.assertTrue(names[1].startswith("scan_page_3_img_") and names[1].endswith(".png"))
+        self.assertEqual(Image.open(archive.open(names[1])).getpixel((5, 5)), (255, 0, 0, 128))
+        self.assertTrue(names[2].endswith(".png"))
+        self.assertEqual(Image.open(archive.open(names[2])).getpixel((5, 5))[3], 128)
+
+        response = self.client.post("/api/extract/images", files={"file": ("text.pdf", self.pdf_bytes(1), "application/pdf")})
+        self.assertEqual(response.status_code, 404)
+
+    def test_compress_pdf_images(self):
+        import fitz
+        import json
+        scan = io.BytesIO()
+        Image.effect_noise((1200, 800), 40).convert("RGB").save(scan, "JPEG", quality=90, comment=str(time.time()).encode())
+        logo = io.BytesIO()
+        Image.new("RGB", (40, 40), "red").save(logo, "PNG")
+        doc = fitz.open()
+        for _ in range(2):
+            doc.new_page(width=300, height=300).insert_image(fitz.Rect(0, 0, 144, 96), stream=scan.getvalue())
+        doc[1].insert_image(fitz.Rect(0, 200, 40, 240), stream=logo.getvalue())
+
+        response = self.client.post(
+            "/api/compress/pdf",
+            files={"file": ("scan.pdf", doc.tobytes(), "application/pdf")},
+            data={"level": "medium"},
+        )
+        self.assertEqual(response.status_code, 200)
+        stats = json.loads(response.headers["x-compression-stats"])
+        self.assertEqual((stats["dpi"], stats["images_recompressed"]), (150, 1))
+        # The scan is shared by both pages, so its savings count on page 1
+        self.assertGreater(stats["page_bytes_saved"][0], 0)
+        self.assertEqual(stats["page_bytes_saved"][1], 0)
+        self.assertLess(stats["bytes_after"], stats["bytes_before"] // 4)
+        with fitz.open("pdf", response.content) as out:
+            # 1200 px over 2 inches is 600 DPI, resampled to 150 DPI
+            sizes = sorted((w, h) for _, _, w, h, *_ in out[1].get_images(full=True))
+            self.assertEqual(sizes, [(40, 40), (300, 200)])
+
+        response = self.client.post(
+            "/api/compress/pdf",
+            files={"file": ("scan.pdf", doc.tobytes(), "application/pdf")},
+            data={"level": "high", "grayscale": "true"},
+        )
+        with fitz.open("pdf", response.content) as out:
+            images = {w: cs for _, _, w, _, _, cs, *_ in out[0].get_images(full=True)}
+            self.assertEqual(images, {192: "DeviceGray"})
+
+    def test_images_to_pdf(self):
+        import fitz
+        photo = io.BytesIO()
+        Image.effect_noise((160, 120), 50).convert("RGB").save(photo, "JPEG", comment=str(time.time()).encode())
+        webp = io.BytesIO()
+        Image.new("RGB", (50, 50), "red").save(webp, "WEBP")
+        files = [
+            ("files", ("b.jpg", photo.getvalue(), "image/jpeg")),
+            ("files", ("a.png", png_bytes((96, 48), "green"), "image/png")),
+            ("files", ("c.webp", webp.getvalue(), "image/webp")),
+        ]
+        response = self.client.post("/api/convert/images-to-pdf", files=files)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="b.pdf"', response.headers["content-disposition"])
+        with fitz.open("pdf", response.content) as doc:
+            self.assertEqual([page.rect.width for page in doc], [120, 72, 37.5])  # 96 DPI
+            # The JPEG is embedded byte for byte, the PNG keeps its compressed data
+            xref = doc[0].get_images()[0][0]
+            self.assertEqual(doc.xref_stream_raw(xref), photo.getvalue())
+            self.assertEqual(doc[1].get_pixmap().pixel(10, 10), (0, 128, 0))
+
+        response = self.client.post("/api/convert/images-to-pdf", files=files[:2], data={"percentage": "50"})
+        with fitz.open("pdf", response.content) as doc:
+            self.assertEqual([page.get_images()[0][2] for page in doc], [80, 48])
+
+    def test_linearized_and_incremental(self):
+        import fitz
+        import json
+        import pikepdf
+        response = self.client.post(
+            "/api/convert/images-to-pdf",
+            files=[("files", ("fast.png", png_bytes(), "image/png")), ("files", ("b.png", png_bytes(), "image/png"))],
+            data={"linearize": "true"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"/Linearized 1", response.content[:1024])
+        with pikepdf.open(io.BytesIO(response.content)) as pdf:
+            self.assertTrue(pdf.is_linearized)
+
+        original = self.pdf_bytes(3)
+        doc_id = self.client.post("/api/pdf/open", files={"file": ("report.pdf", original, "application/pdf")}).json()["doc_id"]
+        response = self.client.post(f"/api/pdf/{doc_id}/edit", data={"rotate": "90", "pages": "2-", "title": "Q3"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="report_edited.pdf"', response.headers["content-disposition"])
+        # Incremental update: the original file plus the changed objects
+        self.assertTrue(response.content.startswith(original))
+        self.assertTrue(json.loads(response.headers["x-edit-stats"])["incremental"])
+        with fitz.open("pdf", response.content) as doc:
+            self.assertEqual([page.rotation for page in doc], [0, 90, 90])
+            self.assertEqual(doc.metadata["title"], "Q3")
+
+        response = self.client.post(f"/api/pdf/{doc_id}/edit", data={"rotate": "180", "incremental": "false"})
+        self.assertFalse(response.content.startswith(original))
+        with fitz.open("pdf", response.content) as doc:
+            self.assertEqual([page.rotation for page in doc], [180, 180, 180])
+        self.assertEqual(self.client.post("/api/pdf/" + "0" * 64 + "/edit", data={"rotate": "90"}).status_code, 404)
+
+    def test_split_and_merge(self):
+        import fitz
+        import zipfile
+        logo = io.BytesIO()
+        Image.effect_noise((200, 100), 40).convert("RGB").save(logo, "JPEG")
+        doc = fitz.open()
+        for i in range(5):
+            page = doc.new_page(width=200, height=200)
+            page.insert_text((10, 150), f"page {i + 1} {time.time()}")
+            page.insert_image(fitz.Rect(0, 0, 200, 100), stream=logo.getvalue())
+        source = doc.tobytes(garbage=4)
+
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")}, data={"every": "2"})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["book_pages_1-2.pdf", "book_pages_3-4.pdf", "book_pages_5.pdf"])
+        with fitz.open("pdf", archive.read("book_pages_3-4.pdf")) as part:
+            self.assertEqual(len(part), 2)
+            self.assertTrue(part[0].get_text().startswith("page 3"))
+
+        # One range is one PDF; the image shared by its pages is copied once
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")}, data={"ranges": "2-3,5"})
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(response.content)).namelist(), ["book_pages_2-3.pdf", "book_pages_5.pdf"])
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")}, data={"ranges": "1-4"})
+        with fitz.open("pdf", response.content) as part:
+            self.assertEqual(len(part), 4)
+            self.assertEqual(len({xref for page in part for xref, *_ in page.get_images()}), 1)
+        # A trailing comma adds no part
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")}, data={"ranges": "1-5,"})
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        with fitz.open("pdf", response.content) as part:
+            self.assertEqual(len(part), 5)
+
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")})
+        self.assertEqual(response.status_code, 500)
+        response = self.client.post("/api/pdf/split", files={"file": ("book.pdf", source, "application/pdf")}, data={"ranges": " , "})
+        self.assertEqual(response.status_code, 500)
+
+        response = self.client.post("/api/pdf/merge", files=[
+            ("files", ("book.pdf", source, "application/pdf")),
+            ("files", ("notes.pdf", self.pdf_bytes(2), "application/pdf")),
+            ("files", ("book.pdf", source, "application/pdf")),
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="book_merged.pdf"', response.headers["content-disposition"])
+        with fitz.open("pdf", response.content) as merged:
+            self.assertEqual(len(merged), 12)
+            # The logo and font are identical across files and written once
+            self.assertEqual(len({xref for page in merged for xref, *_ in page.get_images()}), 1)
+            self.assertEqual(len({xref for page in merged for xref, *_ in page.get_fonts()}), 1)
+            self.assertTrue(merged[7].get_text().startswith("page 1 "))
+
+    def test_pdf_text_ndjson(self):
+        import json
+        response = self.client.post(
+            "/api/extract/pdf-text",
+            files={"file": ("manual.pdf", self.pdf_bytes(40), "application/pdf")},
+            data={"pages": "3-", "blocks": "true"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        # In page order, although the chunks run in parallel
+        self.assertEqual([r["page"] for r in records], list(range(3, 41)))
+        self.assertTrue(records[0]["text"].startswith("page 3 "))
+        self.assertEqual((records[0]["width"], records[0]["height"]), (144, 72))
+        block = records[0]["blocks"][0]
+        self.assertEqual(len(block["bbox"]), 4)
+        self.assertTrue(block["text"].startswith("page 3 "))
+
+        response = self.client.post("/api/extract/pdf-text", files={"file": ("manual.pdf", self.pdf_bytes(2), "application/pdf")})
+        self.assertEqual([json.loads(line).keys() for line in response.text.splitlines()], [{"page", "text"}] * 2)
+
+class TestSheetExport(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app).__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+
+    def workbook_bytes(self):
+        import openpyxl
+        wb = openpyxl.Workbook()
+        wb.active.title = "Sales"
+        wb.active.append(["id", "total"])
+        for i in range(5):
+            wb.active.append([i, i * 1.5])
+        other = wb.create_sheet("Q1|Q2")
+        other.append(["x"])
+        other.append([time.time()])
+        buf = io.BytesIO()
+        wb.save(buf)
+        return buf.getvalue()
+
+    def test_all_sheets_zip(self):
+        import json
+        import zipfile
+        response = self.client.post(
+            "/api/convert/excel-to-csv",
+            files={"file": ("book.xlsx", self.workbook_bytes(), "application/octet-stream")},
+            data={"sheets": "all"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/zip")
+        self.assertIn('filename="book_sheets.zip"', response.headers["content-disposition"])
+
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["Sales.csv", "Q1_Q2.csv", "_manifest.json"])
+        self.assertEqual(archive.read("Sales.csv").decode().splitlines()[:2], ["id,total", "0,0"])
+        manifest = json.loads(archive.read("_manifest.json"))
+        self.assertEqual([(s["sheet"], s["rows"]) for s in manifest["sheets"]], [("Sales", 6), ("Q1|Q2", 2)])
+        self.assertEqual(manifest["total_rows"], 8)
+        self.assertEqual(json.loads(response.headers["x-sheet-stats"])["total_rows"], 8)
+
+        # As a background job the stream is spooled to a file, one per job even
+        # when two jobs name their results the same (book_sheets.zip)
+        job_ids = [
+            self.client.post(
+                f"/api/convert/excel-to-{target}?mode=job",
+                files={"file": ("book.xlsx", self.workbook_bytes(), "application/octet-stream")},
+                data={"sheets": "all"},
+            ).json()["job_id"]
+            for target in ("json", "csv")
+        ]
+        results = []
+        for job_id in job_ids:
+            for _ in range(100):
+                status = self.client.get(f"/api/jobs/{job_id}").json()
+                if status["state"] in ("completed", "failed"):
+                    break
+                time.sleep(0.05)
+            self.assertEqual(status["state"], "completed")
+            results.append(self.client.get(status["result_url"]))
+        archive = zipfile.ZipFile(io.BytesIO(results[0].content))
+        self.assertEqual(json.loads(archive.read("Sales.json"))[1], {"id": 1, "total": 1.5})
+        self.assertIn('filename="book_sheets.zip"', results[0].headers["content-disposition"])
+        self.assertIn("Sales.csv", zipfile.ZipFile(io.BytesIO(results[1].content)).namelist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,16 @@
 import unittest
+import unittest.mock
+import importlib.util
+import io
 import os
 import shutil
 from backend.core.image_processor import ImageProcessor
 from backend.core.archive_processor import ArchiveProcessor
+from backend.core.av_processor import AVProcessor
+from backend.core.data_processor import DataProcessor
+from backend.utils import executor
+from backend.utils.cache import ResultCache
+from backend.utils.ingest import sniff
 
 # Note: Testing PDF/AV/Doc requires external deps (FFmpeg, LibreOffice) which might not be present in this env.
 # We will test what we can (Image, Archive).
@@ -42,5 +50,325 @@ class TestCore(unittest.TestCase):
         ArchiveProcessor.extract_zip(zip_path, extract_dir)
         self.assertTrue(os.path.exists(os.path.join(extract_dir, "test.png")))
 
+    def test_buffer_variants(self):
+        csv_path = os.path.join(self.test_dir, "data.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("a,b\n1,2\n")
+        output = DataProcessor.csv_to_json(csv_path, self.test_dir)
+        buffer, filename = DataProcessor.csv_to_json_buffer(b"a,b\n1,2\n", "data.csv")
+        self.assertEqual(filename, "data.json")
+        with open(output, "rb") as f:
+            self.assertEqual(buffer.getvalue(), f.read())
+
+        with open(self.img_path, "rb") as f:
+            buffer, filename = ImageProcessor.compress_image_buffer(f.read(), "test.png", 2)
+        self.assertEqual(filename, "compressed_test.jpg")
+        self.assertLessEqual(len(buffer.getvalue()), 2 * 1024)
+
+    def test_compress_to_target_size(self):
+        from PIL import Image, ImageFilter
+        img = Image.effect_noise((400, 300), 30).convert("RGB").filter(ImageFilter.GaussianBlur(1))
+        source = io.BytesIO()
+        img.save(source, "PNG")
+
+        for target_format, ext in (("jpeg", "jpg"), ("webp", "webp")):
+            buffer, filename, stats = ImageProcessor.compress_image_report(source.getvalue(), "noise.png", 20, target_format)
+            self.assertEqual(filename, f"compressed_noise.{ext}")
+            self.assertLessEqual(len(buffer.getvalue()), 20 * 1024)
+            self.assertEqual(stats["bytes"], len(buffer.getvalue()))
+            self.assertEqual(stats["encodes"], len(stats["attempts"]))
+            self.assertLess(stats["encodes"], 7)  # bisecting 10..95 takes 6-7
+
+            # Highest quality that fits: one step up no longer does
+            if stats["quality"] < 95:
+                over = io.BytesIO()
+                img.save(over, target_format.upper(), quality=stats["quality"] + 1, **({"optimize": True} if ext == "jpg" else {"method": 4}))
+                self.assertGreater(over.tell(), 20 * 1024)
+
+        # Parallel candidates land on the same quality
+        _, _, parallel = ImageProcessor.compress_image_report(source.getvalue(), "noise.png", 20, "jpeg", parallel=3)
+        _, _, serial = ImageProcessor.compress_image_report(source.getvalue(), "noise.png", 20, "jpeg")
+        self.assertEqual(parallel["quality"], serial["quality"])
+        # An oversized `parallel` is capped and still lands on it
+        from backend import config
+        with unittest.mock.patch.object(config, "CPU_COUNT", 64):
+            _, _, wide = ImageProcessor.compress_image_report(source.getvalue(), "noise.png", 20, "jpeg", parallel=64)
+        self.assertEqual(wide["quality"], serial["quality"])
+        self.assertLessEqual(wide["encodes"], 8)
+
+    def test_compress_png_and_auto(self):
+        from PIL import Image, ImageChops, ImageDraw, PngImagePlugin
+
+        def chunk_types(data):
+            pos, types = 8, []
+            while pos < len(data):
+                length = int.from_bytes(data[pos:pos + 4], "big")
+                types.append(data[pos + 4:pos + 8].decode())
+                pos += length + 12
+            return types
+
+        # Flat-colored UI graphic with transparency and metadata chunks
+        img = Image.new("RGBA", (300, 200), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for i in range(12):
+            draw.rectangle([10 + i * 20, 10, 25 + i * 20, 190], fill=(i * 20, 100, 255 - i * 20, 255))
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Comment", "x" * 2000)
+        source = io.BytesIO()
+        img.save(source, "PNG", pnginfo=info)
+
+        buffer, filename, stats = ImageProcessor.compress_image_report(source.getvalue(), "ui.png", 50, "png")
+        self.assertEqual(filename, "compressed_ui.png")
+        self.assertIsNone(stats["colors"])  # few colors: exact palette, lossless
+        self.assertIn(stats["zlib"]["strategy"], ("default", "filtered", "rle"))
+        self.assertNotIn("tEXt", chunk_types(buffer.getvalue()))
+        out = Image.open(buffer)
+        self.assertEqual(out.mode, "P")
+        out = out.convert("RGBA")
+        self.assertEqual(out.getpixel((0, 0))[3], 0)
+        self.assertEqual(out.getpixel((15, 15)), img.getpixel((15, 15)))
+        self.assertIsNone(ImageChops.difference(out, img).getbbox(alpha_only=False))
+
+        # A palette is used when lossless does not fit
+        noisy = Image.effect_noise((200, 200), 60).convert("RGB")
+        source = io.BytesIO()
+        noisy.save(source, "PNG")
+        buffer, _, stats = ImageProcessor.compress_image_report(source.getvalue(), "noise.png", 20, "png", dither=False)
+        self.assertTrue(stats["fits"])
+        self.assertIn(stats["colors"], [256, 128, 64, 32, 16, 8, 4, 2])
+        self.assertLessEqual(len(buffer.getvalue()), 20 * 1024)
+
+        # Auto: no JPEG for transparent input, and the flat graphic stays PNG
+        source = io.BytesIO()
+        img.save(source, "PNG")
+        _, filename, stats = ImageProcessor.compress_image_report(source.getvalue(), "ui.png", 50, "auto")
+        self.assertEqual(filename, "compressed_ui.png")
+        self.assertEqual([c["format"] for c in stats["candidates"]], ["png", "webp"])
+        self.assertEqual(stats["candidates"][0]["psnr"], 100.0)
+
+    def test_csv_to_json_formats(self):
+        import json
+        rows = [{"a": "1", "b": "x"}, {"a": "2", "b": "line\nbreak"}]
+        data = b'a,b\n1,x\n2,"line\nbreak"\n'
+        buffer, _ = DataProcessor.csv_to_json_buffer(data, "rows.csv")
+        self.assertEqual(buffer.getvalue().decode(), json.dumps(rows, indent=2))
+
+        buffer, filename = DataProcessor.csv_to_json_buffer(data, "rows.csv", "ndjson", compact=True)
+        self.assertEqual(filename, "rows.ndjson")
+        lines = buffer.getvalue().decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], rows)
+        self.assertEqual(lines[0], '{"a":"1","b":"x"}')
+
+    def test_json_to_csv_streaming(self):
+        from backend.core import data_processor
+        data = b'[{"id": 1, "user": {"name": "a"}}, {"id": 2.5e3, "user": {"name": "b", "geo": {"lat": 1}}, "tags": ["x"]}]'
+        expected = 'id,user.name,user.geo.lat,tags\r\n1,a,,\r\n2500.0,b,1,"[""x""]"\r\n'
+        # Tiny reads so values are split across chunk boundaries
+        with unittest.mock.patch.object(data_processor, "JSON_READ_CHUNK", 3):
+            buffer, filename = DataProcessor.json_to_csv_buffer(data, "users.json")
+        self.assertEqual(filename, "users.csv")
+        self.assertEqual(buffer.getvalue().decode(), expected)
+
+        buffer, _ = DataProcessor.json_to_csv_buffer(b'{"a": 1}\n{"b": 2}\n', "rows.ndjson")
+        self.assertEqual(buffer.getvalue().decode(), 'a,b\r\n1,\r\n,2\r\n')
+
+    def test_excel_streaming_read(self):
+        import datetime
+        import json
+        import openpyxl
+        xlsx_path = os.path.join(self.test_dir, "sheet.xlsx")
+        wb = openpyxl.Workbook()
+        wb.active.append(["name", "amount", "due"])
+        wb.active.append(["a", 1.5, datetime.datetime(2024, 1, 31)])
+        wb.save(xlsx_path)
+
+        output = DataProcessor.excel_to_json(xlsx_path, self.test_dir)
+        with open(output, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"name": "a", "amount": 1.5, "due": "2024-01-31T00:00:00"}])
+
+        output = DataProcessor.excel_to_csv(xlsx_path, self.test_dir)
+        with open(output, encoding="utf-8", newline="") as f:
+            self.assertEqual(f.read(), "name,amount,due\r\na,1.5,2024-01-31 00:00:00\r\n")
+
+    @unittest.skipUnless(importlib.util.find_spec("xlwt"), "xlwt is needed to write an .xls fixture")
+    def test_xls_to_xlsx_all_sheets(self):
+        import datetime
+        import openpyxl
+        import xlwt
+        rb = xlwt.Workbook()
+        first = rb.add_sheet("Orders")
+        first.write(0, 0, "id")
+        first.write(1, 0, 1)
+        second = rb.add_sheet("Customers")
+        second.write(0, 0, "name")
+        second.write(0, 1, "since")
+        second.write(1, 0, "a")
+        second.write(1, 1, datetime.datetime(2024, 1, 31), xlwt.easyxf(num_format_str="YYYY-MM-DD"))
+        data = io.BytesIO()
+        rb.save(data)
+
+        buffer, filename = DataProcessor.xls_to_xlsx_buffer(data.getvalue(), "book.xls")
+        self.assertEqual(filename, "book.xlsx")
+        wb = openpyxl.load_workbook(buffer)
+        self.assertEqual(wb.sheetnames, ["Orders", "Customers"])
+        self.assertEqual(list(wb["Orders"].iter_rows(values_only=True)), [("id",), (1,)])
+        self.assertEqual(list(wb["Customers"].iter_rows(values_only=True)), [
+            ("name", "since"),
+            ("a", datetime.datetime(2024, 1, 31)),
+        ])
+
+    def test_csv_to_excel_types_and_rollover(self):
+        import datetime
+        import openpyxl
+        from backend.core import data_processor
+        data = b"id,zip,when\n1,00123,2024-01-31\n2,99501,2024-02-01\n3,12345,2024-02-02\n"
+        with unittest.mock.patch.object(data_processor, "MAX_SHEET_ROWS", 3):
+            buffer, filename = DataProcessor.csv_to_excel_buffer(data, "rows.csv")
+        self.assertEqual(filename, "rows.xlsx")
+        wb = openpyxl.load_workbook(buffer)
+        self.assertEqual(wb.sheetnames, ["Sheet1", "Sheet2"])
+        self.assertEqual(list(wb["Sheet1"].iter_rows(values_only=True)), [
+            ("id", "zip", "when"),
+            (1, "00123", datetime.datetime(2024, 1, 31)),
+            (2, "99501", datetime.datetime(2024, 2, 1)),
+        ])
+        self.assertEqual(list(wb["Sheet2"].iter_rows(values_only=True)), [
+            ("id", "zip", "when"),
+            (3, "12345", datetime.datetime(2024, 2, 2)),
+        ])
+
+        # IDs longer than 15 digits stay text rather than becoming rounded floats
+        data = b"id,ratio\n1234567890123456789,0.5\n42,3\n"
+        buffer, _ = DataProcessor.csv_to_excel_buffer(data, "ids.csv")
+        rows = list(openpyxl.load_workbook(buffer).active.iter_rows(values_only=True))
+        self.assertEqual(rows[1:], [("1234567890123456789", 0.5), ("42", 3)])
+
+    def test_pdf_page_ranges(self):
+        import fitz
+        from backend.core.pdf_processor import PDFProcessor
+        pdf_path = os.path.join(self.test_dir, "doc.pdf")
+        doc = fitz.open()
+        for i in range(5):
+            doc.new_page(width=144, height=72).insert_text((10, 40), f"page {i + 1}")
+        doc.save(pdf_path)
+        doc.close()
+
+        self.assertEqual(PDFProcessor.parse_pages("", 5), [0, 1, 2, 3, 4])
+        self.assertEqual(PDFProcessor.parse_pages("4-,1", 5), [3, 4, 0])
+        with self.assertRaises(ValueError):
+            PDFProcessor.parse_pages("2-9", 5)
+        self.assertEqual(PDFProcessor.page_blocks(list(range(10)), 3), [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]])
+
+        from PIL import Image
+        paths = PDFProcessor.convert_pdf_to_images(pdf_path, "png", dpi=144, pages="2-3")
+        self.assertEqual([os.path.basename(p) for p in paths], ["doc_page_2.png", "doc_page_3.png"])
+        self.assertEqual(Image.open(paths[0]).size, (288, 144))
+
+    def test_media_stream_args(self):
+        streams = [
+            {"index": 0, "codec_type": "video", "codec_name": "h264"},
+            {"index": 1, "codec_type": "audio", "codec_name": "pcm_s16le"},
+            {"index": 2, "codec_type": "audio", "codec_name": "aac"},
+            {"index": 3, "codec_type": "subtitle", "codec_name": "hdmv_pgs_subtitle"},
+            {"index": 4, "codec_type": "attachment", "codec_name": "ttf"},
+        ]
+        self.assertEqual(AVProcessor.stream_args(streams, "mp4"), [
+            "-map", "0:0", "-c:0", "copy", "-map", "0:1", "-c:1", "aac", "-map", "0:2", "-c:2", "copy",
+        ])
+        self.assertEqual(AVProcessor.stream_args(streams, "mp3"), ["-map", "0:1", "-c:0", "libmp3lame"])
+        self.assertEqual(len(AVProcessor.stream_args(streams, "mkv")), 20)
+        self.assertIsNone(AVProcessor.stream_args(streams, "gif"))
+        self.assertEqual(AVProcessor.stream_args(streams[:2], "mp4", video="1:v:0"), [
+            "-map", "1:v:0", "-c:0", "copy", "-map", "0:1", "-c:1", "aac",
+        ])
+        self.assertEqual(AVProcessor.segment_times([0, 2, 4, 6, 8], 10, 4), [4, 6, 8])
+
+        renditions = AVProcessor.parse_renditions("MP4:720p:2m, mp4:480p, mp3:128k, mp3:128k")
+        self.assertEqual((renditions[0]["height"], renditions[0]["bitrate"]), (720, "2M"))
+        self.assertEqual(AVProcessor.rendition_filenames(renditions, "clip"), [
+            "clip_720p_2M.mp4", "clip_480p.mp4", "clip_128k.mp3", "clip_128k_2.mp3",
+        ])
+        for spec in ("", "gif", "mp4:fast"):
+            with self.assertRaises(ValueError):
+                AVProcessor.parse_renditions(spec)
+        with self.assertRaises(ValueError):
+            AVProcessor.stream_args(streams[3:], "wav")
+
+    @unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "FFmpeg not installed")
+    def test_ffmpeg_conversions(self):
+        import subprocess
+        source = os.path.join(self.test_dir, "clip.mkv")
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=10", "-t", "1",
+            "-c:v", "mpeg4", "-g", "5", source
+        ], check=True)
+        output = AVProcessor.convert_media(source, "mp4", self.test_dir)
+        streams = AVProcessor.probe(output)["streams"]
+        self.assertEqual([s["codec_name"] for s in streams], ["mpeg4"])
+
+        # Re-encoded in keyframe-aligned segments and joined without losing frames
+        with unittest.mock.patch.multiple("backend.config", SEGMENT_MIN_SECONDS=1, SEGMENT_WORKERS=3):
+            output = AVProcessor.convert_media(source, "webm", self.test_dir)
+        self.assertEqual(AVProcessor.keyframe_times(source), [0.0, 0.5])
+        info = AVProcessor.probe(output)
+        self.assertEqual([s["codec_name"] for s in info["streams"]], ["vp9"])
+        self.assertAlmostEqual(float(info["format"]["duration"]), 1.0, places=1)
+
+        # Animations in one pass, without a palette file left behind
+        for target_format, codec in (("gif", "gif"), ("webp", "webp"), ("mp4", "h264")):
+            output = AVProcessor.video_to_gif(source, self.test_dir, fps=5, width=32, target_format=target_format)
+            streams = AVProcessor.probe(output)["streams"]
+            self.assertEqual([(s["codec_name"], s["codec_type"]) for s in streams], [(codec, "video")])
+        self.assertFalse([name for name in os.listdir(self.test_dir) if "palette" in name])
+        with self.assertRaises(ValueError):
+            AVProcessor.video_to_gif(source, self.test_dir, target_format="avi")
+
+    def test_progress_snapshot(self):
+        from backend.utils.progress import Progress
+        tracker = Progress()
+        self.assertIsNone(tracker.snapshot())
+        tracker.expect(10)
+        tracker.update("a", 2.0, 50)
+        tracker.update("b", 3.0, 75)
+        tracker.update("a", 2.5, 60)
+        snapshot = tracker.snapshot()
+        self.assertEqual((snapshot["media_seconds"], snapshot["frames"], snapshot["percent"]), (5.5, 135, 55.0))
+        self.assertIsNotNone(snapshot["eta_seconds"])
+        tracker.finish(True)
+        self.assertEqual(tracker.snapshot()["percent"], 100.0)
+
+    def test_pool_for(self):
+        self.assertEqual(executor.pool_for(ImageProcessor.resize_image), executor.POOL_PROCESS)
+        self.assertEqual(executor.pool_for(AVProcessor.convert_media), executor.POOL_THREAD)
+
+    def test_run_in_pool(self):
+        import asyncio
+        output = asyncio.run(executor.run_in_pool(ImageProcessor.resize_image, self.img_path, percentage=50))
+        from PIL import Image
+        with Image.open(output) as img:
+            self.assertEqual(img.size, (50, 50))
+        executor.shutdown_pools()
+
+    def test_result_cache_lru(self):
+        cache = ResultCache(os.path.join(self.test_dir, "cache"), max_bytes=2500)
+        for i in range(3):
+            src = os.path.join(self.test_dir, f"out{i}.bin")
+            with open(src, "wb") as f:
+                f.write(b"x" * 1000)
+            cache.put(f"k{i}", src, {"filename": f"out{i}.bin"})
+            if i == 1:
+                self.assertIsNotNone(cache.get("k0"))  # k0 becomes most recent
+
+        self.assertIsNone(cache.get("k1"))  # least recently used, evicted
+        self.assertEqual(cache.get("k2")["filename"], "out2.bin")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_sniff(self):
+        with open(self.img_path, "rb") as f:
+            self.assertEqual(sniff(f.read(16)), ("png", "image"))
+        self.assertEqual(sniff(b"%PDF-1.7\n"), ("pdf", "document"))
+        self.assertEqual(sniff(b"\x00\x00\x00\x18ftypisom"), ("mp4", "video"))
+        self.assertEqual(sniff(b"plain text"), (None, None))
+
 if __name__ == '__main__':
     unittest.main()